@@ -6,22 +6,35 @@ Flask backend with real API integration
 
 import os
 import json
+import re
+import hashlib
+import difflib
+import subprocess
 import tempfile
 import time
+import random
+import base64
+import shutil
+import threading
+import weakref
+import queue
+import functools
+import contextvars
+import asyncio
+import concurrent.futures
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager, asynccontextmanager
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, redirect
+from flask import Flask, Request, render_template, request, jsonify, redirect, g
 from werkzeug.utils import secure_filename
 import requests
-import openai
-import anthropic
-import boto3
-from botocore.exceptions import ClientError
 import uuid
 from datetime import datetime
-try:
-    from moviepy.editor import VideoFileClip
-except ImportError:
-    VideoFileClip = None
+from job_ledger import JobLedger, idempotency_key, process_owner
+from media_pool import MediaWorkerPool, MediaQueueFull, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BATCH
+from scratch_space import ScratchSpace, ScratchQuotaExceeded
+from event_bus import EventBus, EventStreamsFull
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
@@ -31,6 +44,106 @@ upload_dir = os.path.join(os.getcwd(), 'uploads')
 os.makedirs(upload_dir, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = upload_dir
 
+# Upload bodies are parsed as a stream; each file part stays in memory up to
+# the threshold and is then spooled to disk, so RAM per upload is bounded
+UPLOAD_MEMORY_THRESHOLD = int(os.environ.get('UPLOAD_MEMORY_THRESHOLD', 1024 * 1024))  # 1MB
+UPLOAD_SPOOL_DIR = os.environ.get('UPLOAD_SPOOL_DIR', os.path.join(upload_dir, 'spool'))
+UPLOAD_MAX_FORM_MEMORY = int(os.environ.get('UPLOAD_MAX_FORM_MEMORY', 512 * 1024))  # non-file fields
+os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+
+upload_spools = weakref.WeakSet()
+upload_spools_lock = threading.Lock()
+
+class UploadSpool(tempfile.SpooledTemporaryFile):
+    """Buffer for one uploaded file part: memory up to the threshold, then UPLOAD_SPOOL_DIR"""
+    def __init__(self, max_size):
+        super().__init__(max_size=max_size, dir=UPLOAD_SPOOL_DIR, prefix='upload-')
+        self.bytes_written = 0
+        with upload_spools_lock:
+            upload_spools.add(self)
+
+    def write(self, data):
+        written = super().write(data)
+        self.bytes_written += len(data)
+        return written
+
+    @property
+    def on_disk(self):
+        return self._rolled
+
+    def close(self):
+        with upload_spools_lock:
+            upload_spools.discard(self)
+        super().close()
+
+class SpooledUploadRequest(Request):
+    max_form_memory_size = UPLOAD_MAX_FORM_MEMORY
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool(UPLOAD_MEMORY_THRESHOLD)
+
+app.request_class = SpooledUploadRequest
+
+def get_upload_spool_stats():
+    """Memory and disk currently held by in-flight upload bodies"""
+    with upload_spools_lock:
+        spools = list(upload_spools)
+    disk = shutil.disk_usage(UPLOAD_SPOOL_DIR)
+    return {
+        'active_uploads': len(spools),
+        'in_memory_bytes': sum(spool.bytes_written for spool in spools if not spool.on_disk),
+        'on_disk_bytes': sum(spool.bytes_written for spool in spools if spool.on_disk),
+        'memory_threshold_bytes': UPLOAD_MEMORY_THRESHOLD,
+        'spool_dir': UPLOAD_SPOOL_DIR,
+        'spool_dir_free_bytes': disk.free
+    }
+
+def describe_upload(file):
+    """Size and spool placement of an uploaded file, for upload responses"""
+    stream = file.stream
+    if isinstance(stream, UploadSpool):
+        return {'bytes': stream.bytes_written, 'spooled_to_disk': stream.on_disk}
+    return {}
+
+# Scratch space - temp media files live in per-job directories that are removed when the
+# last helper using the job exits (see scratch_space.py). Files up to
+# SCRATCH_MEMORY_THRESHOLD go to RAM (/dev/shm) while SCRATCH_MEMORY_MAX_BYTES allows;
+# disk use is capped at SCRATCH_MAX_BYTES, and callers wait for room rather than fill the disk.
+SCRATCH_DIR = os.environ.get('SCRATCH_DIR', os.path.join(upload_dir, 'scratch'))
+SCRATCH_MEMORY_DIR = os.environ.get('SCRATCH_MEMORY_DIR', '/dev/shm/multilingual-scratch' if os.path.isdir('/dev/shm') else '')
+SCRATCH_MAX_BYTES = int(os.environ.get('SCRATCH_MAX_BYTES', 10 * 1024 ** 3))  # 10GB
+SCRATCH_MEMORY_THRESHOLD = int(os.environ.get('SCRATCH_MEMORY_THRESHOLD', 8 * 1024 * 1024))  # 8MB
+SCRATCH_MEMORY_MAX_BYTES = int(os.environ.get('SCRATCH_MEMORY_MAX_BYTES', 64 * 1024 * 1024))  # per process
+SCRATCH_WAIT_TIMEOUT = float(os.environ.get('SCRATCH_WAIT_TIMEOUT', 60))  # seconds
+
+scratch_space = ScratchSpace(
+    SCRATCH_DIR, SCRATCH_MAX_BYTES, memory_root=SCRATCH_MEMORY_DIR or None,
+    memory_threshold=SCRATCH_MEMORY_THRESHOLD, memory_max_bytes=SCRATCH_MEMORY_MAX_BYTES,
+    wait_timeout=lambda: call_timeout(SCRATCH_WAIT_TIMEOUT)
+)
+scratch_space.sweep()  # directories left by workers that died
+
+_current_scratch = contextvars.ContextVar('scratch', default=None)
+
+def current_scratch():
+    """The active scratch_job(); files made through it live until the outermost holder exits"""
+    scratch = _current_scratch.get()
+    if scratch is None:
+        raise RuntimeError("No active scratch_job()")
+    return scratch
+
+@contextmanager
+def scratch_job(job_id=None):
+    """Hold a job's scratch space; nested calls (and threads/tasks started inside) share it"""
+    current = _current_scratch.get()
+    job = scratch_space.job(job_id or (current.job_id if current else None))
+    token = _current_scratch.set(job)
+    try:
+        yield job
+    finally:
+        _current_scratch.reset(token)
+        scratch_space.release(job)
+
 # Add CORS headers to all responses
 @app.after_request
 def after_request(response):
@@ -52,21 +165,44 @@ R2_BUCKET_NAME = os.environ.get('R2_BUCKET_NAME', 't6d')
 R2_ENDPOINT_URL = os.environ.get('R2_ENDPOINT_URL', 'https://e9489e6c0f22eef2c0ba8b8d3981bab5.r2.cloudflarestorage.com')
 R2_PUBLIC_URL = os.environ.get('R2_PUBLIC_URL', 'https://e9489e6c0f22eef2c0ba8b8d3981bab5.r2.cloudflarestorage.com/t6d')  # Direct R2 access
 R2_DEV_URL = os.environ.get('R2_DEV_URL', '')  # R2.dev public URL if configured
+R2_READ_TIMEOUT = int(os.environ.get('R2_READ_TIMEOUT', 60))
+R2_STREAM_PART_SIZE = int(os.environ.get('R2_STREAM_PART_SIZE', 5 * 1024 * 1024))  # streamed outputs (TTS audio)
 
-# Initialize API clients
-if OPENAI_API_KEY:
-    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+# API clients are built on first use so cold starts don't pay for openai,
+# anthropic or boto3 when the request doesn't need them
+@functools.lru_cache(maxsize=None)
+def get_openai_client():
+    if not OPENAI_API_KEY:
+        print("❌ OpenAI API key not found")
+        return None
+    import openai
     print("✅ OpenAI API key configured")
-else:
-    print("❌ OpenAI API key not found")
-    openai_client = None
+    return openai.OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
 
-if CLAUDE_API_KEY:
-    claude_client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
+@functools.lru_cache(maxsize=None)
+def get_claude_client():
+    if not CLAUDE_API_KEY:
+        print("❌ Claude API key not found")
+        return None
+    import anthropic
     print("✅ Claude API key configured")
-else:
-    print("❌ Claude API key not found")
-    claude_client = None
+    return anthropic.Anthropic(api_key=CLAUDE_API_KEY, max_retries=0)
+
+@functools.lru_cache(maxsize=None)
+def get_r2_client():
+    """R2 client (S3-compatible)"""
+    import boto3
+    from botocore.config import Config
+    return boto3.client(
+        's3',
+        endpoint_url=R2_ENDPOINT_URL,
+        aws_access_key_id=R2_ACCESS_KEY_ID,
+        aws_secret_access_key=R2_SECRET_ACCESS_KEY,
+        region_name='auto',
+        # boto3 has no per-call timeout, so R2 calls check the deadline before starting
+        config=Config(connect_timeout=10, read_timeout=R2_READ_TIMEOUT, retries={'max_attempts': 3, 'mode': 'standard'})
+    )
+
 
 # In-memory workflow state (in production, use Redis or database)
 workflow_state = {
@@ -76,41 +212,912 @@ workflow_state = {
     'translations': {},
     'audioFiles': {},
     'videoDuration': None,
-    'audioSize': None
+    'audioSize': None,
+    'vad': None,
+    'transcriptTimings': [],    # [{'start', 'end', 'text'}] Whisper segments, in original-audio seconds
+    'translationSegments': {},  # language -> segment texts of the saved version
+    'ttsTracks': {},            # language -> {'textHash', 'audioFile'} of the last synthesis
+    'ttsSegments': {},          # language -> segment reuse counts of the last synthesis
+    'transcriptVersions': [],   # [{'version', 'segments', 'changed', 'savedAt'}], newest last
+    'segmentTranslations': {},  # source segment hash -> {language: translation}
+    'dubOutputs': None          # last dub-only build: {'dubFile', 'hls', 'dash', 'tracks'}
 }
 
-# Initialize R2 client (S3-compatible)
-r2_client = boto3.client(
-    's3',
-    endpoint_url=R2_ENDPOINT_URL,
-    aws_access_key_id=R2_ACCESS_KEY_ID,
-    aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-    region_name='auto'
-)
+# Tracing - spans keyed by project ID so a slow job can be broken down per stage
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'jsonl')  # jsonl, otlp or none
+TRACE_FILE = os.environ.get('TRACE_FILE', os.path.join(os.getcwd(), 'traces.jsonl'))
+OTLP_ENDPOINT = os.environ.get('OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+TRACE_MAX_PROJECTS = int(os.environ.get('TRACE_MAX_PROJECTS', 200))
+TRACE_SERVICE_NAME = 'multilingual-video-workflow'
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.end = None
+        self.status = 'ok'
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_error(self, error):
+        self.status = 'error'
+        self.error = str(error)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'end': self.end,
+            'duration_ms': round(((self.end or time.time()) - self.start) * 1000, 2),
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+class JsonLinesSpanExporter:
+    """Append finished spans to a JSON-lines file"""
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, spans):
+        with open(self.path, 'a') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + '\n')
+
+class OTLPSpanExporter:
+    """Send finished spans to an OTLP/HTTP (JSON) collector"""
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+
+    def _attribute(self, key, value):
+        if isinstance(value, bool):
+            return {'key': key, 'value': {'boolValue': value}}
+        if isinstance(value, int):
+            return {'key': key, 'value': {'intValue': str(value)}}
+        if isinstance(value, float):
+            return {'key': key, 'value': {'doubleValue': value}}
+        return {'key': key, 'value': {'stringValue': str(value)}}
+
+    def _otlp_span(self, span):
+        otlp_span = {
+            'traceId': span.trace_id.replace('-', '').ljust(32, '0')[:32],
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': 1,
+            'startTimeUnixNano': str(int(span.start * 1e9)),
+            'endTimeUnixNano': str(int((span.end or span.start) * 1e9)),
+            'attributes': [self._attribute(k, v) for k, v in span.attributes.items()],
+            'status': {'code': 2, 'message': span.error or ''} if span.status == 'error' else {'code': 1}
+        }
+        if span.parent_id:
+            otlp_span['parentSpanId'] = span.parent_id
+        return otlp_span
+
+    def export(self, spans):
+        payload = {
+            'resourceSpans': [{
+                'resource': {'attributes': [self._attribute('service.name', TRACE_SERVICE_NAME)]},
+                'scopeSpans': [{
+                    'scope': {'name': 'app'},
+                    'spans': [self._otlp_span(span) for span in spans]
+                }]
+            }]
+        }
+        requests.post(self.endpoint, json=payload, timeout=5)
+
+class TraceRecorder:
+    """Keeps recent spans per project in memory and exports them off the request path"""
+    def __init__(self, exporter=None, max_projects=200):
+        self.exporter = exporter
+        self.max_projects = max_projects
+        self.projects = OrderedDict()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.worker_pid = None
+
+    def _ensure_worker(self):
+        # Started lazily and per process so pre-forked workers each get an exporter thread
+        if self.worker_pid != os.getpid():
+            with self.lock:
+                if self.worker_pid != os.getpid():
+                    self.queue = queue.Queue()
+                    threading.Thread(target=self._export_loop, args=(self.queue,), daemon=True).start()
+                    self.worker_pid = os.getpid()
+
+    def record(self, span):
+        with self.lock:
+            spans = self.projects.setdefault(span.trace_id, [])
+            if span not in spans:
+                spans.append(span)
+            self.projects.move_to_end(span.trace_id)
+            while len(self.projects) > self.max_projects:
+                self.projects.popitem(last=False)
+
+    def finish(self, span):
+        if self.exporter:
+            self._ensure_worker()
+            self.queue.put(span)
+
+    def flush(self, timeout=5):
+        """Wait (bounded) for queued spans to be exported"""
+        deadline = time.time() + timeout
+        while self.worker_pid == os.getpid() and self.queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+
+    def spans_for(self, trace_id):
+        with self.lock:
+            return [span.to_dict() for span in self.projects.get(trace_id, [])]
+
+    def _export_loop(self, span_queue):
+        while True:
+            batch = [span_queue.get()]
+            while len(batch) < 100:
+                try:
+                    batch.append(span_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                print(f"Span export error: {e}")
+            finally:
+                for _ in batch:
+                    span_queue.task_done()
+
+def create_span_exporter(kind):
+    """Build the configured span exporter (jsonl, otlp or none)"""
+    if kind == 'jsonl':
+        return JsonLinesSpanExporter(TRACE_FILE)
+    if kind == 'otlp':
+        return OTLPSpanExporter(OTLP_ENDPOINT)
+    return None
+
+trace_recorder = TraceRecorder(create_span_exporter(TRACE_EXPORTER), TRACE_MAX_PROJECTS)
+
+def get_project_id(new=False):
+    """Return the current project ID, starting a new project when requested"""
+    if new or not workflow_state.get('projectId'):
+        workflow_state['projectId'] = uuid.uuid4().hex
+    return workflow_state['projectId']
+
+@contextmanager
+def trace_span(name, trace_id=None, **attributes):
+    """Open a span as a child of the current span (or as a root of the project trace)"""
+    parent = _current_span.get()
+    if trace_id is None:
+        trace_id = parent.trace_id if parent else get_project_id()
+    span = Span(name, trace_id, parent.span_id if parent and parent.trace_id == trace_id else None, attributes)
+    trace_recorder.record(span)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end = time.time()
+        trace_recorder.finish(span)
+
+def traced(name, new_project=None):
+    """Decorator that runs a function (or Flask view) inside a span
+
+    new_project is an optional predicate; when it returns True the span
+    becomes the root of a fresh project trace (e.g. a step-1 upload).
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with trace_span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace_id = get_project_id(new=True) if new_project and new_project() else None
+            with trace_span(name, trace_id=trace_id) as span:
+                result = func(*args, **kwargs)
+                if isinstance(result, tuple) and len(result) > 1 and isinstance(result[1], int):
+                    span.set_attribute('http.status_code', result[1])
+                    if result[1] >= 400:
+                        span.status = 'error'
+                return result
+        return wrapper
+    return decorator
+
+def compute_critical_path(spans):
+    """Walk back from the latest-ending span at each level to find the chain that set the wall time"""
+    now = time.time()
+    by_id = {span['span_id']: span for span in spans}
+    children = defaultdict(list)
+    roots = []
+    for span in spans:
+        if span['parent_id'] in by_id:
+            children[span['parent_id']].append(span)
+        else:
+            roots.append(span)
+
+    def end_of(span):
+        return span['end'] or now
+
+    def walk(siblings):
+        path = []
+        cursor = None
+        for span in sorted(siblings, key=end_of, reverse=True):
+            if cursor is not None and end_of(span) > cursor:
+                continue  # Overlaps a span already on the path
+            path = [span['span_id']] + walk(children[span['span_id']]) + path
+            cursor = span['start']
+        return path
+
+    return walk(roots)
+
+# Deadlines - every API request and background job gets a time budget. Outbound calls
+# use the remaining budget as their timeout, waits and retries stop when it runs out,
+# and engine work still running at the deadline is cancelled.
+WHISPER_TIMEOUT = 300  # per-call caps, tightened by the deadline
+CLAUDE_TIMEOUT = 180
+REQUEST_DEADLINE = float(os.environ.get('REQUEST_DEADLINE', 280))  # below the gunicorn worker timeout
+JOB_DEADLINE = float(os.environ.get('JOB_DEADLINE', 1800))         # background pipeline jobs
+
+class DeadlineExceeded(Exception):
+    pass
+
+class Deadline:
+    def __init__(self, seconds, name=None):
+        self.name = name
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def check(self, needed=0.0):
+        """Raise DeadlineExceeded unless more than `needed` seconds are left"""
+        if self.remaining() <= needed:
+            raise DeadlineExceeded(f"{self.name or 'request'} exceeded its {self.seconds:g}s budget")
+
+    def timeout(self, cap=None):
+        """Remaining budget (capped) for one outbound call"""
+        self.check()
+        remaining = self.remaining()
+        return min(remaining, cap) if cap else remaining
+
+_current_deadline = contextvars.ContextVar('deadline', default=None)
+
+def current_deadline():
+    return _current_deadline.get()
+
+def check_deadline(needed=0.0):
+    deadline = _current_deadline.get()
+    if deadline:
+        deadline.check(needed)
+
+def call_timeout(cap):
+    """Timeout for an outbound call: the remaining budget, at most cap seconds"""
+    deadline = _current_deadline.get()
+    return deadline.timeout(cap) if deadline else cap
+
+@contextmanager
+def deadline_scope(seconds, name=None):
+    """Run a block under a deadline (never extending an enclosing, tighter one)"""
+    deadline = Deadline(seconds, name)
+    outer = _current_deadline.get()
+    if outer and outer.remaining() < deadline.remaining():
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+@app.before_request
+def start_request_deadline():
+    if request.path.startswith('/api/'):
+        g.deadline_token = _current_deadline.set(Deadline(REQUEST_DEADLINE, request.path))
+
+@app.teardown_request
+def end_request_deadline(exc=None):
+    token = g.pop('deadline_token', None)
+    if token:
+        _current_deadline.reset(token)
+
+# Job ledger - stage runs and paid provider submissions are recorded in SQLite with their
+# inputs, outputs and provider job IDs, so a restarted worker resumes in-flight work
+# (re-polling submitted Sync.so jobs) instead of paying for it twice.
+JOB_LEDGER_PATH = os.environ.get('JOB_LEDGER_PATH', os.path.join(upload_dir, 'jobs.db'))
+JOB_RESUME_MAX_ATTEMPTS = int(os.environ.get('JOB_RESUME_MAX_ATTEMPTS', 3))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 90))  # in-flight rows not renewed for this long are taken over
+
+@functools.lru_cache(maxsize=None)
+def get_job_ledger():
+    return JobLedger(JOB_LEDGER_PATH, lease_seconds=JOB_LEASE_SECONDS)
+
+def ledger_job_view(row):
+    """A ledger row in the shape of a pipeline job"""
+    return {
+        'job_id': row['job_id'],
+        'stage': row['stage'],
+        'project_id': row['project_id'],
+        'status': row['status'],
+        'created_at': datetime.fromtimestamp(row['created_at']).isoformat(),
+        'finished_at': datetime.fromtimestamp(row['updated_at']).isoformat() if row['status'] not in ('pending', 'running', 'submitted') else None,
+        'result': row['outputs'],
+        'error': row['error'],
+        'attempts': row['attempts']
+    }
+
+# Progress events - stage, job, per-language, upload and lip sync updates pushed to the
+# browser over /api/events (Server-Sent Events) instead of being polled for
+EVENTS_HISTORY = int(os.environ.get('EVENTS_HISTORY', 500))  # replayed to reconnecting clients
+# Each open stream holds a gthread thread, so by default half the worker's threads may stream
+EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', max(int(os.environ.get('GUNICORN_THREADS', 16)) // 2, 1)))
+EVENTS_KEEPALIVE = 15  # seconds between comment lines on an idle stream
+EVENTS_STREAM_SECONDS = int(os.environ.get('EVENTS_STREAM_SECONDS', 60))  # the browser reconnects (and replays) after this
+
+event_bus = EventBus(EVENTS_HISTORY, EVENTS_MAX_STREAMS)
+
+def publish_event(event_type, **data):
+    """Push a progress event to open /api/events streams (never raises)"""
+    try:
+        event_bus.publish(event_type, data, project_id=workflow_state.get('projectId'))
+    except Exception as e:
+        print(f"Event publish failed for {event_type}: {e}")
+
+# Async pipeline engine - provider waits run as coroutines on a single event loop thread
+PIPELINE_MAX_INFLIGHT = int(os.environ.get('PIPELINE_MAX_INFLIGHT', 1000))
+PIPELINE_MAX_JOBS = int(os.environ.get('PIPELINE_MAX_JOBS', 500))
+
+class PipelineEngine:
+    """Runs pipeline stages on a background asyncio loop
+
+    Flask routes hand coroutines to the engine with run() (wait for the
+    result) or start_job() (return a job ID immediately). HTTP goes through
+    httpx, OpenAI/Anthropic through their async clients, and boto3 calls
+    through asyncio.to_thread.
+    """
+    def __init__(self, max_inflight=1000, max_jobs=500):
+        self.max_inflight = max_inflight
+        self.max_jobs = max_jobs
+        self.loop = None
+        self.loop_pid = None
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+        self.futures = set()
+        self._semaphore = None
+        self._http = None
+        self._openai = None
+        self._claude = None
+
+    def _ensure_loop(self):
+        with self.lock:
+            if self.loop is None or self.loop_pid != os.getpid():
+                # A loop inherited through fork has no thread behind it - start a fresh one
+                self._http = self._openai = self._claude = None
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run_loop():
+                    asyncio.set_event_loop(loop)
+                    self._semaphore = asyncio.Semaphore(self.max_inflight)
+                    ready.set()
+                    loop.run_forever()
+
+                threading.Thread(target=run_loop, daemon=True, name='pipeline-engine').start()
+                ready.wait()
+                self.loop = loop
+                self.loop_pid = os.getpid()
+        return self.loop
+
+    async def _run(self, coro, parent_span, deadline):
+        _current_span.set(parent_span)  # Carry the caller's trace and deadline into the task
+        _current_deadline.set(deadline)
+        async with self._semaphore:
+            if not deadline:
+                return await coro
+            try:
+                return await asyncio.wait_for(coro, max(deadline.remaining(), 0))
+            except asyncio.TimeoutError:
+                if deadline.remaining() > 0:
+                    raise
+                raise DeadlineExceeded(f"{deadline.name or 'pipeline task'} cancelled after its {deadline.seconds:g}s budget")
+
+    def submit(self, coro, deadline=None):
+        """Schedule a coroutine on the engine loop and return a concurrent Future
+
+        The coroutine runs under `deadline` (default: the caller's) and is cancelled when it expires.
+        """
+        loop = self._ensure_loop()
+        deadline = deadline or _current_deadline.get()
+        future = asyncio.run_coroutine_threadsafe(self._run(coro, _current_span.get(), deadline), loop)
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self._forget_future)
+        return future
+
+    def _forget_future(self, future):
+        with self.lock:
+            self.futures.discard(future)
+
+    def drain(self, timeout):
+        """Wait up to timeout seconds for in-flight stage work; returns how many are still running"""
+        with self.lock:
+            pending = [f for f in self.futures if not f.done()]
+        if not pending:
+            return 0
+        print(f"Draining {len(pending)} in-flight pipeline tasks (up to {timeout}s)...")
+        done, not_done = concurrent.futures.wait(pending, timeout=timeout)
+        return len(not_done)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the engine loop and wait for its result"""
+        deadline = _current_deadline.get()
+        if timeout is None and deadline:
+            timeout = max(deadline.remaining(), 0) + 5  # the task cancels itself at the deadline
+        return self.submit(coro).result(timeout)
+
+    def start_job(self, stage, coro, job_id=None):
+        """Run a coroutine in the background and track it as a pipeline job
+
+        Pass the job_id of a ledger row to have the outcome recorded there.
+        """
+        job = {
+            'job_id': job_id or uuid.uuid4().hex,
+            'stage': stage,
+            'project_id': workflow_state.get('projectId'),
+            'status': 'running',
+            'created_at': datetime.now().isoformat(),
+            'finished_at': None,
+            'result': None,
+            'error': None,
+            'deadline_seconds': JOB_DEADLINE
+        }
+        with self.lock:
+            self.jobs[job['job_id']] = job
+            while len(self.jobs) > self.max_jobs:
+                self.jobs.popitem(last=False)
+        # Jobs outlive the request that started them, so they get their own budget and scratch directory
+        future = self.submit(self._in_scratch(job['job_id'], coro), deadline=Deadline(JOB_DEADLINE, f'{stage} job'))
+        future.add_done_callback(lambda f: self._finish_job(job, f))
+        publish_event('job', job_id=job['job_id'], stage=stage, status='running')
+        return job
+
+    @staticmethod
+    async def _in_scratch(job_id, coro):
+        with scratch_job(job_id):
+            return await coro
+
+    def _finish_job(self, job, future):
+        job['finished_at'] = datetime.now().isoformat()
+        try:
+            result = future.result()
+        except DeadlineExceeded as e:
+            job['status'] = 'timed_out'
+            job['error'] = str(e)
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        else:
+            if result is None:
+                job['status'] = 'failed'
+                job['error'] = f"{job['stage']} failed"
+            else:
+                job['status'] = 'completed'
+                job['result'] = result
+        try:
+            get_job_ledger().update(job['job_id'], status=job['status'], outputs=job['result'], error=job['error'])
+        except Exception as e:
+            print(f"Job ledger update failed for {job['job_id']}: {e}")
+        publish_event('job', job_id=job['job_id'], stage=job['stage'], status=job['status'],
+                      result=job['result'], error=job['error'])
+
+    def get_job(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job:
+            return job
+        # Jobs from before a restart (or evicted from memory) are still in the ledger
+        row = get_job_ledger().get(job_id)
+        return ledger_job_view(row) if row else None
+
+    # Async clients are created on first use from inside the engine loop
+    @property
+    def http(self):
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0),
+                                           limits=httpx.Limits(max_connections=self.max_inflight))
+        return self._http
+
+    @property
+    def openai(self):
+        if self._openai is None and OPENAI_API_KEY:
+            import openai
+            self._openai = openai.AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+        return self._openai
+
+    @property
+    def claude(self):
+        if self._claude is None and CLAUDE_API_KEY:
+            import anthropic
+            self._claude = anthropic.AsyncAnthropic(api_key=CLAUDE_API_KEY, max_retries=0)
+        return self._claude
+
+pipeline_engine = PipelineEngine(PIPELINE_MAX_INFLIGHT, PIPELINE_MAX_JOBS)
+
+# Provider rate control - each provider's concurrency and request rate are learned by
+# AIMD: successes raise both additively, throttling answers (429, 503, 529) halve them
+# and pause the provider for Retry-After plus jitter. Retries use full-jitter backoff.
+# The SDK clients are built with max_retries=0 so retries only happen here.
+RATE_RETRY_ATTEMPTS = int(os.environ.get('RATE_RETRY_ATTEMPTS', 5))
+RATE_BACKOFF_BASE = float(os.environ.get('RATE_BACKOFF_BASE', 1.0))  # seconds
+RATE_BACKOFF_MAX = float(os.environ.get('RATE_BACKOFF_MAX', 60.0))
+RATE_RETRY_STATUSES = {429, 500, 502, 503, 504, 529}
+RATE_THROTTLE_STATUSES = {429, 503, 529}
+
+PROVIDER_LIMITS = {
+    # provider: (max concurrent requests, max requests per second)
+    'openai': (int(os.environ.get('OPENAI_MAX_CONCURRENCY', 4)), float(os.environ.get('OPENAI_MAX_RATE', 5))),
+    'anthropic': (int(os.environ.get('ANTHROPIC_MAX_CONCURRENCY', 4)), float(os.environ.get('ANTHROPIC_MAX_RATE', 4))),
+    'elevenlabs': (int(os.environ.get('ELEVENLABS_MAX_CONCURRENCY', 4)), float(os.environ.get('ELEVENLABS_MAX_RATE', 10))),
+    'syncso': (int(os.environ.get('SYNCSO_MAX_CONCURRENCY', 4)), float(os.environ.get('SYNCSO_MAX_RATE', 2))),
+}
+
+# Circuit breakers - consecutive provider failures (5xx, timeouts, connection errors)
+# open a provider's circuit so calls fail immediately instead of queueing behind it.
+# After the reset timeout a few half-open probe calls decide whether to close it again.
+# Thresholds can be overridden per provider, e.g. SYNCSO_CIRCUIT_FAILURE_THRESHOLD.
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_RESET_TIMEOUT', 30))  # seconds open before probing
+CIRCUIT_HALF_OPEN_CALLS = int(os.environ.get('CIRCUIT_HALF_OPEN_CALLS', 1))
+
+def provider_setting(provider, name, default):
+    value = os.environ.get(f'{provider.upper()}_{name}')
+    return type(default)(value) if value is not None else default
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+    def __init__(self, provider, retry_in):
+        super().__init__(f"{provider} is unavailable (circuit open), retry in {retry_in:.0f}s")
+        self.provider = provider
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    def __init__(self, provider):
+        self.provider = provider
+        self.failure_threshold = provider_setting(provider, 'CIRCUIT_FAILURE_THRESHOLD', CIRCUIT_FAILURE_THRESHOLD)
+        self.reset_timeout = provider_setting(provider, 'CIRCUIT_RESET_TIMEOUT', CIRCUIT_RESET_TIMEOUT)
+        self.half_open_calls = provider_setting(provider, 'CIRCUIT_HALF_OPEN_CALLS', CIRCUIT_HALF_OPEN_CALLS)
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.counts = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Admit a call (possibly as a half-open probe) or raise CircuitOpenError"""
+        with self.lock:
+            if self.state == 'open':
+                retry_in = self.opened_at + self.reset_timeout - time.monotonic()
+                if retry_in > 0:
+                    self.counts['rejected'] += 1
+                    raise CircuitOpenError(self.provider, retry_in)
+                self.state = 'half_open'
+                self.probes = 0
+                print(f"Circuit for {self.provider} half-open, probing")
+            if self.state == 'half_open':
+                if self.probes >= self.half_open_calls:
+                    self.counts['rejected'] += 1
+                    raise CircuitOpenError(self.provider, 1)
+                self.probes += 1
+                return True  # probe
+            return False
+
+    def record(self, failed, probe=False):
+        """Outcome of an admitted call; failed is None when it says nothing about the provider"""
+        with self.lock:
+            if probe and self.state == 'half_open':
+                self.probes -= 1
+            if failed is None:
+                return
+            if failed:
+                self.counts['failures'] += 1
+                self.failures += 1
+                if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                    self._open()
+            else:
+                self.failures = 0
+                if self.state == 'half_open':
+                    self.state = 'closed'
+                    print(f"Circuit for {self.provider} closed")
+
+    def _open(self):
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+        self.counts['opened'] += 1
+        print(f"Circuit for {self.provider} opened after {self.failures} consecutive failures")
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'half_open_calls': self.half_open_calls,
+                'open_for': round(max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0), 1) if self.state == 'open' else 0,
+                **self.counts
+            }
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date); None if absent"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        return max((when - datetime.now(when.tzinfo)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class ProviderCall:
+    """One admitted call inside a limiter slot; record() feeds the limiter and the breaker"""
+    def __init__(self, limiter, probe):
+        self.limiter = limiter
+        self.probe = probe
+        self.recorded = False
+
+    def record(self, status, retry_after=None, error=None):
+        if self.recorded:
+            return
+        self.recorded = True
+        if status is not None or error is not None:
+            self.limiter.record(status, retry_after)
+        if status is not None:
+            failed = status >= 500
+        elif error is not None and is_transient_error(error):
+            failed = True
+        else:
+            failed = None  # nothing learned about the provider
+        self.limiter.breaker.record(failed, self.probe)
+
+class AIMDLimiter:
+    """Adaptive concurrency and token-bucket rate limit for one provider
+
+    Usable from request threads (slot) and the engine loop (slot_async); waits
+    are short polls so both sides share one lock-protected state. Slots are
+    refused with CircuitOpenError while the provider's circuit is open.
+    """
+    def __init__(self, name, max_concurrency, max_rate):
+        self.name = name
+        self.breaker = CircuitBreaker(name)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_rate = max(max_rate, 0.01)
+        self.min_rate = self.max_rate / 64
+        self.concurrency = float(max(1, self.max_concurrency // 2))
+        self.rate = self.max_rate / 2
+        self.tokens = 1.0
+        self.refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.counts = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def _try_acquire(self):
+        """Take a slot and a token; returns 0 on success, else seconds to wait"""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.refilled_at) * self.rate)
+            self.refilled_at = now
+            if self.in_flight >= int(self.concurrency):
+                return 0.05
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+            self.in_flight += 1
+            self.counts['requests'] += 1
+            return 0
+
+    def _release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    @contextmanager
+    def slot(self):
+        check_deadline()
+        call = ProviderCall(self, self.breaker.allow())
+        try:
+            wait = self._try_acquire()
+            while wait:
+                check_deadline(min(wait, 1.0))
+                time.sleep(min(wait, 1.0))
+                wait = self._try_acquire()
+        except BaseException:
+            call.record(None)  # a deadline or cancellation while waiting must not keep the probe
+            raise
+        try:
+            yield call
+        except Exception as e:
+            call.record(*response_feedback(error=e), error=e)
+            raise
+        finally:
+            call.record(None)  # no-op once recorded; frees an unused half-open probe
+            self._release()
+
+    @asynccontextmanager
+    async def slot_async(self):
+        check_deadline()
+        call = ProviderCall(self, self.breaker.allow())
+        try:
+            wait = self._try_acquire()
+            while wait:
+                check_deadline(min(wait, 1.0))
+                await asyncio.sleep(min(wait, 1.0))
+                wait = self._try_acquire()
+        except BaseException:
+            call.record(None)  # a deadline or cancellation while waiting must not keep the probe
+            raise
+        try:
+            yield call
+        except Exception as e:
+            call.record(*response_feedback(error=e), error=e)
+            raise
+        finally:
+            call.record(None)
+            self._release()
+
+    def record(self, status, retry_after=None):
+        """Feed back a response status (None for a network error or no response)"""
+        with self.lock:
+            if status in RATE_THROTTLE_STATUSES:
+                self.counts['throttled'] += 1
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.tokens = min(self.tokens, 0.0)
+                if retry_after:
+                    jitter = random.uniform(0, min(retry_after * 0.1 + 0.5, 5.0))
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after + jitter)
+            elif status is not None and status < 400:
+                self.counts['succeeded'] += 1
+                self.concurrency = min(float(self.max_concurrency), self.concurrency + 1 / self.concurrency)
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+            else:
+                self.counts['failed'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'concurrency': round(self.concurrency, 2),
+                'max_concurrency': self.max_concurrency,
+                'rate_per_second': round(self.rate, 3),
+                'max_rate_per_second': self.max_rate,
+                'in_flight': self.in_flight,
+                'paused_for': round(max(self.paused_until - time.monotonic(), 0.0), 1),
+                **self.counts
+            }
+
+rate_limiters = {name: AIMDLimiter(name, *limits) for name, limits in PROVIDER_LIMITS.items()}
+
+def response_feedback(response=None, error=None):
+    """(status, retry_after) from an HTTP response, or from an SDK/HTTP exception"""
+    if error is not None:
+        response = getattr(error, 'response', None)
+        status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    else:
+        status = getattr(response, 'status_code', 200)  # SDK result objects carry no status
+    headers = getattr(response, 'headers', None) or {}
+    return status, parse_retry_after(headers.get('retry-after'))
+
+def is_transient_error(error):
+    """Connection failures and timeouts from requests, httpx and the SDKs"""
+    return isinstance(error, (ConnectionError, TimeoutError)) or any(
+        marker in type(error).__name__ for marker in ('Timeout', 'Connect', 'Transport'))
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(RATE_BACKOFF_MAX, RATE_BACKOFF_BASE * 2 ** attempt))
+
+def should_retry(status, error, attempt, attempts):
+    if attempt + 1 >= attempts:
+        return False
+    if error is not None:
+        return status in RATE_RETRY_STATUSES or (status is None and is_transient_error(error))
+    return status in RATE_RETRY_STATUSES
+
+def call_with_rate_control(provider, call, attempts=RATE_RETRY_ATTEMPTS):
+    """Run call() under the provider's limiter, retrying throttled, 5xx and network failures
+
+    Returns the last response (or raises the last error) once attempts run out.
+    """
+    limiter = rate_limiters[provider]
+    for attempt in range(attempts):
+        if attempt:
+            delay = backoff_delay(attempt)
+            check_deadline(delay)
+            time.sleep(delay)
+        with limiter.slot() as slot:
+            try:
+                response = call()
+            except Exception as e:
+                status, retry_after = response_feedback(error=e)
+                slot.record(status, retry_after, error=e)
+                if should_retry(status, e, attempt, attempts):
+                    print(f"{provider} call failed ({status or type(e).__name__}), retrying")
+                    continue
+                raise
+            status, retry_after = response_feedback(response)
+            slot.record(status, retry_after)
+        if not should_retry(status, None, attempt, attempts):
+            return response
+        print(f"{provider} answered {status}, retrying")
+
+async def call_with_rate_control_async(provider, call, attempts=RATE_RETRY_ATTEMPTS):
+    """Async variant of call_with_rate_control; call() returns an awaitable"""
+    limiter = rate_limiters[provider]
+    for attempt in range(attempts):
+        if attempt:
+            delay = backoff_delay(attempt)
+            check_deadline(delay)
+            await asyncio.sleep(delay)
+        async with limiter.slot_async() as slot:
+            try:
+                response = await call()
+            except Exception as e:
+                status, retry_after = response_feedback(error=e)
+                slot.record(status, retry_after, error=e)
+                if should_retry(status, e, attempt, attempts):
+                    print(f"{provider} call failed ({status or type(e).__name__}), retrying")
+                    continue
+                raise
+            status, retry_after = response_feedback(response)
+            slot.record(status, retry_after)
+        if not should_retry(status, None, attempt, attempts):
+            return response
+        print(f"{provider} answered {status}, retrying")
 
 # R2 Storage Helper Functions
+def unique_r2_filename(filename):
+    """Generate unique filename with timestamp for uploads"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"{timestamp}_{str(uuid.uuid4())[:8]}_{filename}"
+
 def upload_file_to_r2(file_obj, filename, content_type=None, simple_name=False):
     """Upload file to R2 and return public URL"""
+    from botocore.exceptions import ClientError
     try:
-        if simple_name:
-            # Use simple filename for processed files
-            unique_filename = filename
-        else:
-            # Generate unique filename with timestamp for uploads
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            unique_filename = f"{timestamp}_{str(uuid.uuid4())[:8]}_{filename}"
+        unique_filename = filename if simple_name else unique_r2_filename(filename)
         
         # Upload to R2
         extra_args = {}
         if content_type:
             extra_args['ContentType'] = content_type
             
-        r2_client.upload_fileobj(
-            file_obj, 
-            R2_BUCKET_NAME, 
-            unique_filename,
-            ExtraArgs=extra_args
-        )
+        check_deadline()
+        with trace_span('r2.upload_fileobj', key=unique_filename):
+            get_r2_client().upload_fileobj(
+                file_obj, 
+                R2_BUCKET_NAME, 
+                unique_filename,
+                ExtraArgs=extra_args
+            )
         
         # Return public URL
         public_url = f"{R2_PUBLIC_URL}/{unique_filename}"
@@ -122,26 +1129,23 @@ def upload_file_to_r2(file_obj, filename, content_type=None, simple_name=False):
 
 def upload_bytes_to_r2(data, filename, content_type=None, simple_name=False):
     """Upload bytes data to R2 and return public URL"""
+    from botocore.exceptions import ClientError
     try:
-        if simple_name:
-            # Use simple filename for processed files
-            unique_filename = filename
-        else:
-            # Generate unique filename with timestamp for uploads
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            unique_filename = f"{timestamp}_{str(uuid.uuid4())[:8]}_{filename}"
+        unique_filename = filename if simple_name else unique_r2_filename(filename)
         
         # Upload to R2
         extra_args = {}
         if content_type:
             extra_args['ContentType'] = content_type
             
-        r2_client.put_object(
-            Bucket=R2_BUCKET_NAME,
-            Key=unique_filename,
-            Body=data,
-            **extra_args
-        )
+        check_deadline()
+        with trace_span('r2.put_object', key=unique_filename, bytes=len(data)):
+            get_r2_client().put_object(
+                Bucket=R2_BUCKET_NAME,
+                Key=unique_filename,
+                Body=data,
+                **extra_args
+            )
         
         # Return public URL
         public_url = f"{R2_PUBLIC_URL}/{unique_filename}"
@@ -151,21 +1155,167 @@ def upload_bytes_to_r2(data, filename, content_type=None, simple_name=False):
         print(f"R2 upload error: {e}")
         return None, None
 
+def create_multipart_upload_r2(key, content_type=None):
+    """Start an R2 multipart upload and return its UploadId"""
+    extra_args = {'ContentType': content_type} if content_type else {}
+    check_deadline()
+    with trace_span('r2.create_multipart_upload', key=key):
+        response = get_r2_client().create_multipart_upload(Bucket=R2_BUCKET_NAME, Key=key, **extra_args)
+    return response['UploadId']
+
+def upload_part_r2(key, upload_id, part_number, data):
+    """Upload one multipart part and return its {'PartNumber', 'ETag'} entry"""
+    check_deadline()
+    with trace_span('r2.upload_part', key=key, part_number=part_number, bytes=len(data)):
+        response = get_r2_client().upload_part(
+            Bucket=R2_BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+    return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+def complete_multipart_upload_r2(key, upload_id, parts):
+    """Finish a multipart upload and return the public URL"""
+    check_deadline()
+    with trace_span('r2.complete_multipart_upload', key=key, parts=len(parts)):
+        get_r2_client().complete_multipart_upload(
+            Bucket=R2_BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+    return f"{R2_PUBLIC_URL}/{key}"
+
+def abort_multipart_upload_r2(key, upload_id):
+    from botocore.exceptions import ClientError
+    try:
+        get_r2_client().abort_multipart_upload(Bucket=R2_BUCKET_NAME, Key=key, UploadId=upload_id)
+    except ClientError as e:
+        print(f"R2 abort multipart error: {e}")
+
+class R2StreamWriter:
+    """Write a stream of chunks to an R2 object as multipart parts
+
+    write() only buffers and reports when a full part is ready; flush() sends
+    full parts, so async callers can push the upload onto a thread. Objects
+    smaller than one part go up with a single put_object at close().
+    """
+    def __init__(self, key, content_type=None, part_size=None):
+        self.key = key
+        self.content_type = content_type
+        self.part_size = max(part_size or R2_STREAM_PART_SIZE, 5 * 1024 * 1024)  # R2 minimum is 5MB
+        self.buffer = bytearray()
+        self.multipart_id = None
+        self.parts = []
+        self.bytes_written = 0
+
+    def write(self, chunk):
+        self.buffer.extend(chunk)
+        self.bytes_written += len(chunk)
+        return len(self.buffer) >= self.part_size
+
+    def flush(self, final=False):
+        while len(self.buffer) >= self.part_size or (final and self.buffer):
+            if not self.multipart_id:
+                self.multipart_id = create_multipart_upload_r2(self.key, self.content_type)
+            data = bytes(self.buffer[:self.part_size])
+            self.parts.append(upload_part_r2(self.key, self.multipart_id, len(self.parts) + 1, data))
+            del self.buffer[:len(data)]
+
+    def close(self):
+        """Finish the object and return its public URL"""
+        if not self.multipart_id:
+            public_url, _ = upload_bytes_to_r2(bytes(self.buffer), self.key, self.content_type, simple_name=True)
+            self.buffer.clear()
+            return public_url
+        self.flush(final=True)
+        return complete_multipart_upload_r2(self.key, self.multipart_id, self.parts)
+
+    def abort(self):
+        self.buffer.clear()
+        if self.multipart_id:
+            abort_multipart_upload_r2(self.key, self.multipart_id)
+            self.multipart_id = None
+
+def head_object_r2(key):
+    """Object metadata (ContentLength, ContentType, ETag), or None if it doesn't exist"""
+    from botocore.exceptions import ClientError
+    try:
+        check_deadline()
+        with trace_span('r2.head_object', key=key):
+            return get_r2_client().head_object(Bucket=R2_BUCKET_NAME, Key=key)
+    except ClientError as e:
+        print(f"R2 head error: {e}")
+        return None
+
+def get_object_range_r2(key, start, end):
+    """Streaming body for bytes [start, end) of an object"""
+    check_deadline()
+    with trace_span('r2.get_object', key=key, start=start, end=end):
+        response = get_r2_client().get_object(Bucket=R2_BUCKET_NAME, Key=key, Range=f"bytes={start}-{end - 1}")
+    return response['Body']
+
+class R2RangeReader:
+    """Read-only, seekable file object over an R2 object using ranged GETs
+
+    Reads are rounded up to block_size so header walks don't cost a request per box.
+    """
+    def __init__(self, key, size, block_size=64 * 1024):
+        self.key = key
+        self.size = size
+        self.block_size = block_size
+        self.position = 0
+        self.block_start = 0
+        self.block = b''
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self.position, os.SEEK_END: self.size}[whence]
+        self.position = max(base + offset, 0)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def read(self, n=-1):
+        end = self.size if n is None or n < 0 else min(self.position + n, self.size)
+        if self.position >= end:
+            return b''
+        if not (self.block_start <= self.position and end <= self.block_start + len(self.block)):
+            fetch_end = min(max(end, self.position + self.block_size), self.size)
+            self.block = get_object_range_r2(self.key, self.position, fetch_end).read()
+            self.block_start = self.position
+        data = self.block[self.position - self.block_start:end - self.block_start]
+        self.position += len(data)
+        return data
+
 def download_file_from_r2(filename):
-    """Download file from R2 to local temp file"""
+    """Download file from R2 into the current scratch_job(); returns the local path
+
+    The file is removed with the scratch job, so callers don't delete it.
+    """
+    from botocore.exceptions import ClientError
+    scratch = current_scratch()
+    head = head_object_r2(filename)
+    if not head:
+        return None
+    path = scratch.path(os.path.splitext(filename)[1], head['ContentLength'])
     try:
-        temp_file = tempfile.NamedTemporaryFile(delete=False)
-        r2_client.download_fileobj(R2_BUCKET_NAME, filename, temp_file)
-        temp_file.close()
-        return temp_file.name
+        check_deadline()
+        with trace_span('r2.download_fileobj', key=filename), open(path, 'wb') as f:
+            get_r2_client().download_fileobj(R2_BUCKET_NAME, filename, f)
+        return path
     except ClientError as e:
         print(f"R2 download error: {e}")
+        scratch.discard(path)
         return None
 
 def get_presigned_url(filename, expiration=3600):
     """Generate presigned URL for file access"""
+    from botocore.exceptions import ClientError
     try:
-        url = r2_client.generate_presigned_url(
+        url = get_r2_client().generate_presigned_url(
             'get_object',
             Params={'Bucket': R2_BUCKET_NAME, 'Key': filename},
             ExpiresIn=expiration
@@ -175,198 +1325,546 @@ def get_presigned_url(filename, expiration=3600):
         print(f"Presigned URL error: {e}")
         return None
 
+@traced('extract_audio_from_video')
 def extract_audio_from_video(video_url):
     """Extract audio from video file and upload to R2"""
     try:
-        if not VideoFileClip:
-            print("MoviePy not available for video processing")
-            return None, None
+        with scratch_job() as scratch:
+            # Download video from R2
+            video_filename = video_url.split('/')[-1]
+            video_temp_path = download_file_from_r2(video_filename)
             
-        # Download video from R2
-        video_filename = video_url.split('/')[-1]
-        video_temp_path = download_file_from_r2(video_filename)
-        
-        if not video_temp_path:
-            return None, None
+            if not video_temp_path:
+                return None, None
+                
+            # Duration comes from the container headers (cached from the upload when possible),
+            # so only the audio stream needs decoding
+            info = lookup_media(video_filename) or probe_media(video_temp_path, alias=video_filename)
             
-        # Extract audio using MoviePy
-        with VideoFileClip(video_temp_path) as video:
-            duration_seconds = video.duration
-            duration_formatted = f"{int(duration_seconds//60):02d}:{int(duration_seconds%60):02d}"
-            
-            # Create temporary audio file
-            audio_temp = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-            audio_temp.close()
-            
-            # Extract audio
-            video.audio.write_audiofile(audio_temp.name, verbose=False, logger=None)
-        
-        # Upload extracted audio to R2 with simple filename
-        # Extract original filename from the complex R2 filename
-        original_name = video_filename.split('_')[-1] if '_' in video_filename else video_filename
-        audio_filename = original_name.rsplit('.', 1)[0] + '_audio.mp3'
-        
-        with open(audio_temp.name, 'rb') as audio_file:
-            audio_url, r2_filename = upload_file_to_r2(
-                audio_file, 
-                audio_filename, 
-                content_type='audio/mpeg',
-                simple_name=True  # Use simple filename for processed files
-            )
-        
-        # Clean up temp files
-        os.unlink(video_temp_path)
-        os.unlink(audio_temp.name)
-        
-        return audio_url, duration_formatted
+            # 128 kbps MP3 is 16 KB per second
+            expected_size = int(info['duration'] * 16000) + 65536 if info and info['duration'] else os.path.getsize(video_temp_path)
+            audio_temp_path = scratch.path('.mp3', expected_size)
+            
+            # Extract audio with ffmpeg in the media pool (the uploader is waiting on it)
+            with trace_span('ffmpeg.extract_audio'):
+                run_ffmpeg(['-i', video_temp_path, '-vn', '-ar', '44100', '-c:a', 'libmp3lame', '-b:a', '128k', audio_temp_path],
+                           priority=PRIORITY_INTERACTIVE)
+            scratch.discard(video_temp_path)
+            if not info or not info['duration']:
+                info = probe_media(audio_temp_path)
+            duration_formatted = format_duration(info['duration'] if info and info['duration'] else 0)
+            
+            # Upload extracted audio to R2 with simple filename
+            # Extract original filename from the complex R2 filename
+            original_name = video_filename.split('_')[-1] if '_' in video_filename else video_filename
+            audio_filename = original_name.rsplit('.', 1)[0] + '_audio.mp3'
+            
+            with open(audio_temp_path, 'rb') as audio_file:
+                audio_url, r2_filename = upload_file_to_r2(
+                    audio_file, 
+                    audio_filename, 
+                    content_type='audio/mpeg',
+                    simple_name=True  # Use simple filename for processed files
+                )
+            if r2_filename:
+                probe_media(audio_temp_path, alias=r2_filename)
+            
+            return audio_url, duration_formatted
         
     except Exception as e:
         print(f"Audio extraction error: {e}")
         return None, None
 
-class TranscriptExtractor:
-    def transcribe_audio(self, audio_url_or_path):
-        try:
-            if not openai_client:
-                print("OpenAI client not configured")
-                return None
-                
-            print(f"Starting transcription for: {audio_url_or_path}")
-            
-            # If it's a URL, download first
-            if audio_url_or_path.startswith('http'):
-                # Download from R2 or extract filename from URL
-                filename = audio_url_or_path.split('/')[-1]
-                print(f"Downloading audio file: {filename}")
-                temp_path = download_file_from_r2(filename)
-                if not temp_path:
-                    print("Failed to download audio file from R2")
-                    return None
-                audio_path = temp_path
-                print(f"Downloaded to: {audio_path}")
-            else:
-                audio_path = audio_url_or_path
-            
-            # Check if file exists and is readable
-            if not os.path.exists(audio_path):
-                print(f"Audio file does not exist: {audio_path}")
+# Fast-start remux - MP4 outputs are rewritten with moov ahead of mdat (no re-encode) so
+# browsers can start playback from the first bytes. The rewrite streams from ranged R2
+# reads into a multipart upload of the same key; layouts the stdlib rewrite can't handle
+# are remuxed by ffmpeg with -c copy instead.
+FASTSTART_ENABLED = os.environ.get('FASTSTART_ENABLED', 'true').lower() == 'true'
+R2_COPY_CHUNK_SIZE = 1024 * 1024
+
+@traced('media.faststart')
+def make_faststart_r2(key, content_type='video/mp4'):
+    """Ensure an MP4 in R2 is laid out for fast start
+
+    Returns 'already' if it was, 'remuxed' if it was rewritten, or None on failure.
+    """
+    from media_probe import faststart_plan
+    head = head_object_r2(key)
+    if not head:
+        return None
+    reader = R2RangeReader(key, head['ContentLength'])
+    try:
+        plan = faststart_plan(reader, reader.size)
+    except ValueError as e:
+        print(f"Fast-start rewrite not possible for {key} ({e}), remuxing with ffmpeg")
+        return remux_faststart_ffmpeg(key, content_type)
+    if plan is None:
+        return 'already'
+    
+    # Overwriting the key in place is safe: the old object stays readable until the upload completes
+    writer = R2StreamWriter(key, content_type)
+    try:
+        for piece in plan:
+            if isinstance(piece, bytes):
+                if writer.write(piece):
+                    writer.flush()
+                continue
+            body = get_object_range_r2(key, *piece)
+            for chunk in body.iter_chunks(R2_COPY_CHUNK_SIZE):
+                if writer.write(chunk):
+                    writer.flush()
+        if not writer.close():
+            return None
+    except Exception as e:
+        print(f"Fast-start rewrite error for {key}: {e}")
+        writer.abort()
+        return None
+    get_media_probe_cache().forget(key)
+    print(f"{key} rewritten for fast start ({writer.bytes_written} bytes)")
+    return 'remuxed'
+
+def remux_faststart_ffmpeg(key, content_type='video/mp4'):
+    """ffmpeg stream-copy remux with +faststart, through scratch files"""
+    try:
+        with scratch_job() as scratch:
+            source = download_file_from_r2(key)
+            if not source:
                 return None
-                
-            file_size = os.path.getsize(audio_path)
-            print(f"Audio file size: {file_size} bytes")
-            
-            if file_size == 0:
-                print("Audio file is empty")
+            output = scratch.path('.mp4', os.path.getsize(source))
+            run_ffmpeg(['-i', source, '-map', '0', '-c', 'copy', '-movflags', '+faststart', output], priority=PRIORITY_BATCH)
+            with open(output, 'rb') as f:
+                public_url, _ = upload_file_to_r2(f, key, content_type, simple_name=True)
+            if not public_url:
                 return None
-            
-            # Check file format by reading first few bytes
-            with open(audio_path, 'rb') as f:
-                first_bytes = f.read(12)
-                print(f"File header: {first_bytes.hex()}")
-                
-                # Check for common audio file signatures
-                if first_bytes.startswith(b'ID3') or first_bytes[1:4] == b'ID3':
-                    print("Detected: MP3 with ID3 tag")
-                elif first_bytes[:4] == b'fLaC':
-                    print("Detected: FLAC")
-                elif first_bytes[4:8] == b'ftyp':
-                    print("Detected: MP4/M4A")
-                elif first_bytes[:4] == b'RIFF':
-                    print("Detected: WAV")
-                elif first_bytes[:4] == b'OggS':
-                    print("Detected: OGG")
-                else:
-                    print(f"Unknown format - first 12 bytes: {first_bytes}")
-                    
-                # Try to detect MP3 frame sync
-                f.seek(0)
-                data = f.read(1024)
-                for i in range(len(data) - 1):
-                    if data[i] == 0xFF and (data[i+1] & 0xE0) == 0xE0:
-                        print(f"Found MP3 frame sync at offset {i}")
-                        break
-                else:
-                    print("No MP3 frame sync found in first 1024 bytes")
-            
-            print("Sending to OpenAI Whisper...")
-            
-            # Try direct transcription first
-            try:
-                with open(audio_path, 'rb') as audio_file:
-                    response = openai_client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        response_format="text"
-                    )
-            except Exception as transcribe_error:
-                print(f"Direct transcription failed: {transcribe_error}")
-                
-                # Try converting to WAV format if MoviePy is available
-                if VideoFileClip:
-                    try:
-                        print("Attempting format conversion with MoviePy...")
-                        from moviepy.editor import AudioFileClip
-                        
-                        # Create temporary WAV file
-                        wav_temp = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-                        wav_temp.close()
-                        
-                        # Convert to WAV
-                        audio_clip = AudioFileClip(audio_path)
-                        audio_clip.write_audiofile(wav_temp.name, verbose=False, logger=None)
-                        audio_clip.close()
-                        
-                        print(f"Converted to WAV: {wav_temp.name}")
-                        
-                        # Try transcription with converted file
-                        with open(wav_temp.name, 'rb') as wav_file:
-                            response = openai_client.audio.transcriptions.create(
-                                model="whisper-1",
-                                file=wav_file,
-                                response_format="text"
-                            )
-                        
-                        # Clean up converted file
-                        os.unlink(wav_temp.name)
-                        print("Format conversion successful, transcription completed")
-                        
-                    except Exception as convert_error:
-                        print(f"Format conversion failed: {convert_error}")
-                        if 'wav_temp' in locals() and os.path.exists(wav_temp.name):
-                            os.unlink(wav_temp.name)
-                        raise transcribe_error  # Re-raise original error
-                else:
-                    print("MoviePy not available for format conversion")
-                    raise transcribe_error  # Re-raise original error
-                
-            print(f"Transcription successful: {len(response) if response else 0} characters")
-                
-            # Clean up temp file if we downloaded it
-            if audio_url_or_path.startswith('http'):
-                os.unlink(audio_path)
-                
-            return response
+            get_media_probe_cache().forget(key)
+            return 'remuxed'
+    except Exception as e:
+        print(f"ffmpeg fast-start remux error for {key}: {e}")
+        return None
+
+# Audio preprocessing for Whisper - 16 kHz mono in a compact codec
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_PREPROCESS = os.environ.get('WHISPER_PREPROCESS', 'true').lower() == 'true'
+WHISPER_AUDIO_BITRATE = os.environ.get('WHISPER_AUDIO_BITRATE', '24k')
+
+@functools.lru_cache(maxsize=None)
+def get_ffmpeg_binary():
+    """ffmpeg from FFMPEG_BINARY, the imageio-ffmpeg build, or PATH"""
+    if os.environ.get('FFMPEG_BINARY'):
+        return os.environ['FFMPEG_BINARY']
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return shutil.which('ffmpeg') or 'ffmpeg'
+
+# Media worker pool - ffmpeg runs as niced child processes, MEDIA_WORKERS at a time and in
+# priority order, so encodes can't starve request threads. Callers beyond
+# MEDIA_QUEUE_SIZE waiting are rejected with MediaQueueFull.
+MEDIA_WORKERS = int(os.environ.get('MEDIA_WORKERS', max((os.cpu_count() or 2) // 2, 1)))
+MEDIA_QUEUE_SIZE = int(os.environ.get('MEDIA_QUEUE_SIZE', 32))
+MEDIA_TASK_CPU_SECONDS = int(os.environ.get('MEDIA_TASK_CPU_SECONDS', 1800))  # RLIMIT_CPU per task
+MEDIA_TASK_NICE = int(os.environ.get('MEDIA_TASK_NICE', 10))
+
+media_pool = MediaWorkerPool(MEDIA_WORKERS, MEDIA_QUEUE_SIZE, cpu_seconds=MEDIA_TASK_CPU_SECONDS, nice=MEDIA_TASK_NICE)
+
+def run_ffmpeg(args, timeout=600, input=None, priority=PRIORITY_NORMAL):
+    """Run ffmpeg quietly in the media pool; raises CalledProcessError with ffmpeg's stderr on failure
+
+    The wait for a worker slot counts against the timeout (and the deadline).
+    """
+    command = [get_ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y'] + args
+    if input is None:
+        command.insert(1, '-nostdin')
+    return media_pool.run(command, priority=priority, timeout=call_timeout(timeout), input=input)
+
+# Media metadata - container headers are parsed once per file and cached by a sampled hash,
+# with R2 keys as aliases so later stages can look metadata up instead of re-reading files
+MEDIA_PROBE_CACHE_SIZE = int(os.environ.get('MEDIA_PROBE_CACHE_SIZE', 256))
+
+@functools.lru_cache(maxsize=None)
+def get_media_probe_cache():
+    from media_probe import MediaProbeCache
+    return MediaProbeCache(max_entries=MEDIA_PROBE_CACHE_SIZE, ffmpeg_binary=get_ffmpeg_binary())
+
+def probe_media(source, alias=None):
+    """Container metadata for a path or seekable file object; None if it can't be read"""
+    try:
+        with trace_span('media.probe', alias=alias):
+            return get_media_probe_cache().probe(source, alias)
+    except Exception as e:
+        print(f"Media probe error: {e}")
+        return None
+
+def lookup_media(key_or_url):
+    """Cached metadata for an R2 key or public URL, without touching the file"""
+    return get_media_probe_cache().lookup(key_or_url.split('/')[-1])
+
+def format_duration(seconds):
+    return f"{int(seconds//60):02d}:{int(seconds%60):02d}"
+
+# Voice activity detection - trims silence before transcription using frame energy
+# and zero-crossing rate; internal silences shorter than VAD_MIN_SILENCE are kept
+VAD_ENABLED = os.environ.get('VAD_ENABLED', 'true').lower() == 'true'
+VAD_FRAME_MS = int(os.environ.get('VAD_FRAME_MS', 30))
+VAD_ENERGY_MARGIN_DB = float(os.environ.get('VAD_ENERGY_MARGIN_DB', 12))  # above the noise floor
+VAD_DYNAMIC_RANGE_DB = float(os.environ.get('VAD_DYNAMIC_RANGE_DB', 30))  # below loud speech is still speech
+VAD_MIN_ENERGY_DB = float(os.environ.get('VAD_MIN_ENERGY_DB', -55))  # dBFS
+VAD_UNVOICED_ZCR = float(os.environ.get('VAD_UNVOICED_ZCR', 0.25))
+VAD_PADDING = float(os.environ.get('VAD_PADDING', 0.25))  # seconds kept around speech
+VAD_MIN_SILENCE = float(os.environ.get('VAD_MIN_SILENCE', 1.0))  # seconds
+
+def decode_audio_pcm(audio_path, sample_rate=WHISPER_SAMPLE_RATE):
+    """Decode any audio/video file to mono float32 samples with ffmpeg"""
+    import numpy as np
+    result = run_ffmpeg(['-i', audio_path, '-vn', '-ac', '1', '-ar', str(sample_rate), '-f', 'f32le', 'pipe:1'])
+    return np.frombuffer(result.stdout, dtype='<f4')
+
+def encode_pcm_to_opus(samples, output_path, sample_rate=WHISPER_SAMPLE_RATE):
+    import numpy as np
+    run_ffmpeg([
+        '-f', 'f32le', '-ar', str(sample_rate), '-ac', '1', '-i', 'pipe:0',
+        '-c:a', 'libopus', '-b:a', WHISPER_AUDIO_BITRATE, '-application', 'voip',
+        output_path
+    ], input=np.asarray(samples, dtype='<f4').tobytes())
+
+def detect_speech_regions(samples, sample_rate=WHISPER_SAMPLE_RATE):
+    """Return [(start, end)] seconds of audio to keep
+
+    Frames are speech when their energy clears an adaptive threshold, or
+    when they are slightly quieter but have a high zero-crossing rate
+    (unvoiced consonants). Speech is padded by VAD_PADDING and gaps
+    shorter than VAD_MIN_SILENCE are bridged.
+    """
+    import numpy as np
+    frame_size = int(sample_rate * VAD_FRAME_MS / 1000)
+    frame_count = len(samples) // frame_size
+    if frame_count == 0:
+        return []
+    
+    frames = samples[:frame_count * frame_size].reshape(frame_count, frame_size)
+    energy_db = 20 * np.log10(np.sqrt(np.mean(np.square(frames), axis=1)) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    
+    noise_floor = np.percentile(energy_db, 10)
+    speech_level = np.percentile(energy_db, 95)
+    threshold = max(min(noise_floor + VAD_ENERGY_MARGIN_DB, speech_level - VAD_DYNAMIC_RANGE_DB), VAD_MIN_ENERGY_DB)
+    speech = (energy_db > threshold) | ((energy_db > threshold - 6) & (zcr > VAD_UNVOICED_ZCR))
+    
+    pad_frames = int(round(VAD_PADDING * 1000 / VAD_FRAME_MS))
+    if pad_frames:
+        speech = np.convolve(speech.astype(np.int32), np.ones(2 * pad_frames + 1, dtype=np.int32), mode='same') > 0
+    
+    edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return []
+    
+    # Bridge internal silences that are too short to be worth cutting
+    long_gaps = (starts[1:] - ends[:-1]) * VAD_FRAME_MS / 1000 >= VAD_MIN_SILENCE
+    starts = np.concatenate(([starts[0]], starts[1:][long_gaps]))
+    ends = np.concatenate((ends[:-1][long_gaps], [ends[-1]]))
+    
+    total = len(samples) / sample_rate
+    return [(float(start * frame_size / sample_rate), total if end == frame_count else float(end * frame_size / sample_rate))
+            for start, end in zip(starts, ends)]
+
+def trim_to_regions(samples, regions, sample_rate=WHISPER_SAMPLE_RATE):
+    """Concatenate the kept regions; returns (samples, offset_map)
+
+    offset_map entries map a position in the trimmed audio back to the
+    original: see restore_timestamp().
+    """
+    import numpy as np
+    pieces = []
+    offset_map = []
+    trimmed_time = 0.0
+    for start, end in regions:
+        piece = samples[int(start * sample_rate):int(end * sample_rate)]
+        pieces.append(piece)
+        offset_map.append({
+            'trimmed_start': round(trimmed_time, 3),
+            'original_start': round(start, 3),
+            'duration': round(len(piece) / sample_rate, 3)
+        })
+        trimmed_time += len(piece) / sample_rate
+    return np.concatenate(pieces), offset_map
+
+def whisper_transcript(response, offset_map=None):
+    """(text, segments) from a verbose_json Whisper response
+
+    Segment times are mapped back through the VAD offset map, so they are
+    positions in the original audio rather than the trimmed upload.
+    """
+    segments = []
+    for segment in getattr(response, 'segments', None) or []:
+        start = restore_timestamp(offset_map, segment.start)
+        # An end on a region boundary belongs to the region before it, not the next one
+        end = restore_timestamp(offset_map, max(segment.end - 0.001, segment.start)) + 0.001
+        segments.append({'start': round(start, 3), 'end': round(max(end, start), 3), 'text': segment.text.strip()})
+    return response.text, segments
+
+def restore_timestamp(offset_map, trimmed_seconds):
+    """Map a timestamp in VAD-trimmed audio back to the original audio"""
+    for segment in reversed(offset_map or []):
+        if trimmed_seconds >= segment['trimmed_start']:
+            return segment['original_start'] + min(trimmed_seconds - segment['trimmed_start'], segment['duration'])
+    return trimmed_seconds
+
+@traced('prepare_audio_for_whisper')
+def prepare_audio_for_whisper(audio_path):
+    """Resample to 16 kHz mono Opus for Whisper, trimming silence when VAD is on
+
+    Returns (path, vad_report). path is None when the original should be
+    sent instead (preprocessing disabled, ffmpeg failed, or no saving).
+    """
+    if not WHISPER_PREPROCESS:
+        return None, None
+    
+    scratch = current_scratch()
+    output = scratch.path('.ogg', os.path.getsize(audio_path))
+    vad_report = None
+    try:
+        if VAD_ENABLED:
+            samples = decode_audio_pcm(audio_path)
+            regions = detect_speech_regions(samples)
+            original_seconds = len(samples) / WHISPER_SAMPLE_RATE
+            if regions:
+                samples, offset_map = trim_to_regions(samples, regions)
+                trimmed_seconds = len(samples) / WHISPER_SAMPLE_RATE
+                vad_report = {
+                    'original_seconds': round(original_seconds, 2),
+                    'trimmed_seconds': round(trimmed_seconds, 2),
+                    'seconds_saved': round(original_seconds - trimmed_seconds, 2),
+                    'regions': len(regions),
+                    'offset_map': offset_map
+                }
+                print(f"VAD trimmed {vad_report['seconds_saved']}s of silence "
+                      f"({original_seconds:.1f}s -> {trimmed_seconds:.1f}s, {len(regions)} regions)")
+            else:
+                print("VAD found no speech, sending full audio")
+            encode_pcm_to_opus(samples, output)
+        else:
+            run_ffmpeg([
+                '-i', audio_path,
+                '-vn', '-ac', '1', '-ar', str(WHISPER_SAMPLE_RATE),
+                '-c:a', 'libopus', '-b:a', WHISPER_AUDIO_BITRATE, '-application', 'voip',
+                output
+            ])
+    except Exception as e:
+        print(f"Audio preprocessing failed, sending original file: {e}")
+        scratch.discard(output)
+        return None, None
+    
+    original_size = os.path.getsize(audio_path)
+    prepared_size = os.path.getsize(output)
+    span = _current_span.get()
+    if span:
+        span.set_attribute('original_bytes', original_size)
+        span.set_attribute('prepared_bytes', prepared_size)
+        if vad_report:
+            span.set_attribute('vad_seconds_saved', vad_report['seconds_saved'])
+    print(f"Preprocessed audio for Whisper: {original_size} -> {prepared_size} bytes")
+    
+    if prepared_size == 0 or (prepared_size >= original_size and not (vad_report and vad_report['seconds_saved'] > 0)):
+        scratch.discard(output)
+        return None, None
+    return output, vad_report
+
+class TranscriptExtractor:
+    def whisper_request(self, client, path):
+        """Whisper call under the OpenAI rate limiter; the file is reopened on each retry"""
+        def create():
+            with open(path, 'rb') as audio_file:
+                return client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=audio_file,
+                    response_format="verbose_json",
+                    timeout=call_timeout(WHISPER_TIMEOUT)
+                )
+        return call_with_rate_control('openai', create)
+
+    async def whisper_request_async(self, client, path):
+        async def create():
+            with open(path, 'rb') as audio_file:
+                return await client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=audio_file,
+                    response_format="verbose_json",
+                    timeout=call_timeout(WHISPER_TIMEOUT)
+                )
+        return await call_with_rate_control_async('openai', create)
+
+    @traced('whisper.transcribe_audio')
+    def transcribe_audio(self, audio_url_or_path):
+        try:
+            openai_client = get_openai_client()
+            if not openai_client:
+                print("OpenAI client not configured")
+                return None
+            
+            # Downloads and converted files live in the scratch job and go with it
+            with scratch_job() as scratch:
+                return self._transcribe_in_scratch(openai_client, scratch, audio_url_or_path)
         except Exception as e:
             print(f"Transcription error: {e}")
             import traceback
             traceback.print_exc()
             return None
 
-class ClaudeTranslator:
-    def translate_transcript(self, transcript, duration):
-        import json  # Import at function level to avoid scope issues
+    def _transcribe_in_scratch(self, openai_client, scratch, audio_url_or_path):
+        print(f"Starting transcription for: {audio_url_or_path}")
         
+        # If it's a URL, download first
+        if audio_url_or_path.startswith('http'):
+            # Download from R2 or extract filename from URL
+            filename = audio_url_or_path.split('/')[-1]
+            print(f"Downloading audio file: {filename}")
+            temp_path = download_file_from_r2(filename)
+            if not temp_path:
+                print("Failed to download audio file from R2")
+                return None
+            audio_path = temp_path
+            print(f"Downloaded to: {audio_path}")
+        else:
+            audio_path = audio_url_or_path
+        
+        # Check if file exists and is readable
+        if not os.path.exists(audio_path):
+            print(f"Audio file does not exist: {audio_path}")
+            return None
+            
+        file_size = os.path.getsize(audio_path)
+        print(f"Audio file size: {file_size} bytes")
+        
+        if file_size == 0:
+            print("Audio file is empty")
+            return None
+        
+        r2_key = audio_url_or_path.split('/')[-1] if audio_url_or_path.startswith('http') else None
+        info = probe_media(audio_path, alias=r2_key)
+        if info and info['format']:
+            audio_stream = next((st for st in info['streams'] if st.get('type') == 'audio'), {})
+            print(f"Detected: {info['format']} ({audio_stream.get('codec', 'unknown codec')}, "
+                  f"{audio_stream.get('sample_rate', '?')} Hz, {info['duration']}s)")
+        else:
+            print("Unknown audio container format")
+        
+        # Whisper works at 16 kHz mono, so send it a small, silence-trimmed file in that format
+        whisper_path, vad_report = prepare_audio_for_whisper(audio_path)
+        whisper_path = whisper_path or audio_path
+        workflow_state['vad'] = vad_report
+        
+        print("Sending to OpenAI Whisper...")
+        # Timestamps only need mapping back when Whisper heard the trimmed audio
+        offset_map = vad_report['offset_map'] if vad_report and whisper_path != audio_path else None
+        
+        # Try direct transcription first
         try:
-            if not claude_client:
-                print("Claude client not configured")
+            with trace_span('openai.whisper', bytes=os.path.getsize(whisper_path)):
+                response = self.whisper_request(openai_client, whisper_path)
+        except Exception as transcribe_error:
+            print(f"Direct transcription failed: {transcribe_error}")
+            response = self.transcribe_wav_fallback(openai_client, scratch, audio_path, info, transcribe_error)
+            offset_map = None  # the WAV is untrimmed
+        
+        transcript, workflow_state['transcriptTimings'] = whisper_transcript(response, offset_map)
+        print(f"Transcription successful: {len(transcript) if transcript else 0} characters")
+        return transcript
+
+    def transcribe_wav_fallback(self, openai_client, scratch, audio_path, info, transcribe_error):
+        """Convert to 16 kHz mono WAV and try Whisper once more; re-raises transcribe_error if that fails"""
+        try:
+            print("Attempting format conversion with ffmpeg...")
+            
+            # 16 kHz mono 16-bit WAV is 32 KB per second
+            info = info or probe_media(audio_path)
+            wav_size = int(info['duration'] * 32000) + 65536 if info and info['duration'] else os.path.getsize(audio_path) * 4
+            wav_path = scratch.path('.wav', wav_size)
+            
+            # Convert to 16 kHz mono WAV
+            with trace_span('ffmpeg.wav_fallback'):
+                run_ffmpeg(['-i', audio_path, '-vn', '-ac', '1', '-ar', str(WHISPER_SAMPLE_RATE), '-c:a', 'pcm_s16le', wav_path],
+                           priority=PRIORITY_INTERACTIVE)
+            
+            print(f"Converted to WAV: {wav_path}")
+            
+            # Try transcription with converted file
+            with trace_span('openai.whisper', fallback='wav'):
+                response = self.whisper_request(openai_client, wav_path)
+            
+            print("Format conversion successful, transcription completed")
+            return response
+            
+        except Exception as convert_error:
+            print(f"Format conversion failed: {convert_error}")
+            raise transcribe_error  # Re-raise original error
+
+    @traced('whisper.transcribe_audio_async')
+    async def transcribe_audio_async(self, audio_url_or_path):
+        """Async variant of transcribe_audio
+
+        The Whisper upload goes through AsyncOpenAI; if it fails, the WAV
+        conversion fallback runs in a worker thread, as in the sync path.
+        """
+        client = pipeline_engine.openai
+        if not client:
+            print("OpenAI client not configured")
+            return None
+        
+        # Worker threads started below inherit the scratch job
+        with scratch_job() as scratch:
+            if audio_url_or_path.startswith('http'):
+                filename = audio_url_or_path.split('/')[-1]
+                print(f"Downloading audio file: {filename}")
+                audio_path = await asyncio.to_thread(download_file_from_r2, filename)
+                if not audio_path:
+                    print("Failed to download audio file from R2")
+                    return None
+            else:
+                audio_path = audio_url_or_path
+            
+            if not os.path.exists(audio_path) or os.path.getsize(audio_path) == 0:
+                print(f"Audio file missing or empty: {audio_path}")
                 return None
-                
-            prompt = f"""
+            
+            whisper_path, vad_report = await asyncio.to_thread(prepare_audio_for_whisper, audio_path)
+            whisper_path = whisper_path or audio_path
+            workflow_state['vad'] = vad_report
+            offset_map = vad_report['offset_map'] if vad_report and whisper_path != audio_path else None
+            try:
+                with trace_span('openai.whisper', bytes=os.path.getsize(whisper_path)):
+                    response = await self.whisper_request_async(client, whisper_path)
+            except Exception as transcribe_error:
+                print(f"Async transcription failed: {transcribe_error}, retrying with format conversion")
+                try:
+                    response = await asyncio.to_thread(self.transcribe_wav_fallback, get_openai_client(), scratch,
+                                                       audio_path, None, transcribe_error)
+                except Exception as e:
+                    print(f"Transcription error: {e}")
+                    return None  # as the sync path returns
+                offset_map = None
+            
+            transcript, workflow_state['transcriptTimings'] = whisper_transcript(response, offset_map)
+            print(f"Transcription successful: {len(transcript) if transcript else 0} characters")
+            return transcript
+
+class ClaudeTranslator:
+    def build_prompt(self, transcript, duration):
+        return f"""
             Translate this {duration}-second video transcript into Hindi, Tamil, Gujarati, and Telugu with modern, casual speech patterns:
 
             Original: {transcript}
             Video Duration: {duration} seconds
+{self.build_requirements(duration)}
+            Return only valid JSON:
+            {{"hindi": "हिंदी में", "tamil": "தமிழில்", "gujarati": "ગુજરાતીમાં", "telugu": "తెలుగులో"}}
+            """
 
+    def build_requirements(self, duration):
+        return f"""
             Requirements:
             1. Use native scripts only - Hindi in Devanagari, Tamil in Tamil script, Telugu in Telugu script, Gujarati in Gujarati script
             2. NO romanized text or English letters in the output
@@ -383,48 +1881,110 @@ class ClaudeTranslator:
             - Tamil: Chennai urban casual style with natural English mixing
             - Telugu: Hyderabad casual style with contemporary expressions
             - Gujarati: Urban Gujarati casual speech with business community expressions
+            """
 
-            Return only valid JSON:
-            {{"hindi": "हिंदी में", "tamil": "தமிழில்", "gujarati": "ગુજરાતીમાં", "telugu": "తెలుగులో"}}
+    def build_segment_prompt(self, segments, targets, context, duration):
+        """Prompt for translating only the target segments, with translated neighbours as context"""
+        context_lines = '\n'.join(
+            f'            [{i}] {json.dumps(segments[i]["text"], ensure_ascii=False)} -> {json.dumps(context[i], ensure_ascii=False)}'
+            for i in sorted(context)
+        )
+        target_json = json.dumps({str(i): segments[i]['text'] for i in targets}, ensure_ascii=False)
+        return f"""
+            Translate these segments of a {duration}-second video transcript into Hindi, Tamil, Gujarati, and Telugu with modern, casual speech patterns.
+            Each translation must fit the speaking time of its own source segment.
+{self.build_requirements(duration)}
+            Already translated neighbouring segments (context only, keep your wording consistent with them and do not return them):
+{context_lines or '            (none)'}
+
+            Segments to translate, by id:
+            {target_json}
+
+            Return only valid JSON mapping every id above to its translations:
+            {{"0": {{"hindi": "हिंदी में", "tamil": "தமிழில்", "gujarati": "ગુજરાતીમાં", "telugu": "తెలుగులో"}}}}
             """
+
+    def parse_response(self, response):
+        print(f"Claude API response received, content length: {len(response.content[0].text) if response.content else 0}")
+        print(f"Raw response: {response.content[0].text[:500]}...")  # First 500 chars
+        
+        # Parse JSON response
+        response_text = response.content[0].text.strip()
+        
+        # Try to extract JSON if it's wrapped in markdown
+        if response_text.startswith('```json'):
+            response_text = response_text.split('```json')[1].split('```')[0].strip()
+        elif response_text.startswith('```'):
+            response_text = response_text.split('```')[1].strip()
+        
+        print(f"Cleaned response for JSON parsing: {response_text[:200]}...")
+        
+        # Try to find JSON even if there's extra text
+        if '{' in response_text and '}' in response_text:
+            start = response_text.find('{')
+            end = response_text.rfind('}') + 1
+            json_part = response_text[start:end]
+            print(f"Extracted JSON part: {json_part[:200]}...")
+            translations = json.loads(json_part)
+        else:
+            translations = json.loads(response_text)
             
-            print("Sending request to Claude API...")
-            response = claude_client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=4000,
-                messages=[{"role": "user", "content": prompt}]
-            )
+        print(f"Successfully parsed translations: {list(translations.keys())}")
+        return translations
+
+    @traced('claude.translate_transcript')
+    def translate_transcript(self, transcript, duration):
+        try:
+            claude_client = get_claude_client()
+            if not claude_client:
+                print("Claude client not configured")
+                return None
+                
+            prompt = self.build_prompt(transcript, duration)
             
-            print(f"Claude API response received, content length: {len(response.content[0].text) if response.content else 0}")
-            print(f"Raw response: {response.content[0].text[:500]}...")  # First 500 chars
+            print("Sending request to Claude API...")
+            with trace_span('anthropic.messages', model="claude-sonnet-4-20250514"):
+                response = call_with_rate_control('anthropic', lambda: claude_client.messages.create(
+                    model="claude-sonnet-4-20250514",
+                    max_tokens=4000,
+                    messages=[{"role": "user", "content": prompt}],
+                    timeout=call_timeout(CLAUDE_TIMEOUT)
+                ))
             
-            # Parse JSON response
-            response_text = response.content[0].text.strip()
+            return self.parse_response(response)
             
-            # Try to extract JSON if it's wrapped in markdown
-            if response_text.startswith('```json'):
-                response_text = response_text.split('```json')[1].split('```')[0].strip()
-            elif response_text.startswith('```'):
-                response_text = response_text.split('```')[1].strip()
+        except json.JSONDecodeError as json_error:
+            print(f"JSON parsing error: {json_error}")
+            print(f"Response text: {response.content[0].text if 'response' in locals() else 'No response'}")
+            return None
+        except Exception as e:
+            print(f"Translation error: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    @traced('claude.translate_transcript_async')
+    async def translate_transcript_async(self, transcript, duration):
+        """Async variant of translate_transcript using the engine's AsyncAnthropic client"""
+        try:
+            client = pipeline_engine.claude
+            if not client:
+                print("Claude client not configured")
+                return None
             
-            print(f"Cleaned response for JSON parsing: {response_text[:200]}...")
+            print("Sending async request to Claude API...")
+            with trace_span('anthropic.messages', model="claude-sonnet-4-20250514"):
+                response = await call_with_rate_control_async('anthropic', lambda: client.messages.create(
+                    model="claude-sonnet-4-20250514",
+                    max_tokens=4000,
+                    messages=[{"role": "user", "content": self.build_prompt(transcript, duration)}],
+                    timeout=call_timeout(CLAUDE_TIMEOUT)
+                ))
             
-            # Try to find JSON even if there's extra text
-            if '{' in response_text and '}' in response_text:
-                start = response_text.find('{')
-                end = response_text.rfind('}') + 1
-                json_part = response_text[start:end]
-                print(f"Extracted JSON part: {json_part[:200]}...")
-                translations = json.loads(json_part)
-            else:
-                translations = json.loads(response_text)
-                
-            print(f"Successfully parsed translations: {list(translations.keys())}")
-            return translations
+            return self.parse_response(response)
             
         except json.JSONDecodeError as json_error:
             print(f"JSON parsing error: {json_error}")
-            print(f"Response text: {response.content[0].text if 'response' in locals() else 'No response'}")
             return None
         except Exception as e:
             print(f"Translation error: {e}")
@@ -432,53 +1992,1019 @@ class ClaudeTranslator:
             traceback.print_exc()
             return None
 
+    @traced('claude.translate_incremental')
+    async def translate_incremental_async(self, segments, duration):
+        """Translate only segments without a cached translation (plus their neighbours)
+
+        Returns (translations, report), or (None, None) if Claude's answer doesn't
+        cover every requested segment, so the caller can fall back to a full translation.
+        """
+        client = pipeline_engine.claude
+        if not client:
+            print("Claude client not configured")
+            return None, None
+        
+        cache = workflow_state['segmentTranslations']
+        cached = [cache.get(text_hash(segment['text'])) for segment in segments]
+        missing = {i for i, entry in enumerate(cached) if entry is None}
+        targets = sorted({j for i in missing for j in (i - 1, i, i + 1) if 0 <= j < len(segments)})
+        context = {
+            j: cached[j] for i in targets
+            for j in range(i - TRANSLATE_CONTEXT_SEGMENTS, i + TRANSLATE_CONTEXT_SEGMENTS + 1)
+            if 0 <= j < len(segments) and j not in targets and cached[j]
+        }
+        report = {'segments': len(segments), 'translated': len(targets), 'reused': len(segments) - len(targets)}
+        
+        if targets:
+            print(f"Translating {len(targets)} of {len(segments)} transcript segments")
+            try:
+                with trace_span('anthropic.messages', model="claude-sonnet-4-20250514", segments=len(targets)):
+                    prompt = self.build_segment_prompt(segments, targets, context, duration)
+                    response = await call_with_rate_control_async('anthropic', lambda: client.messages.create(
+                        model="claude-sonnet-4-20250514",
+                        max_tokens=8000,
+                        messages=[{"role": "user", "content": prompt}],
+                        timeout=call_timeout(CLAUDE_TIMEOUT)
+                    ))
+                result = self.parse_response(response)
+            except Exception as e:
+                print(f"Segment translation error: {e}")
+                return None, None
+            
+            for i in targets:
+                entry = result.get(str(i)) if isinstance(result, dict) else None
+                if not isinstance(entry, dict) or not all(entry.get(lang) for lang in TRANSLATION_LANGUAGES):
+                    print(f"Segment {i} missing from Claude response")
+                    return None, None
+                cached[i] = cache[text_hash(segments[i]['text'])] = {lang: entry[lang] for lang in TRANSLATION_LANGUAGES}
+        
+        translations = {
+            lang: ''.join(cached[i][lang].strip() + segment['sep'] for i, segment in enumerate(segments)).strip()
+            for lang in TRANSLATION_LANGUAGES
+        }
+        return translations, report
+
+# Streaming TTS - audio is read from ElevenLabs' /stream endpoint and piped into an
+# R2 multipart upload as it arrives. With TTS_PREVIEW on, the same chunks are also
+# served progressively at /api/tts-preview/<language> while synthesis runs.
+TTS_STREAMING = os.environ.get('TTS_STREAMING', 'true').lower() == 'true'
+TTS_PREVIEW = os.environ.get('TTS_PREVIEW', 'false').lower() == 'true'
+TTS_STREAM_CHUNK_SIZE = 64 * 1024
+
+class TTSPreviewStream:
+    """Chunks of one in-progress synthesis, readable by any number of listeners"""
+    def __init__(self, language):
+        self.language = language
+        self.chunks = []
+        self.done = False
+        self.failed = False
+        self.condition = threading.Condition()
+
+    def append(self, chunk):
+        with self.condition:
+            self.chunks.append(chunk)
+            self.condition.notify_all()
+
+    def close(self, failed=False):
+        with self.condition:
+            self.done = True
+            self.failed = failed
+            self.condition.notify_all()
+
+    def iter_chunks(self, idle_timeout=60):
+        index = 0
+        while True:
+            with self.condition:
+                if index >= len(self.chunks) and not self.done:
+                    self.condition.wait(idle_timeout)
+                pending = self.chunks[index:]
+            if not pending:
+                return  # finished, or idle past the timeout
+            index += len(pending)
+            yield from pending
+
+# In-progress previews by language; entries are dropped once synthesis ends
+tts_previews = {}
+
+# Segmented TTS - long scripts are split into sentence-sized segments, synthesized
+# concurrently (within the ElevenLabs rate limiter's concurrency, across languages)
+# and joined locally with fixed gaps. A failed segment is retried on its own.
+TTS_SEGMENTED = os.environ.get('TTS_SEGMENTED', 'true').lower() == 'true'
+TTS_SEGMENT_MAX_CHARS = int(os.environ.get('TTS_SEGMENT_MAX_CHARS', 400))
+TTS_SEGMENT_RETRIES = int(os.environ.get('TTS_SEGMENT_RETRIES', 3))
+TTS_SENTENCE_GAP_MS = int(os.environ.get('TTS_SENTENCE_GAP_MS', 250))
+TTS_PARAGRAPH_GAP_MS = int(os.environ.get('TTS_PARAGRAPH_GAP_MS', 600))
+TTS_SAMPLE_RATE = 44100
+TTS_AUDIO_BITRATE = '128k'
+TTS_EDGE_SILENCE_DB = -50  # segment edges quieter than this are trimmed before gaps are added
+
+_SENTENCE_END = re.compile(r'(?<=[.!?\u0964\u0965])\s+')  # includes the Devanagari danda
+_CLAUSE_END = re.compile(r'(?<=[,;:\u2014])\s+')
+
+def split_tts_segments(text, max_chars=TTS_SEGMENT_MAX_CHARS):
+    """Split a script into [{'text', 'gap_after'}] segments of at most max_chars
+
+    Short sentences are merged up to max_chars; over-long sentences are split
+    at clause punctuation, then at spaces. gap_after is in seconds.
+    """
+    segments = []
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n|\n', text) if p.strip()]
+    for paragraph in paragraphs:
+        pieces = []
+        for sentence in _SENTENCE_END.split(paragraph):
+            while len(sentence) > max_chars:
+                cut = max((m.end() for m in _CLAUSE_END.finditer(sentence, 0, max_chars)), default=0) \
+                    or sentence.rfind(' ', 0, max_chars) + 1 or max_chars
+                pieces.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+        
+        current = ''
+        for piece in pieces:
+            if current and len(current) + 1 + len(piece) > max_chars:
+                segments.append({'text': current, 'gap_after': TTS_SENTENCE_GAP_MS / 1000})
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+        if current:
+            segments.append({'text': current, 'gap_after': TTS_PARAGRAPH_GAP_MS / 1000})
+    if segments:
+        segments[-1]['gap_after'] = 0
+    return segments
+
+def diff_segments(old_texts, new_texts):
+    """Indexes of new_texts that are not unchanged segments of old_texts"""
+    matcher = difflib.SequenceMatcher(a=old_texts, b=new_texts, autojunk=False)
+    changed = []
+    for tag, _, _, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            changed.extend(range(j1, j2))
+    return changed
+
+def record_translations(translations):
+    """Store translations and return per-language segment changes vs the previous version"""
+    changes = {}
+    for language, text in translations.items():
+        texts = [segment['text'] for segment in split_tts_segments(text or '')]
+        previous = workflow_state['translationSegments'].get(language, [])
+        changes[language] = {'segments': len(texts), 'changed': diff_segments(previous, texts)}
+        workflow_state['translationSegments'][language] = texts
+    workflow_state['translations'].update(translations)
+    return changes
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+# Transcript versions - each saved transcript is kept as sentence segments and diffed
+# against the previous version; translations are cached per source segment so an edit
+# only re-translates the changed segments and their neighbours
+TRANSLATION_LANGUAGES = ['hindi', 'tamil', 'gujarati', 'telugu']
+TRANSLATE_INCREMENTAL = os.environ.get('TRANSLATE_INCREMENTAL', 'true').lower() == 'true'
+TRANSLATE_CONTEXT_SEGMENTS = int(os.environ.get('TRANSLATE_CONTEXT_SEGMENTS', 2))
+TRANSCRIPT_MAX_VERSIONS = int(os.environ.get('TRANSCRIPT_MAX_VERSIONS', 20))
+
+def split_transcript_segments(transcript):
+    """Sentences of a transcript as [{'text', 'sep'}], sep being what followed the sentence"""
+    segments = []
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', transcript) if p.strip()]
+    for paragraph in paragraphs:
+        for sentence in _SENTENCE_END.split(paragraph):
+            if sentence.strip():
+                segments.append({'text': sentence.strip(), 'sep': ' '})
+        if segments:
+            segments[-1]['sep'] = '\n\n'
+    return segments
+
+def record_transcript(transcript):
+    """Store a transcript version unless it matches the latest; returns the latest version"""
+    versions = workflow_state['transcriptVersions']
+    segments = split_transcript_segments(transcript)
+    texts = [segment['text'] for segment in segments]
+    if versions and [segment['text'] for segment in versions[-1]['segments']] == texts:
+        workflow_state['transcript'] = transcript
+        return versions[-1]
+    
+    previous = [segment['text'] for segment in versions[-1]['segments']] if versions else []
+    version = {
+        'version': versions[-1]['version'] + 1 if versions else 1,
+        'segments': segments,
+        'changed': diff_segments(previous, texts),
+        'savedAt': datetime.now().isoformat()
+    }
+    versions.append(version)
+    del versions[:-TRANSCRIPT_MAX_VERSIONS]
+    workflow_state['transcript'] = transcript
+    return version
+
+# Synthesized segment audio, keyed by voice, model, settings and text, so re-synthesis
+# after an edit only calls ElevenLabs for segments whose text changed. Neighbouring
+# text (previous_text/next_text) is deliberately not part of the key.
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', os.path.join(upload_dir, 'tts-segments'))
+TTS_CACHE_MAX_BYTES = int(os.environ.get('TTS_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+class SegmentAudioCache:
+    """MP3 bytes per segment key on local disk, evicting least recently used files"""
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.mp3')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            os.utime(self._path(key))
+            return data
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        temp_path = f'{self._path(key)}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        with self.lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.mp3'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                except OSError:
+                    pass
+
+tts_segment_cache = SegmentAudioCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES)
+
+def trim_edge_silence(samples, threshold_db=TTS_EDGE_SILENCE_DB):
+    """Drop leading and trailing samples quieter than threshold_db (dBFS)"""
+    import numpy as np
+    loud = np.flatnonzero(np.abs(samples) > 10 ** (threshold_db / 20))
+    if not len(loud):
+        return samples[:0]
+    return samples[loud[0]:loud[-1] + 1]
+
+def join_tts_segments(segment_samples, gaps, sample_rate=TTS_SAMPLE_RATE):
+    """Concatenate decoded segments with gaps (seconds) of silence and encode as MP3"""
+    import numpy as np
+    parts = []
+    for samples, gap in zip(segment_samples, gaps):
+        parts.append(samples)
+        if gap:
+            parts.append(np.zeros(int(gap * sample_rate), dtype='<f4'))
+    track = np.concatenate(parts) if parts else np.zeros(0, dtype='<f4')
+    result = run_ffmpeg([
+        '-f', 'f32le', '-ar', str(sample_rate), '-ac', '1', '-i', 'pipe:0',
+        '-c:a', 'libmp3lame', '-b:a', TTS_AUDIO_BITRATE, '-f', 'mp3', 'pipe:1'
+    ], input=track.astype('<f4').tobytes())
+    return result.stdout, len(track) / sample_rate
+
 class ElevenLabsTTS:
+    def build_request(self, text, stream=False, previous_text=None, next_text=None, speed=None):
+        # Using Niharika voice for both Hindi and Tamil
+        voice_id = "mUpPaC2sgPs3LFRd9XC7"  # Niharika cloned voice
+        
+        url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+        if stream:
+            url += "/stream"
+        headers = {
+            "Accept": "audio/mpeg",
+            "Content-Type": "application/json",
+            "xi-api-key": ELEVENLABS_API_KEY
+        }
+        
+        data = {
+            "text": text,
+            "model_id": "eleven_multilingual_v2",
+            "voice_settings": {
+                "stability": 0.5,
+                "similarity_boost": 0.5
+            }
+        }
+        # Neighbouring segments keep prosody continuous across segment boundaries
+        if previous_text:
+            data["previous_text"] = previous_text
+        if next_text:
+            data["next_text"] = next_text
+        if speed:
+            data["voice_settings"]["speed"] = speed
+        return url, headers, data
+
+    def open_stream(self, language):
+        """R2 writer (and preview, if enabled) for one streamed synthesis"""
+        writer = R2StreamWriter(unique_r2_filename(f"{language}_audio.mp3"), content_type="audio/mpeg")
+        preview = None
+        if TTS_PREVIEW:
+            preview = tts_previews[language] = TTSPreviewStream(language)
+        return writer, preview
+
+    def close_stream(self, preview, failed=False):
+        if preview:
+            preview.close(failed)
+            if tts_previews.get(preview.language) is preview:
+                del tts_previews[preview.language]
+
+    @traced('tts.text_to_speech')
     def text_to_speech(self, text, language):
+        # Scripts longer than one segment are synthesized as concurrent, cached segments, so
+        # streaming only serves single-segment texts, where time to first audio is what counts
+        if TTS_SEGMENTED and len(split_tts_segments(text)) > 1:
+            return pipeline_engine.run(self.text_to_speech_segmented(text, language))
+        if TTS_STREAMING:
+            return self.text_to_speech_streaming(text, language)
+        try:
+            url, headers, data = self.build_request(text)
+            
+            with trace_span('elevenlabs.tts', language=language, characters=len(text)) as span:
+                response = call_with_rate_control('elevenlabs', lambda: requests.post(url, json=data, headers=headers, timeout=call_timeout(120)))
+                span.set_attribute('http.status_code', response.status_code)
+            if response.status_code == 200:
+                # Upload audio to R2 instead of saving locally
+                filename = f"{language}_audio.mp3"
+                audio_url, r2_filename = upload_bytes_to_r2(
+                    response.content, 
+                    filename, 
+                    content_type="audio/mpeg"
+                )
+                return audio_url, r2_filename
+            return None, None
+        except Exception as e:
+            print(f"TTS error: {e}")
+            return None, None
+
+    def text_to_speech_streaming(self, text, language):
+        """Stream audio from ElevenLabs straight into an R2 multipart upload"""
+        url, headers, data = self.build_request(text, stream=True)
+        writer, preview = self.open_stream(language)
+        try:
+            with trace_span('elevenlabs.tts_stream', language=language, characters=len(text)) as span:
+                started = time.time()
+                limiter = rate_limiters['elevenlabs']
+                # Throttling, 5xx and connection failures are retried as in call_with_rate_control,
+                # but only until the first byte has gone to the preview and the R2 upload
+                for attempt in range(RATE_RETRY_ATTEMPTS):
+                    if attempt:
+                        delay = backoff_delay(attempt)
+                        check_deadline(delay)
+                        time.sleep(delay)
+                    try:
+                        with limiter.slot() as slot, requests.post(url, json=data, headers=headers, stream=True, timeout=call_timeout(120)) as response:
+                            span.set_attribute('http.status_code', response.status_code)
+                            status, retry_after = response_feedback(response)
+                            slot.record(status, retry_after)
+                            if should_retry(status, None, attempt, RATE_RETRY_ATTEMPTS):
+                                print(f"elevenlabs answered {status}, retrying")
+                                continue
+                            if status != 200:
+                                print(f"TTS API error for {language}: {status} - {response.text[:200]}")
+                                self.close_stream(preview, failed=True)
+                                return None, None
+                            for chunk in response.iter_content(chunk_size=TTS_STREAM_CHUNK_SIZE):
+                                if not writer.bytes_written:
+                                    span.set_attribute('first_chunk_ms', round((time.time() - started) * 1000, 1))
+                                if preview:
+                                    preview.append(chunk)
+                                if writer.write(chunk):
+                                    writer.flush()
+                        break
+                    except Exception as e:
+                        if writer.bytes_written or not should_retry(response_feedback(error=e)[0], e, attempt, RATE_RETRY_ATTEMPTS):
+                            raise
+                        print(f"elevenlabs stream failed ({type(e).__name__}), retrying")
+                span.set_attribute('bytes', writer.bytes_written)
+            audio_url = writer.close()
+            self.close_stream(preview)
+            return (audio_url, writer.key) if audio_url else (None, None)
+        except Exception as e:
+            print(f"TTS streaming error: {e}")
+            writer.abort()
+            self.close_stream(preview, failed=True)
+            return None, None
+
+    @traced('tts.text_to_speech_async')
+    async def text_to_speech_async(self, text, language, speed=None):
+        """Async variant of text_to_speech on the engine's httpx client"""
+        if TTS_SEGMENTED and len(split_tts_segments(text)) > 1:
+            return await self.text_to_speech_segmented(text, language, speed)
+        if TTS_STREAMING:
+            return await self.text_to_speech_streaming_async(text, language, speed)
+        try:
+            url, headers, data = self.build_request(text, speed=speed)
+            
+            with trace_span('elevenlabs.tts', language=language, characters=len(text)) as span:
+                response = await call_with_rate_control_async('elevenlabs', lambda: pipeline_engine.http.post(
+                    url, json=data, headers=headers, timeout=call_timeout(120)))
+                span.set_attribute('http.status_code', response.status_code)
+            if response.status_code == 200:
+                filename = f"{language}_audio.mp3"
+                return await asyncio.to_thread(upload_bytes_to_r2, response.content, filename, "audio/mpeg")
+            print(f"TTS API error for {language}: {response.status_code} - {response.text[:200]}")
+            return None, None
+        except Exception as e:
+            print(f"TTS error: {e}")
+            return None, None
+
+    async def text_to_speech_streaming_async(self, text, language, speed=None):
+        """Async streaming variant; R2 part uploads run on worker threads"""
+        url, headers, data = self.build_request(text, stream=True, speed=speed)
+        writer, preview = self.open_stream(language)
+        try:
+            with trace_span('elevenlabs.tts_stream', language=language, characters=len(text)) as span:
+                started = time.time()
+                limiter = rate_limiters['elevenlabs']
+                # Retried like call_with_rate_control_async until the first byte is written
+                for attempt in range(RATE_RETRY_ATTEMPTS):
+                    if attempt:
+                        delay = backoff_delay(attempt)
+                        check_deadline(delay)
+                        await asyncio.sleep(delay)
+                    try:
+                        async with limiter.slot_async() as slot, pipeline_engine.http.stream('POST', url, json=data, headers=headers, timeout=call_timeout(120)) as response:
+                            span.set_attribute('http.status_code', response.status_code)
+                            status, retry_after = response_feedback(response)
+                            slot.record(status, retry_after)
+                            if should_retry(status, None, attempt, RATE_RETRY_ATTEMPTS):
+                                print(f"elevenlabs answered {status}, retrying")
+                                continue
+                            if status != 200:
+                                body = await response.aread()
+                                print(f"TTS API error for {language}: {status} - {body[:200]}")
+                                self.close_stream(preview, failed=True)
+                                return None, None
+                            async for chunk in response.aiter_bytes(TTS_STREAM_CHUNK_SIZE):
+                                if not writer.bytes_written:
+                                    span.set_attribute('first_chunk_ms', round((time.time() - started) * 1000, 1))
+                                if preview:
+                                    preview.append(chunk)
+                                if writer.write(chunk):
+                                    await asyncio.to_thread(writer.flush)
+                        break
+                    except Exception as e:
+                        if writer.bytes_written or not should_retry(response_feedback(error=e)[0], e, attempt, RATE_RETRY_ATTEMPTS):
+                            raise
+                        print(f"elevenlabs stream failed ({type(e).__name__}), retrying")
+                span.set_attribute('bytes', writer.bytes_written)
+            audio_url = await asyncio.to_thread(writer.close)
+            self.close_stream(preview)
+            return (audio_url, writer.key) if audio_url else (None, None)
+        except Exception as e:
+            print(f"TTS streaming error: {e}")
+            await asyncio.to_thread(writer.abort)
+            self.close_stream(preview, failed=True)
+            return None, None
+
+    def segment_cache_key(self, text, speed=None):
+        url, _, data = self.build_request(text, speed=speed)
+        return text_hash(url + json.dumps(data, sort_keys=True))
+
+    async def synthesize_segment(self, text, language, index, previous_text=None, next_text=None, speed=None):
+        """MP3 bytes for one segment; throttling and 5xx answers are retried by the rate limiter"""
+        url, headers, data = self.build_request(text, previous_text=previous_text, next_text=next_text, speed=speed)
         try:
-            # Using Niharika voice for both Hindi and Tamil
-            voice_id = "mUpPaC2sgPs3LFRd9XC7"  # Niharika cloned voice
-            
-            url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": ELEVENLABS_API_KEY
+            with trace_span('elevenlabs.tts_segment', language=language, segment=index, characters=len(text)) as span:
+                response = await call_with_rate_control_async('elevenlabs', lambda: pipeline_engine.http.post(
+                    url, json=data, headers=headers, timeout=call_timeout(120)), attempts=TTS_SEGMENT_RETRIES)
+                span.set_attribute('http.status_code', response.status_code)
+        except Exception as e:
+            print(f"TTS segment {index} ({language}) error: {e}")
+            return None
+        if response.status_code != 200:
+            print(f"TTS segment {index} ({language}) error: {response.status_code} - {response.text[:200]}")
+            return None
+        await asyncio.to_thread(tts_segment_cache.put, self.segment_cache_key(text, speed), response.content)
+        return response.content
+
+    @traced('tts.text_to_speech_segmented')
+    async def text_to_speech_segmented(self, text, language, speed=None):
+        """Synthesize sentence segments concurrently and join them into one track"""
+        segments = split_tts_segments(text)
+        texts = [segment['text'] for segment in segments]
+        audio = [tts_segment_cache.get(self.segment_cache_key(t, speed)) for t in texts]
+        missing = [i for i, data in enumerate(audio) if data is None]
+        print(f"Synthesizing {language}: {len(missing)} of {len(segments)} segments (rest cached)")
+        workflow_state['ttsSegments'][language] = {
+            'total': len(segments), 'reused': len(segments) - len(missing), 'synthesized': len(missing)
+        }
+        
+        synthesized = await asyncio.gather(*(
+            self.synthesize_segment(texts[i], language, i,
+                                    previous_text=texts[i - 1] if i else None,
+                                    next_text=texts[i + 1] if i + 1 < len(texts) else None,
+                                    speed=speed)
+            for i in missing
+        ))
+        for i, data in zip(missing, synthesized):
+            audio[i] = data
+        failed = [i for i, data in enumerate(audio) if data is None]
+        if failed:
+            print(f"TTS failed for {language} segments {failed}")
+            return None, None
+        
+        def assemble():
+            samples = []
+            with scratch_job() as scratch:
+                for data in audio:
+                    segment_path = scratch.path('.mp3', len(data))
+                    with open(segment_path, 'wb') as segment_file:
+                        segment_file.write(data)
+                    samples.append(trim_edge_silence(decode_audio_pcm(segment_path, TTS_SAMPLE_RATE)))
+                    scratch.discard(segment_path)
+            track, duration = join_tts_segments(samples, [segment['gap_after'] for segment in segments])
+            print(f"{language} track assembled: {len(segments)} segments, {duration:.1f}s")
+            return upload_bytes_to_r2(track, f"{language}_audio.mp3", content_type="audio/mpeg")
+        
+        with trace_span('tts.assemble', language=language, segments=len(segments)):
+            return await asyncio.to_thread(assemble)
+
+# Duration fitting - after TTS, each track is measured against the video and
+# time-stretched with ffmpeg's pitch-preserving atempo filter when the difference
+# is within bounds; larger differences re-synthesize once at an adjusted voice speed
+DURATION_FIT_ENABLED = os.environ.get('DURATION_FIT_ENABLED', 'true').lower() == 'true'
+DURATION_FIT_TOLERANCE = float(os.environ.get('DURATION_FIT_TOLERANCE', 0.03))  # fraction left as is
+DURATION_FIT_MIN_TEMPO = float(os.environ.get('DURATION_FIT_MIN_TEMPO', 0.9))   # slow down by at most 10%
+DURATION_FIT_MAX_TEMPO = float(os.environ.get('DURATION_FIT_MAX_TEMPO', 1.15))  # speed up by at most 15%
+TTS_MIN_SPEED, TTS_MAX_SPEED = 0.7, 1.2  # ElevenLabs voice_settings.speed range
+
+def parse_duration(value):
+    """Seconds from an 'MM:SS' string (or a number); None if it can't be parsed"""
+    try:
+        if isinstance(value, (int, float)):
+            return float(value)
+        seconds = 0.0
+        for part in str(value).split(':'):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    except (TypeError, ValueError):
+        return None
+
+def video_duration_seconds():
+    """Exact video length from the probe cache, else the stored 'MM:SS' duration"""
+    info = lookup_media(workflow_state['videoFile']) if workflow_state.get('videoFile') else None
+    if info and info['duration']:
+        return info['duration']
+    return parse_duration(workflow_state.get('videoDuration'))
+
+def atempo_filter(tempo):
+    """atempo chain for a tempo factor (each stage is limited to 0.5-2.0 on older ffmpeg builds)"""
+    stages = []
+    while tempo > 2.0:
+        stages.append(2.0)
+        tempo /= 2.0
+    while tempo < 0.5:
+        stages.append(0.5)
+        tempo /= 0.5
+    stages.append(tempo)
+    return ','.join(f'atempo={stage:.5f}' for stage in stages)
+
+@traced('tts.fit_duration')
+def fit_audio_duration(audio_url, target_seconds, language):
+    """Stretch a track in R2 towards target_seconds
+
+    Returns a report with status 'fitted' (already within tolerance), 'stretched'
+    (a new track was uploaded), 'out_of_bounds' (needs re-synthesis) or 'error'.
+    """
+    key = audio_url.split('/')[-1]
+    try:
+        with scratch_job():
+            local_path = download_file_from_r2(key)
+            if not local_path:
+                return {'status': 'error', 'audioFile': audio_url}
+            info = probe_media(local_path, alias=key)
+            duration = info['duration'] if info else None
+            if not duration:
+                return {'status': 'error', 'audioFile': audio_url}
+            
+            tempo = duration / target_seconds
+            report = {'audioFile': audio_url, 'duration': duration, 'target': round(target_seconds, 3), 'tempo': round(tempo, 4)}
+            if abs(tempo - 1) <= DURATION_FIT_TOLERANCE:
+                return dict(report, status='fitted')
+            if not DURATION_FIT_MIN_TEMPO <= tempo <= DURATION_FIT_MAX_TEMPO:
+                return dict(report, status='out_of_bounds')
+            
+            with trace_span('ffmpeg.atempo', language=language, tempo=round(tempo, 4)):
+                result = run_ffmpeg(['-i', local_path, '-vn', '-filter:a', atempo_filter(tempo),
+                                     '-c:a', 'libmp3lame', '-b:a', TTS_AUDIO_BITRATE, '-f', 'mp3', 'pipe:1'])
+        fitted_url, fitted_key = upload_bytes_to_r2(result.stdout, f"{language}_audio_fitted.mp3", content_type="audio/mpeg")
+        if not fitted_url:
+            return dict(report, status='error')
+        print(f"{language} track stretched by {tempo:.3f}x to fit {target_seconds:.1f}s")
+        return dict(report, status='stretched', audioFile=fitted_url, duration=round(duration / tempo, 3))
+    except Exception as e:
+        print(f"Duration fitting error for {language}: {e}")
+        return {'status': 'error', 'audioFile': audio_url}
+
+async def fit_tts_track(text, language, audio_url, target_seconds):
+    """Fit a synthesized track to the video, re-synthesizing once if stretching isn't enough"""
+    report = await asyncio.to_thread(fit_audio_duration, audio_url, target_seconds, language)
+    if report['status'] != 'out_of_bounds':
+        return report
+    
+    # ElevenLabs speed scales speaking rate roughly linearly, so ask for the whole correction
+    speed = min(max(report['tempo'], TTS_MIN_SPEED), TTS_MAX_SPEED)
+    print(f"{language} track is {report['duration']}s for a {report['target']}s video, re-synthesizing at speed {speed:.2f}")
+    audio_url, _ = await tts.text_to_speech_async(text, language, speed=round(speed, 2))
+    if not audio_url:
+        return report
+    retry = await asyncio.to_thread(fit_audio_duration, audio_url, target_seconds, language)
+    retry['resynthesized_speed'] = round(speed, 2)
+    return retry
+
+# Lip sync proxies - Sync.so render time and upload size grow with resolution and length,
+# so it gets a proxy: capped resolution and frame rate, trimmed to the dubbed audio and
+# (optionally) cut down to the regions where someone speaks in the original or the dub.
+# The lip-synced proxy is spliced back over the full-quality original locally.
+LIP_SYNC_PROXY = os.environ.get('LIP_SYNC_PROXY', 'true').lower() == 'true'
+LIP_SYNC_PROXY_HEIGHT = int(os.environ.get('LIP_SYNC_PROXY_HEIGHT', 720))
+LIP_SYNC_PROXY_FPS = float(os.environ.get('LIP_SYNC_PROXY_FPS', 25))
+LIP_SYNC_SEGMENTS = os.environ.get('LIP_SYNC_SEGMENTS', 'true').lower() == 'true'
+LIP_SYNC_SEGMENT_MERGE_GAP = float(os.environ.get('LIP_SYNC_SEGMENT_MERGE_GAP', 1.5))  # seconds
+LIP_SYNC_SEGMENT_MAX_COVERAGE = 0.85  # above this share of the clip, segmenting isn't worth it
+LIP_SYNC_SPLICE_CRF = int(os.environ.get('LIP_SYNC_SPLICE_CRF', 18))
+
+def merge_regions(regions, gap, limit):
+    """Sort, clip to [0, limit] and join regions closer than gap seconds"""
+    merged = []
+    for start, end in sorted(regions):
+        start, end = max(start, 0.0), min(end, limit)
+        if end <= start:
+            continue
+        if merged and start - merged[-1][1] < gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return [(round(start, 3), round(end, 3)) for start, end in merged]
+
+def lip_sync_regions(audio_path, duration):
+    """Regions of the clip that need lip sync: speech in the dub or in the original
+
+    The original's speech comes from the VAD map recorded at transcription
+    (the transcript itself has no timestamps). Returns [(0, duration)] when
+    segmenting is off or would not save much.
+    """
+    whole = [(0.0, round(duration, 3))]
+    if not LIP_SYNC_SEGMENTS:
+        return whole
+    regions = detect_speech_regions(decode_audio_pcm(audio_path))
+    vad_report = workflow_state.get('vad') or {}
+    regions += [(entry['original_start'], entry['original_start'] + entry['duration'])
+                for entry in vad_report.get('offset_map', [])]
+    regions = merge_regions(regions, LIP_SYNC_SEGMENT_MERGE_GAP, duration)
+    if not regions or sum(end - start for start, end in regions) > LIP_SYNC_SEGMENT_MAX_COVERAGE * duration:
+        return whole
+    return regions
+
+def concat_filter(stream, regions, video=True):
+    """filter_complex chain cutting regions out of `stream` and joining them"""
+    trim, setpts = ('trim', 'setpts') if video else ('atrim', 'asetpts')
+    chains = [f"[{stream}]{trim}=start={start}:end={end},{setpts}=PTS-STARTPTS[p{i}]" for i, (start, end) in enumerate(regions)]
+    inputs = ''.join(f"[p{i}]" for i in range(len(regions)))
+    return ';'.join(chains + [f"{inputs}concat=n={len(regions)}:v={int(video)}:a={int(not video)}"])
+
+@traced('lip_sync.build_proxy')
+def build_lip_sync_proxy(video_url, audio_url, language):
+    """Proxy video/audio for Sync.so and the plan to splice its output back
+
+    Returns (video_url, audio_url, plan); plan is None (and the originals are
+    returned) when no proxy is needed or it can't be built.
+    """
+    try:
+        with scratch_job() as scratch:
+            video_path = download_file_from_r2(video_url.split('/')[-1])
+            audio_path = download_file_from_r2(audio_url.split('/')[-1])
+            if not video_path or not audio_path:
+                return video_url, audio_url, None
+            video_info = probe_media(video_path, alias=video_url.split('/')[-1])
+            audio_info = probe_media(audio_path, alias=audio_url.split('/')[-1])
+            stream = next((st for st in (video_info or {}).get('streams', []) if st.get('type') == 'video'), None)
+            if not stream or not video_info['duration'] or not (audio_info and audio_info['duration']):
+                return video_url, audio_url, None
+            
+            source_duration = video_info['duration']
+            duration = min(source_duration, audio_info['duration'])
+            frame_rate = stream.get('frame_rate') or LIP_SYNC_PROXY_FPS
+            regions = lip_sync_regions(audio_path, duration)
+            downscale = stream.get('height', 0) > LIP_SYNC_PROXY_HEIGHT or frame_rate > LIP_SYNC_PROXY_FPS
+            if not downscale and regions == [(0.0, round(duration, 3))] and source_duration - duration < 0.1:
+                return video_url, audio_url, None
+            
+            video_filter = concat_filter('0:v', regions) + f",scale=-2:'min(ih,{LIP_SYNC_PROXY_HEIGHT})'"
+            if frame_rate > LIP_SYNC_PROXY_FPS:
+                video_filter += f",fps={LIP_SYNC_PROXY_FPS:g}"
+            proxy_video = scratch.path('.mp4', os.path.getsize(video_path))
+            proxy_audio = scratch.path('.mp3', os.path.getsize(audio_path))
+            with trace_span('ffmpeg.lip_sync_proxy', language=language, regions=len(regions)):
+                run_ffmpeg(['-i', video_path, '-filter_complex', video_filter + ',format=yuv420p[v]', '-map', '[v]', '-an',
+                            '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23', '-movflags', '+faststart', proxy_video],
+                           priority=PRIORITY_BATCH)
+                run_ffmpeg(['-i', audio_path, '-filter_complex', concat_filter('0:a', regions, video=False) + '[a]', '-map', '[a]',
+                            '-c:a', 'libmp3lame', '-b:a', TTS_AUDIO_BITRATE, proxy_audio], priority=PRIORITY_BATCH)
+            with open(proxy_video, 'rb') as f:
+                proxy_video_url, _ = upload_file_to_r2(f, f"lipsync_proxy_{language}.mp4", 'video/mp4')
+            with open(proxy_audio, 'rb') as f:
+                proxy_audio_url, _ = upload_file_to_r2(f, f"lipsync_proxy_{language}.mp3", 'audio/mpeg')
+            if not proxy_video_url or not proxy_audio_url:
+                return video_url, audio_url, None
+            
+            plan = {
+                'source_video': video_url,
+                'audio': audio_url,
+                'regions': regions,
+                'source_duration': source_duration,
+                'width': stream.get('width'),
+                'height': stream.get('height'),
+                'frame_rate': frame_rate,
+                'proxy_video': proxy_video_url,
+                'proxy_audio': proxy_audio_url,
+                'proxy_seconds': round(sum(end - start for start, end in regions), 3),
+                'proxy_bytes': os.path.getsize(proxy_video),
+                'source_bytes': os.path.getsize(video_path)
             }
+            print(f"{language} lip sync proxy: {plan['proxy_seconds']}s of {source_duration:.1f}s in {len(regions)} regions, "
+                  f"{plan['proxy_bytes']} bytes (source {plan['source_bytes']})")
+            return proxy_video_url, proxy_audio_url, plan
+    except Exception as e:
+        print(f"Lip sync proxy error for {language}, submitting the original: {e}")
+        return video_url, audio_url, None
+
+@traced('lip_sync.splice')
+def splice_lip_sync_output(synced_key, plan, output_key):
+    """Splice a lip-synced proxy back over the full-quality original
+
+    Speech regions come from the synced proxy (scaled back up), everything
+    else from the original; the dubbed track is the audio. Returns the
+    public URL of the result, or None.
+    """
+    paths = {}
+    try:
+        with scratch_job() as scratch:
+            for name, key in (('source', plan['source_video'].split('/')[-1]), ('synced', synced_key), ('audio', plan['audio'].split('/')[-1])):
+                paths[name] = download_file_from_r2(key)
+                if not paths[name]:
+                    return None
+            
+            # Timeline of (input, start, end): original between regions, synced proxy inside them
+            pieces, cursor, position = [], 0.0, 0.0
+            for start, end in plan['regions']:
+                if start - cursor > 0.001:
+                    pieces.append((0, cursor, start))
+                pieces.append((1, position, position + end - start))
+                position += end - start
+                cursor = end
+            if plan['source_duration'] - cursor > 0.001:
+                pieces.append((0, cursor, plan['source_duration']))
+            
+            size = f"{plan['width']}:{plan['height']}" if plan.get('width') else '-2:-2'
+            chains = [f"[{source}:v]trim=start={start}:end={end},setpts=PTS-STARTPTS,scale={size},setsar=1,fps={plan['frame_rate']:g}[p{i}]"
+                      for i, (source, start, end) in enumerate(pieces)]
+            inputs = ''.join(f"[p{i}]" for i in range(len(pieces)))
+            filter_graph = ';'.join(chains + [f"{inputs}concat=n={len(pieces)}:v=1:a=0,format=yuv420p[v]"])
+            output = scratch.path('.mp4', os.path.getsize(paths['source']) + os.path.getsize(paths['synced']))
+            with trace_span('ffmpeg.lip_sync_splice', pieces=len(pieces)):
+                run_ffmpeg(['-i', paths['source'], '-i', paths['synced'], '-i', paths['audio'], '-filter_complex', filter_graph,
+                            '-map', '[v]', '-map', '2:a:0', '-c:v', 'libx264', '-preset', 'veryfast', '-crf', str(LIP_SYNC_SPLICE_CRF),
+                            '-c:a', 'aac', '-b:a', DUB_AUDIO_BITRATE, '-movflags', '+faststart', output], priority=PRIORITY_BATCH)
+            with open(output, 'rb') as f:
+                public_url, _ = upload_file_to_r2(f, output_key, 'video/mp4', simple_name=True)
+            return public_url
+    except subprocess.CalledProcessError as e:
+        print(f"Lip sync splice ffmpeg error: {e.stderr.decode(errors='replace')[-500:]}")
+        return None
+    except Exception as e:
+        print(f"Lip sync splice error: {e}")
+        return None
+
+# Sync.so submissions are deduplicated through the job ledger, and each accepted job is
+# polled in the background until it finishes so its outcome survives the browser tab
+LIP_SYNC_WATCH_INTERVAL = int(os.environ.get('LIP_SYNC_WATCH_INTERVAL', 30))
+LIP_SYNC_SUBMIT_GRACE = 120  # a pending submit younger than this is assumed still in progress
+# Finished videos are copied from Sync.so's URL into R2, so downloads come from our bucket
+LIP_SYNC_INGEST = os.environ.get('LIP_SYNC_INGEST', 'true').lower() == 'true'
+LIP_SYNC_INGEST_CHUNK_SIZE = 1024 * 1024
+SYNCSO_TERMINAL_STATUSES = {'COMPLETED': 'completed', 'FAILED': 'failed', 'REJECTED': 'failed',
+                            'CANCELED': 'cancelled', 'CANCELLED': 'cancelled'}
+
+class Wav2LipSync:
+    def build_request(self, video_url, audio_url, language):
+        # New Sync.so API format - uses URLs not file uploads
+        url = "https://api.sync.so/v2/generate"
+        headers = {
+            "x-api-key": WAV2LIP_API_KEY,
+            "Content-Type": "application/json"
+        }
+        
+        # Use R2 URLs directly instead of uploading files
+        request_data = {
+            "input": [
+                {"type": "video", "url": video_url},
+                {"type": "audio", "url": audio_url}
+            ],
+            "model": "lipsync-2",
+            "options": {"sync_mode": "cut_off"},
+            "outputFileName": f"lipsync_{language}"
+        }
+        return url, headers, request_data
+
+    def parse_submit_response(self, response):
+        print(f"Sync.so API response: status={response.status_code}")
+        print(f"Response content: {response.text}")
+        
+        if response.status_code == 200 or response.status_code == 201:
+            result = response.json()
+            print(f"Lip sync job submitted successfully: {result}")
+            job_id = result.get('id') or result.get('job_id') or result.get('jobId')
             
-            data = {
-                "text": text,
-                "model_id": "eleven_multilingual_v2",
-                "voice_settings": {
-                    "stability": 0.5,
-                    "similarity_boost": 0.5
+            if job_id:
+                # Return job info for polling - don't wait here
+                return {
+                    'status': 'submitted',
+                    'job_id': job_id,
+                    'message': 'Job submitted successfully. Use job_id to check status.',
+                    'estimated_time': '3-5 minutes',
+                    'poll_url': f"/api/check-lip-sync-status/{job_id}"
                 }
+            else:
+                return {
+                    'status': 'submitted',
+                    'result': result,
+                    'message': 'Job submitted but no job_id returned'
+                }
+        elif response.status_code == 429:
+            # Still throttled after the rate limiter's retries
+            return {
+                'status': 'failed',
+                'error': 'Rate limit exceeded. Please wait a few minutes and try again.',
+                'retry_after': response_feedback(response)[1] or 120
             }
-            
-            response = requests.post(url, json=data, headers=headers)
-            if response.status_code == 200:
-                # Upload audio to R2 instead of saving locally
-                filename = f"{language}_audio.mp3"
-                audio_url, r2_filename = upload_bytes_to_r2(
-                    response.content, 
-                    filename, 
-                    content_type="audio/mpeg"
-                )
-                return audio_url, r2_filename
-            return None, None
+        else:
+            return {
+                'status': 'failed',
+                'error': f'API error {response.status_code}: {response.text}'
+            }
+
+    def claim_submission(self, video_url, audio_url, language):
+        """Ledger row for a Sync.so submission, keyed by its inputs
+
+        Returns (row, previous): previous is the earlier submission's result
+        when the same video, audio and language were already accepted.
+        """
+        inputs = {'video_url': video_url, 'audio_url': audio_url, 'language': language}
+        ledger = get_job_ledger()
+        row, created = ledger.begin('lip_sync.submit', inputs, key=idempotency_key('lip_sync.submit', inputs),
+                                    project_id=workflow_state.get('projectId'), provider='syncso', status='pending')
+        if created:
+            return row, None
+        if row['status'] in ('submitted', 'completed') and row['provider_job_id']:
+            print(f"{language} lip sync already submitted as {row['provider_job_id']}, not resubmitting")
+            return row, {**(row['outputs'] or {}), 'status': row['status'], 'job_id': row['provider_job_id'], 'reused': True}
+        if row['status'] == 'pending' and row['owner'] == process_owner() and time.time() - row['updated_at'] < LIP_SYNC_SUBMIT_GRACE:
+            return row, {'status': 'pending', 'message': f'A {language} lip sync submission is already in progress'}
+        return ledger.restart(row['job_id'], status='pending'), None
+
+    def record_submission(self, row, result, proxy=None):
+        """Store the submit outcome (and Sync.so job ID) on the ledger row, then watch the job"""
+        if result.get('job_id'):
+            outputs = dict(result, proxy=proxy) if proxy else result  # the splice plan travels with the job
+            get_job_ledger().update(row['job_id'], status='submitted', provider_job_id=result['job_id'], outputs=outputs)
+            watch_lip_sync_job(result['job_id'])
+        else:
+            get_job_ledger().update(row['job_id'], status='failed', outputs=result, error=result.get('error'))
+        return result
+
+    def record_status(self, job_id, payload):
+        """Copy a finished Sync.so status onto the ledger; returns the ledger status"""
+        row = get_job_ledger().find_provider_job('syncso', job_id)
+        if not row:
+            return None
+        status = SYNCSO_TERMINAL_STATUSES.get(str(payload.get('status')).upper()) if payload.get('success') else None
+        if not status or row['status'] == status:
+            return row['status']
+        result = payload.get('result') or {}
+        outputs = {
+            **(row['outputs'] or {}),
+            'status': status,
+            'output_url': result.get('outputUrl') or result.get('output_url') or result.get('download_url'),
+            'result': result
+        }
+        get_job_ledger().update(row['job_id'], status=status, outputs=outputs,
+                                error=None if status == 'completed' else result.get('error') or f"Sync.so job {status}")
+        ingesting = status == 'completed' and outputs['output_url'] and LIP_SYNC_INGEST
+        if ingesting:
+            ingest_lip_sync_output(row['job_id'])
+        publish_event('lip_sync', language=row['inputs']['language'], job_id=job_id,
+                      status='ingesting' if ingesting else status,
+                      output_url=None if ingesting else outputs['output_url'], error=result.get('error'))
+        return status
+
+    async def ingest_output(self, ledger_job_id):
+        """Stream a finished Sync.so video into R2 and register it as an artifact
+
+        The body goes straight from the provider's URL into multipart parts,
+        so at most one part is held in memory. Returns the R2 URL.
+        """
+        ledger = get_job_ledger()
+        row = await asyncio.to_thread(ledger.get, ledger_job_id)
+        outputs = row['outputs'] or {}
+        if outputs.get('r2_url'):
+            return outputs['r2_url']
+        source_url = outputs['output_url']
+        language = row['inputs']['language']
+        final_key = f"lipsync_{language}_{row['provider_job_id']}.mp4"
+        proxy = outputs.get('proxy')
+        writer = R2StreamWriter(final_key.replace('.mp4', '_proxy.mp4') if proxy else final_key, 'video/mp4')
+        try:
+            with trace_span('syncso.ingest', language=language, job_id=row['provider_job_id']) as span:
+                async with pipeline_engine.http.stream('GET', source_url, timeout=call_timeout(120), follow_redirects=True) as response:
+                    span.set_attribute('http.status_code', response.status_code)
+                    response.raise_for_status()
+                    writer.content_type = response.headers.get('content-type', 'video/mp4').split(';')[0]
+                    expected = int(response.headers.get('content-length') or 0)
+                    async for chunk in response.aiter_bytes(LIP_SYNC_INGEST_CHUNK_SIZE):
+                        if writer.write(chunk):
+                            await asyncio.to_thread(writer.flush)
+                if expected and writer.bytes_written != expected:
+                    raise IOError(f"Truncated download: {writer.bytes_written} of {expected} bytes")
+                span.set_attribute('bytes', writer.bytes_written)
+                r2_url = await asyncio.to_thread(writer.close)
+            if not r2_url:
+                raise IOError('R2 upload failed')
         except Exception as e:
-            print(f"TTS error: {e}")
-            return None, None
+            print(f"Lip sync ingest error for {language}: {e}")
+            await asyncio.to_thread(writer.abort)
+            await asyncio.to_thread(ledger.update, ledger_job_id, outputs={**outputs, 'ingest_error': str(e)})
+            # The provider's copy is still downloadable
+            publish_event('lip_sync', language=language, job_id=row['provider_job_id'], status='completed',
+                          output_url=source_url, error=f"Ingest failed: {e}")
+            return None
+        
+        key, size, fast_start = writer.key, writer.bytes_written, None
+        if proxy:
+            # Sync.so rendered the proxy; the deliverable is the original with its speech regions replaced
+            spliced_url = await asyncio.to_thread(splice_lip_sync_output, writer.key, proxy, final_key)
+            if spliced_url:
+                r2_url, key, fast_start = spliced_url, final_key, 'already'  # written with +faststart
+                head = await asyncio.to_thread(head_object_r2, key)
+                size = head['ContentLength'] if head else None
+            else:
+                outputs = {**outputs, 'splice_error': 'Splice failed, serving the lip-synced proxy'}
+        if FASTSTART_ENABLED and not fast_start and writer.content_type in ('video/mp4', 'video/quicktime'):
+            fast_start = await asyncio.to_thread(make_faststart_r2, key, writer.content_type)
+            if fast_start == 'remuxed':
+                head = await asyncio.to_thread(head_object_r2, key)
+                size = head['ContentLength'] if head else size
+        await asyncio.to_thread(ledger.add_artifact, key, 'lip_sync_video', r2_url, job_id=ledger_job_id,
+                                project_id=row['project_id'], source_url=source_url, content_type=writer.content_type,
+                                size=size, metadata={'language': language, 'fast_start': fast_start, 'proxy': bool(proxy)})
+        outputs = {**outputs, 'r2_url': r2_url, 'r2_key': key, 'provider_output_url': source_url,
+                   'output_url': r2_url, 'fast_start': fast_start}
+        outputs.pop('ingest_error', None)
+        await asyncio.to_thread(ledger.update, ledger_job_id, outputs=outputs)
+        publish_event('lip_sync', language=language, job_id=row['provider_job_id'], status='completed', output_url=r2_url)
+        print(f"{language} lip sync video stored in R2: {r2_url} ({size} bytes)")
+        return r2_url
 
-class Wav2LipSync:
+    async def watch_job(self, job_id):
+        """Poll a submitted Sync.so job until it finishes, keeping the ledger current"""
+        while True:
+            payload, _ = await self.check_status_async(job_id)
+            status = await asyncio.to_thread(self.record_status, job_id, payload)
+            if status != 'submitted':
+                return status
+            await asyncio.sleep(LIP_SYNC_WATCH_INTERVAL)
+
+    @traced('lip_sync.sync_video_with_audio')
     def sync_video_with_audio(self, video_url, audio_url, language):
+        row, previous = self.claim_submission(video_url, audio_url, language)
+        if previous:
+            return previous
+        proxy = None
+        if LIP_SYNC_PROXY:
+            video_url, audio_url, proxy = build_lip_sync_proxy(video_url, audio_url, language)
+        return self.record_submission(row, self.submit(video_url, audio_url, language), proxy)
+
+    def submit(self, video_url, audio_url, language):
         try:
             print(f"Starting lip sync for {language}: video={video_url}, audio={audio_url}")
             
             # Test if URLs are publicly accessible
             print("Testing URL accessibility...")
             try:
-                video_test = requests.head(video_url, timeout=10)
-                audio_test = requests.head(audio_url, timeout=10)
+                with trace_span('http.head', url='video'):
+                    video_test = requests.head(video_url, timeout=call_timeout(10))
+                with trace_span('http.head', url='audio'):
+                    audio_test = requests.head(audio_url, timeout=call_timeout(10))
                 print(f"Video URL test: {video_test.status_code}")
                 print(f"Audio URL test: {audio_test.status_code}")
                 
@@ -526,98 +3052,87 @@ class Wav2LipSync:
                         'error': 'Could not create presigned URLs for API access'
                     }
             
-            # New Sync.so API format - uses URLs not file uploads
-            url = "https://api.sync.so/v2/generate"
-            headers = {
-                "x-api-key": WAV2LIP_API_KEY,
-                "Content-Type": "application/json"
-            }
+            url, headers, request_data = self.build_request(video_url, audio_url, language)
             
             print("Sending lip sync request to Sync.so API...")
+            print(f"Request data: {request_data}")
+            
+            # Throttling (honoring Retry-After) and retries are handled by the Sync.so rate limiter
+            try:
+                with trace_span('syncso.submit', language=language) as span:
+                    response = call_with_rate_control('syncso', lambda: requests.post(url, headers=headers, json=request_data, timeout=call_timeout(60)))
+                    span.set_attribute('http.status_code', response.status_code)
+            except requests.exceptions.RequestException as e:
+                print(f"Request failed for {language}: {e}")
+                return {
+                    'status': 'failed',
+                    'error': f'Network error: {str(e)}'
+                }
             
-            # Use R2 URLs directly instead of uploading files
-            request_data = {
-                "input": [
-                    {"type": "video", "url": video_url},
-                    {"type": "audio", "url": audio_url}
-                ],
-                "model": "lipsync-2",
-                "options": {"sync_mode": "cut_off"},
-                "outputFileName": f"lipsync_{language}"
+            return self.parse_submit_response(response)
+        except Exception as e:
+            print(f"Lip sync error: {e}")
+            import traceback
+            traceback.print_exc()
+            return {
+                'status': 'failed',
+                'error': str(e)
             }
+
+    @traced('lip_sync.sync_video_with_audio_async')
+    async def sync_video_with_audio_async(self, video_url, audio_url, language):
+        """Async variant of sync_video_with_audio on the engine's httpx client"""
+        row, previous = await asyncio.to_thread(self.claim_submission, video_url, audio_url, language)
+        if previous:
+            return previous
+        proxy = None
+        if LIP_SYNC_PROXY:
+            video_url, audio_url, proxy = await asyncio.to_thread(build_lip_sync_proxy, video_url, audio_url, language)
+        result = await self.submit_async(video_url, audio_url, language)
+        return await asyncio.to_thread(self.record_submission, row, result, proxy)
+
+    async def submit_async(self, video_url, audio_url, language):
+        try:
+            print(f"Starting async lip sync for {language}: video={video_url}, audio={audio_url}")
+            http = pipeline_engine.http
             
-            print(f"Request data: {request_data}")
+            try:
+                with trace_span('http.head', url='video+audio'):
+                    video_test, audio_test = await asyncio.gather(
+                        http.head(video_url, timeout=call_timeout(10)),
+                        http.head(audio_url, timeout=call_timeout(10))
+                    )
+            except Exception as url_error:
+                print(f"URL accessibility test failed: {url_error}")
+                return {
+                    'status': 'failed',
+                    'error': f'URL accessibility test failed: {str(url_error)}'
+                }
             
-            # Implement retry logic with exponential backoff for rate limiting
-            max_retries = 5
-            retry_delay = 30  # Start with 30 seconds for rate limits
+            for kind, test in (('Video', video_test), ('Audio', audio_test)):
+                if test.status_code != 200:
+                    print(f"{kind} URL not accessible: {test.status_code}")
+                    return {
+                        'status': 'failed',
+                        'error': f'{kind} URL not publicly accessible: {test.status_code}'
+                    }
             
-            for attempt in range(max_retries):
-                try:
-                    response = requests.post(url, headers=headers, json=request_data)
-                    
-                    if response.status_code == 429:
-                        if attempt < max_retries - 1:
-                            wait_time = retry_delay * (2 ** attempt)  # Exponential backoff: 30s, 60s, 120s, 240s, 480s
-                            print(f"Rate limit hit (429) for {language}, attempt {attempt + 1}/{max_retries}, waiting {wait_time}s...")
-                            time.sleep(wait_time)
-                            continue
-                        else:
-                            return {
-                                'status': 'failed',
-                                'error': 'Rate limit exceeded. Please wait a few minutes and try again.',
-                                'retry_after': wait_time
-                            }
-                    
-                    print(f"Sync.so API response: status={response.status_code}")
-                    print(f"Response content: {response.text}")
-                    
-                    if response.status_code == 200 or response.status_code == 201:
-                        result = response.json()
-                        print(f"Lip sync job submitted successfully: {result}")
-                        job_id = result.get('id') or result.get('job_id') or result.get('jobId')
-                        
-                        if job_id:
-                            # Return job info for polling - don't wait here
-                            return {
-                                'status': 'submitted',
-                                'job_id': job_id,
-                                'message': 'Job submitted successfully. Use job_id to check status.',
-                                'estimated_time': '3-5 minutes',
-                                'poll_url': f"/api/check-lip-sync-status/{job_id}"
-                            }
-                        else:
-                            return {
-                                'status': 'submitted',
-                                'result': result,
-                                'message': 'Job submitted but no job_id returned'
-                            }
-                    elif response.status_code == 429:
-                        # Handle 429 even on first attempt with longer wait
-                        return {
-                            'status': 'failed',
-                            'error': 'Rate limit exceeded. Please wait a few minutes and try again.',
-                            'retry_after': 120
-                        }
-                    else:
-                        return {
-                            'status': 'failed',
-                            'error': f'API error {response.status_code}: {response.text}'
-                        }
-                        
-                except requests.exceptions.RequestException as e:
-                    print(f"Request failed for {language}: {e}")
-                    if attempt == max_retries - 1:
-                        return {
-                            'status': 'failed',
-                            'error': f'Network error: {str(e)}'
-                        }
-                    time.sleep(retry_delay * (2 ** attempt))
-                print(f"Wav2Lip API error: {response.status_code} - {response.text}")
+            url, headers, request_data = self.build_request(video_url, audio_url, language)
+            print(f"Sending async lip sync request to Sync.so API for {language}...")
+            
+            try:
+                with trace_span('syncso.submit', language=language) as span:
+                    response = await call_with_rate_control_async('syncso', lambda: http.post(
+                        url, headers=headers, json=request_data, timeout=call_timeout(60)))
+                    span.set_attribute('http.status_code', response.status_code)
+            except Exception as e:
+                print(f"Request failed for {language}: {e}")
                 return {
                     'status': 'failed',
-                    'error': f"API error {response.status_code}: {response.text}"
+                    'error': f'Network error: {str(e)}'
                 }
+            
+            return self.parse_submit_response(response)
         except Exception as e:
             print(f"Lip sync error: {e}")
             import traceback
@@ -627,37 +3142,856 @@ class Wav2LipSync:
                 'error': str(e)
             }
 
-# Initialize modules
-transcript_extractor = TranscriptExtractor()
-translator = ClaudeTranslator()
-tts = ElevenLabsTTS()
-lip_sync = Wav2LipSync()
+    async def check_status_async(self, job_id):
+        """Query every known Sync.so status endpoint concurrently
+
+        Returns (payload, http_status) using the same precedence as the
+        sequential check: the first endpoint in order that answers 200 wins,
+        404s are skipped and any other status is reported.
+        """
+        headers = {
+            "x-api-key": WAV2LIP_API_KEY
+        }
+        
+        # Try different possible status endpoints
+        possible_urls = [
+            f"https://api.sync.so/v2/generate/{job_id}",
+            f"https://api.sync.so/v2/jobs/{job_id}",
+            f"https://api.sync.so/v2/status/{job_id}",
+            f"https://api.sync.so/generate/{job_id}"
+        ]
+        
+        async def fetch(url):
+            with trace_span('syncso.poll', job_id=job_id, url=url) as span:
+                async with rate_limiters['syncso'].slot_async() as slot:
+                    response = await pipeline_engine.http.get(url, headers=headers, timeout=call_timeout(30))
+                    slot.record(*response_feedback(response))
+                span.set_attribute('http.status_code', response.status_code)
+                return response
+        
+        responses = await asyncio.gather(*(fetch(url) for url in possible_urls), return_exceptions=True)
+        
+        for url, response in zip(possible_urls, responses):
+            if isinstance(response, Exception) or response.status_code == 404:
+                continue  # Try next endpoint
+            if response.status_code == 200:
+                result = response.json()
+                status = result.get('status', 'unknown')
+                return {
+                    'success': True,
+                    'job_id': job_id,
+                    'status': status,
+                    'result': result,
+                    'endpoint_used': url,
+                    'message': f'Job status: {status}'
+                }, 200
+            return {
+                'success': False,
+                'job_id': job_id,
+                'error': f'Status check failed: {response.status_code} - {response.text}',
+                'endpoint_used': url
+            }, 200
+        
+        return {
+            'success': False,
+            'job_id': job_id,
+            'error': 'Could not find working status endpoint',
+            'tried_endpoints': possible_urls
+        }, 404
+
+# Dub-only output - the original video stream is remuxed once with every dubbed language
+# as its own tagged audio track (video stream-copied, audio encoded to AAC), optionally
+# packaged as HLS/DASH with alternate audio renditions. One ffmpeg pass per format
+# instead of a Sync.so render per language.
+DUB_FORMATS = ('mp4', 'hls', 'dash')
+DUB_SEGMENT_SECONDS = int(os.environ.get('DUB_SEGMENT_SECONDS', 6))
+DUB_INCLUDE_ORIGINAL = os.environ.get('DUB_INCLUDE_ORIGINAL', 'true').lower() == 'true'  # keep the source audio as a track
+DUB_AUDIO_BITRATE = '128k'
+LANGUAGE_TAGS = {'english': 'eng', 'hindi': 'hin', 'tamil': 'tam', 'telugu': 'tel', 'gujarati': 'guj'}  # ISO 639-2
+PACKAGE_CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.mpd': 'application/dash+xml',
+    '.m4s': 'video/iso.segment',
+    '.mp4': 'video/mp4'
+}
+
+def upload_directory_to_r2(local_dir, prefix):
+    """Upload a packaged output tree under an R2 prefix; returns the number of files"""
+    files = [path for path in Path(local_dir).rglob('*') if path.is_file()]
+    
+    def upload(path):
+        key = f"{prefix}/{path.relative_to(local_dir).as_posix()}"
+        with open(path, 'rb') as f:
+            public_url, _ = upload_file_to_r2(f, key, PACKAGE_CONTENT_TYPES.get(path.suffix, 'application/octet-stream'), simple_name=True)
+        if not public_url:
+            raise IOError(f"Upload failed for {key}")
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        # Each upload carries the caller's trace and deadline
+        list(pool.map(lambda path: contextvars.copy_context().run(upload, path), files))
+    return len(files)
+
+def name_hls_renditions(master_path, titles):
+    """Give each audio rendition in an HLS master playlist its track title
+
+    ffmpeg names them audio_0, audio_1, ...; renditions are matched to
+    titles by their variant directory (the var_stream_map name).
+    """
+    with open(master_path) as f:
+        lines = f.read().splitlines()
+    for i, line in enumerate(lines):
+        uri = re.search(r'URI="([^"/]+)/', line)
+        if line.startswith('#EXT-X-MEDIA:TYPE=AUDIO') and uri and uri.group(1) in titles:
+            title = titles[uri.group(1)].replace('"', "'")
+            lines[i] = re.sub(r'NAME="[^"]*"', lambda _: f'NAME="{title}"', line)
+    with open(master_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+@traced('dub.build_outputs')
+def build_dub_outputs(video_url, audio_files, formats):
+    """Remux the video with each language's audio as a separate track
+
+    Returns {'dubFile', 'hls', 'dash', 'tracks', 'seconds'} (URLs for the
+    requested formats) or None on failure.
+    """
+    started = time.time()
+    local_files = []
+    try:
+        with scratch_job() as scratch:
+            video_path = download_file_from_r2(video_url.split('/')[-1])
+            if not video_path:
+                return None
+            local_files.append(video_path)
+            
+            # Track list: (input index, name, ISO 639-2 tag, title); the first dub is the default track
+            tracks = []
+            info = probe_media(video_path, alias=video_url.split('/')[-1])
+            if DUB_INCLUDE_ORIGINAL and info and any(stream['type'] == 'audio' for stream in info['streams']):
+                tracks.append((0, 'original', 'und', 'Original'))
+            inputs = ['-i', video_path]
+            for language, audio_url in audio_files.items():
+                audio_path = download_file_from_r2(audio_url.split('/')[-1])
+                if not audio_path:
+                    print(f"Dub: could not fetch {language} audio, skipping it")
+                    continue
+                local_files.append(audio_path)
+                inputs += ['-i', audio_path]
+                tracks.append((len(local_files) - 1, secure_filename(language), LANGUAGE_TAGS.get(language, 'und'), language.title()))
+            default_index = next((i for i, track in enumerate(tracks) if track[0] > 0), None)
+            if default_index is None:
+                print("Dub: no dubbed audio tracks available")
+                return None
+            
+            maps = ['-map', '0:v:0']
+            tagging = []
+            for i, (input_index, name, tag, title) in enumerate(tracks):
+                maps += ['-map', f'{input_index}:a:0']
+                tagging += [f'-metadata:s:a:{i}', f'language={tag}', f'-metadata:s:a:{i}', f'title={title}',
+                            f'-disposition:a:{i}', 'default' if i == default_index else '0']
+            codecs = ['-c:v', 'copy', '-c:a', 'aac', '-b:a', DUB_AUDIO_BITRATE]
+            output_size = sum(os.path.getsize(path) for path in local_files)  # stream copy: about the inputs' size
+            prefix = f"dub_{uuid.uuid4().hex[:12]}"
+            result = {'tracks': [{'language': name, 'tag': tag, 'default': i == default_index}
+                                 for i, (_, name, tag, _) in enumerate(tracks)]}
+            artifacts = []
+            
+            if 'mp4' in formats:
+                output = scratch.path('.mp4', output_size)
+                with trace_span('ffmpeg.dub_mp4', tracks=len(tracks)):
+                    run_ffmpeg(inputs + maps + codecs + tagging + ['-movflags', '+faststart', output])
+                with open(output, 'rb') as f:
+                    result['dubFile'], _ = upload_file_to_r2(f, f"{prefix}.mp4", 'video/mp4', simple_name=True)
+                artifacts.append((f"{prefix}.mp4", 'dub_video', result['dubFile'], 'video/mp4'))
+                scratch.discard(output)
+            
+            if 'hls' in formats:
+                hls_dir = scratch.directory(output_size)
+                stream_map = ['v:0,agroup:audio,name:video'] + [
+                    f"a:{i},agroup:audio,language:{tag},name:{name}" + (',default:yes' if i == default_index else '')
+                    for i, (_, name, tag, _) in enumerate(tracks)
+                ]
+                with trace_span('ffmpeg.dub_hls', tracks=len(tracks)):
+                    run_ffmpeg(inputs + maps + codecs + [
+                        '-f', 'hls', '-hls_time', str(DUB_SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+                        '-hls_segment_type', 'fmp4', '-var_stream_map', ' '.join(stream_map),
+                        '-master_pl_name', 'master.m3u8',
+                        '-hls_segment_filename', os.path.join(hls_dir, '%v', 'seg_%03d.m4s'),
+                        os.path.join(hls_dir, '%v', 'index.m3u8')
+                    ])
+                name_hls_renditions(os.path.join(hls_dir, 'master.m3u8'), {name: title for _, name, _, title in tracks})
+                upload_directory_to_r2(hls_dir, f"{prefix}/hls")
+                result['hls'] = f"{R2_PUBLIC_URL}/{prefix}/hls/master.m3u8"
+                artifacts.append((f"{prefix}/hls/master.m3u8", 'dub_hls', result['hls'], PACKAGE_CONTENT_TYPES['.m3u8']))
+                scratch.discard(hls_dir)
+            
+            if 'dash' in formats:
+                dash_dir = scratch.directory(output_size)
+                # One adaptation set per language so players offer them as alternates
+                adaptation_sets = ['id=0,streams=v'] + [f'id={i + 1},streams={i + 1}' for i in range(len(tracks))]
+                with trace_span('ffmpeg.dub_dash', tracks=len(tracks)):
+                    run_ffmpeg(inputs + maps + codecs + tagging + [
+                        '-f', 'dash', '-seg_duration', str(DUB_SEGMENT_SECONDS),
+                        '-adaptation_sets', ' '.join(adaptation_sets),
+                        '-init_seg_name', 'init-$RepresentationID$.m4s',
+                        '-media_seg_name', 'chunk-$RepresentationID$-$Number%05d$.m4s',
+                        os.path.join(dash_dir, 'manifest.mpd')
+                    ])
+                upload_directory_to_r2(dash_dir, f"{prefix}/dash")
+                result['dash'] = f"{R2_PUBLIC_URL}/{prefix}/dash/manifest.mpd"
+                artifacts.append((f"{prefix}/dash/manifest.mpd", 'dub_dash', result['dash'], PACKAGE_CONTENT_TYPES['.mpd']))
+            
+            for key, kind, url, content_type in artifacts:
+                get_job_ledger().add_artifact(key, kind, url, project_id=workflow_state.get('projectId'), source_url=video_url,
+                                              content_type=content_type, metadata={'tracks': result['tracks']})
+            result['seconds'] = round(time.time() - started, 2)
+            print(f"Dub outputs ({', '.join(formats)}) with {len(tracks)} audio tracks built in {result['seconds']}s")
+            return result
+    except subprocess.CalledProcessError as e:
+        print(f"Dub ffmpeg error: {e.stderr.decode(errors='replace')[-500:]}")
+        return None
+    except Exception as e:
+        print(f"Dub error: {e}")
+        return None
+
+# Initialize modules
+transcript_extractor = TranscriptExtractor()
+translator = ClaudeTranslator()
+tts = ElevenLabsTTS()
+lip_sync = Wav2LipSync()
+
+# Pipeline stages - coroutines handed to pipeline_engine by the Flask routes
+async def transcribe_stage(audio_file):
+    transcript = await transcript_extractor.transcribe_audio_async(audio_file)
+    if not transcript:
+        return None
+    
+    # Store transcript in workflow state (as a new version, for later edit diffs)
+    record_transcript(transcript)
+    vad_report = workflow_state.get('vad')
+    return {
+        'transcript': transcript,
+        'length': len(transcript),
+        'words': len(transcript.split()),
+        'audio_file': audio_file,
+        'silence_trimmed_seconds': vad_report['seconds_saved'] if vad_report else 0,
+        'segments': workflow_state['transcriptTimings']
+    }
+
+async def translate_stage(transcript, duration):
+    translations = report = None
+    if TRANSLATE_INCREMENTAL:
+        version = record_transcript(transcript)
+        translations, report = await translator.translate_incremental_async(version['segments'], duration)
+    if not translations:
+        translations = await translator.translate_transcript_async(transcript, duration)
+    if not translations:
+        return None
+    
+    # Store translations in workflow state (and their segments, for later edit diffs)
+    workflow_state['translations'] = {}
+    record_translations(translations)
+    return {
+        'translations': translations,
+        'files': list(translations.keys()),
+        'segments': report
+    }
+
+async def voice_synthesis_stage(translations):
+    audio_files = {}
+    
+    # Get existing audio files (including external uploads)
+    existing_audio_files = workflow_state.get('audioFiles', {})
+    
+    # Hindi and Tamil go through TTS concurrently (force TTS generation, ignore external files)
+    # A language whose text is unchanged since its last synthesis keeps its track
+    tts_languages = []
+    for lang in ['hindi', 'tamil']:
+        if lang not in translations:
+            continue
+        track = workflow_state['ttsTracks'].get(lang)
+        if track and track['textHash'] == text_hash(translations[lang]):
+            audio_files[lang] = track['audioFile']
+            print(f"{lang} translation unchanged, reusing {track['audioFile']}")
+        else:
+            tts_languages.append(lang)
+    
+    print(f"Generating {', '.join(tts_languages) or 'no'} audio with TTS...")
+    
+    async def synthesize(lang):
+        publish_event('language', stage='voice_synthesis', language=lang, status='synthesizing')
+        result = await tts.text_to_speech_async(translations[lang], lang)
+        publish_event('language', stage='voice_synthesis', language=lang, status='synthesized' if result[0] else 'failed')
+        return result
+    
+    results = await asyncio.gather(*(synthesize(lang) for lang in tts_languages))
+    # Stretch tracks to the video length so lip sync doesn't cut them off
+    target_seconds = video_duration_seconds() if DURATION_FIT_ENABLED else None
+    fits = {}
+    if target_seconds:
+        fitted = await asyncio.gather(*(
+            fit_tts_track(translations[lang], lang, audio_url, target_seconds)
+            for lang, (audio_url, _) in zip(tts_languages, results) if audio_url
+        ))
+        fits = dict(zip([lang for lang, (audio_url, _) in zip(tts_languages, results) if audio_url], fitted))
+    
+    for lang, (audio_url, r2_filename) in zip(tts_languages, results):
+        if lang in fits:
+            audio_url = fits[lang]['audioFile']
+        if audio_url:
+            audio_files[lang] = audio_url
+            workflow_state['ttsTracks'][lang] = {'textHash': text_hash(translations[lang]), 'audioFile': audio_url}
+            print(f"{lang} audio generated: {audio_url}")
+        else:
+            print(f"Failed to generate {lang} audio")
+    
+    # Include external voice files for Telugu and Gujarati
+    for lang in ['telugu', 'gujarati']:
+        if lang in existing_audio_files:
+            audio_files[lang] = existing_audio_files[lang]
+            print(f"{lang} external voice file included: {existing_audio_files[lang]}")
+    
+    # Store all audio files in workflow state
+    workflow_state['audioFiles'].update(audio_files)
+    return {
+        'audioFiles': audio_files,
+        'segments': {lang: workflow_state['ttsSegments'].get(lang) for lang in tts_languages},
+        'durationFit': fits,
+        'message': f'Audio files ready for {len(audio_files)} languages'
+    }
+
+async def lip_sync_stage(video_file, audio_files):
+    # Languages are submitted together; the Sync.so rate limiter paces them
+    languages = list(audio_files)
+    print(f"Processing lip sync for {', '.join(languages)}...")
+    
+    async def submit(lang):
+        publish_event('language', stage='lip_sync', language=lang, status='submitting')
+        result = await lip_sync.sync_video_with_audio_async(video_file, audio_files[lang], lang) or {'status': 'failed'}
+        publish_event('lip_sync', language=lang, job_id=result.get('job_id'), status=result.get('status'),
+                      output_url=result.get('output_url'), error=result.get('error'))
+        return result
+    
+    submitted = await asyncio.gather(*(submit(lang) for lang in languages))
+    
+    results = {}
+    for lang, result in zip(languages, submitted):
+        results[lang] = result
+        print(f"{lang} lip sync result: {result}")
+    
+    return {'results': results}
+
+async def dub_stage(video_file, audio_files, formats=('mp4',)):
+    result = await asyncio.to_thread(build_dub_outputs, video_file, audio_files, list(formats))
+    if result:
+        workflow_state['dubOutputs'] = result
+    return result
+
+# Stages that can run as background jobs, by the name recorded in the job ledger
+PIPELINE_STAGES = {
+    'transcribe': transcribe_stage,
+    'translate': translate_stage,
+    'voice_synthesis': voice_synthesis_stage,
+    'lip_sync': lip_sync_stage,
+    'dub': dub_stage
+}
+
+def watch_lip_sync_job(job_id):
+    """Follow a submitted Sync.so job on the engine until it finishes"""
+    pipeline_engine.submit(lip_sync.watch_job(job_id), deadline=Deadline(JOB_DEADLINE, 'lip sync watch'))
+
+def ingest_lip_sync_output(ledger_job_id):
+    """Copy a finished Sync.so video into R2 on the engine"""
+    pipeline_engine.submit(lip_sync.ingest_output(ledger_job_id), deadline=Deadline(JOB_DEADLINE, 'lip sync ingest'))
+
+def resume_abandoned_jobs():
+    """Take over in-flight ledger jobs whose owner's lease ran out; returns how many were resumed
+
+    Submitted Sync.so jobs are polled again rather than resubmitted, and
+    interrupted background stages are re-run from their recorded inputs
+    (their provider submissions are deduplicated by the ledger).
+    """
+    ledger = get_job_ledger()
+    resumed = 0
+    for row in ledger.claim_abandoned():
+        if row['stage'] == 'lip_sync.submit':
+            if row['status'] == 'submitted' and row['provider_job_id']:
+                watch_lip_sync_job(row['provider_job_id'])
+                resumed += 1
+            else:
+                # No job ID was recorded, so a retry from the client may resubmit
+                ledger.update(row['job_id'], status='failed', error='Interrupted before Sync.so returned a job ID')
+        elif row['stage'] in PIPELINE_STAGES:
+            if row['attempts'] >= JOB_RESUME_MAX_ATTEMPTS:
+                ledger.update(row['job_id'], status='failed', error=f"Interrupted {row['attempts']} times, not resuming")
+                continue
+            ledger.restart(row['job_id'])
+            pipeline_engine.start_job(row['stage'], PIPELINE_STAGES[row['stage']](**row['inputs']), job_id=row['job_id'])
+            resumed += 1
+    if resumed:
+        print(f"Resumed {resumed} abandoned jobs from the job ledger")
+    return resumed
+
+ledger_heartbeat_pid = None
+
+def start_ledger_heartbeat():
+    """Renew this process's job leases, and take over expired ones, every third of a lease"""
+    global ledger_heartbeat_pid
+    if ledger_heartbeat_pid == os.getpid():
+        return
+    ledger_heartbeat_pid = os.getpid()
+    
+    def beat():
+        while True:
+            time.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                get_job_ledger().heartbeat()
+                resume_abandoned_jobs()
+            except Exception as e:
+                print(f"Job ledger heartbeat error: {e}")
+    
+    threading.Thread(target=beat, daemon=True, name='job-ledger-heartbeat').start()
+
+def resume_ledger_jobs():
+    """Startup: resume abandoned jobs, finish interrupted R2 copies and start the lease heartbeat
+
+    Jobs of a previous deploy whose lease hasn't run out yet are picked up
+    by the heartbeat once it does.
+    """
+    ledger = get_job_ledger()
+    resumed = resume_abandoned_jobs()
+    start_ledger_heartbeat()
+    if LIP_SYNC_INGEST:
+        # Finished videos whose copy into R2 never completed
+        for row in ledger.list(stage='lip_sync.submit', statuses=['completed'], limit=500):
+            outputs = row['outputs'] or {}
+            if outputs.get('output_url') and not outputs.get('r2_url'):
+                ingest_lip_sync_output(row['job_id'])
+                resumed += 1
+    return resumed
+
+def wants_background_job():
+    """True when the client asked for a stage to run as a background pipeline job"""
+    data = request.get_json(silent=True) or {}
+    return bool(data.get('async')) or request.args.get('async') in ('1', 'true')
+
+def start_pipeline_job(stage, **inputs):
+    """Record a stage in the job ledger, start it on the engine and build the 202 response
+
+    A repeated Idempotency-Key header returns the job it started the first
+    time (unless that job failed, in which case it is run again).
+    """
+    client_key = request.headers.get('Idempotency-Key')
+    ledger = get_job_ledger()
+    row, created = ledger.begin(stage, inputs, key=f"{stage}:{client_key}" if client_key else None,
+                                project_id=workflow_state.get('projectId'))
+    if not created and row['status'] in ('running', 'completed'):
+        job = pipeline_engine.get_job(row['job_id'])
+    else:
+        if not created:
+            row = ledger.restart(row['job_id'])
+            inputs = row['inputs']
+        job = pipeline_engine.start_job(stage, PIPELINE_STAGES[stage](**inputs), job_id=row['job_id'])
+    return jsonify({
+        'job_id': job['job_id'],
+        'stage': stage,
+        'status': job['status'],
+        'poll_url': f"/api/pipeline-jobs/{job['job_id']}"
+    }), 202
+
+# Helper functions
+def change_to_project_root():
+    """Mock function for deployment"""
+    return os.getcwd()
+
+def restore_directory(original_cwd):
+    """Mock function for deployment"""
+    pass
+
+@app.route('/')
+def index():
+    """Main webapp interface"""
+    return render_template('index.html')
+
+@app.route('/healthz')
+def healthz():
+    """Lightweight health check - must not build API clients or render templates"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/api/workflow-status')
+def get_workflow_status():
+    """Get current workflow status"""
+    return jsonify(workflow_state)
+
+@app.route('/api/events')
+def event_stream():
+    """Server-Sent Events stream of progress events (replaces polling)
+
+    Browsers reconnect on their own and send Last-Event-ID, so events that
+    were published in between are replayed; a 'resync' event asks the page
+    to reload state when too many were missed. ?project= limits the stream
+    to one project.
+    """
+    project_id = request.args.get('project')
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    try:
+        event_bus.open_stream()
+    except EventStreamsFull as e:
+        # EventSource gives up on a non-200 answer; the page falls back to polling and retries later
+        return jsonify({'error': str(e)}), 503
+    
+    def generate():
+        cursor = int(last_event_id) if last_event_id.isdigit() else event_bus.last_id
+        yield "retry: 3000\n\n"
+        ends = time.monotonic() + EVENTS_STREAM_SECONDS
+        while time.monotonic() < ends and not event_bus.closed:
+            events = event_bus.since(cursor, timeout=min(EVENTS_KEEPALIVE, max(ends - time.monotonic(), 0)))
+            for event in events:
+                if not project_id or event['project_id'] in (project_id, None):
+                    yield EventBus.format(event)
+                cursor = event['id']
+            if not events:
+                yield ": keepalive\n\n"
+    
+    response = app.response_class(generate(), mimetype='text/event-stream')
+    # Closing the response frees the slot even if the generator never started
+    response.call_on_close(event_bus.close_stream)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let a proxy buffer the stream
+    return response
+
+@app.route('/api/upload-stats')
+def upload_stats():
+    """Memory and disk used by in-flight uploads"""
+    return jsonify(get_upload_spool_stats())
+
+@app.route('/api/tts-preview/<language>')
+def tts_preview(language):
+    """Progressive MP3 of a synthesis that is still running (TTS_PREVIEW=true)"""
+    preview = tts_previews.get(language)
+    if not preview:
+        return jsonify({'error': f'No {language} synthesis in progress', 'audioFile': workflow_state['audioFiles'].get(language)}), 404
+    response = app.response_class(preview.iter_chunks(), mimetype='audio/mpeg')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/api/rate-limits')
+def rate_limit_stats():
+    """Learned concurrency and request rate per provider"""
+    return jsonify({name: limiter.snapshot() for name, limiter in rate_limiters.items()})
+
+@app.route('/api/media-pool')
+def media_pool_status():
+    """Media worker pool occupancy, queue depth and task outcomes"""
+    return jsonify(media_pool.snapshot())
+
+@app.route('/api/scratch-space')
+def scratch_space_status():
+    """Scratch directories held by running jobs, reserved and used bytes per tier"""
+    return jsonify(scratch_space.snapshot())
+
+@app.route('/api/circuit-breakers')
+def circuit_breaker_stats():
+    """Circuit state, thresholds and counters per provider"""
+    return jsonify({name: limiter.breaker.snapshot() for name, limiter in rate_limiters.items()})
+
+@app.route('/api/media-info/<path:key>')
+def get_media_info(key):
+    """Cached container metadata for an uploaded or generated R2 file"""
+    info = lookup_media(key)
+    if not info:
+        return jsonify({'error': 'No metadata cached for this file', 'key': key}), 404
+    return jsonify(info)
+
+@app.route('/api/trace')
+@app.route('/api/trace/<project_id>')
+def get_trace_waterfall(project_id=None):
+    """Per-project span waterfall with the critical path highlighted"""
+    project_id = project_id or workflow_state.get('projectId')
+    spans = trace_recorder.spans_for(project_id) if project_id else []
+    if not spans:
+        return jsonify({'error': 'No trace found', 'project_id': project_id}), 404
+    
+    spans.sort(key=lambda span: span['start'])
+    trace_start = spans[0]['start']
+    trace_end = max(span['end'] or time.time() for span in spans)
+    critical_path = compute_critical_path(spans)
+    critical_ids = set(critical_path)
+    
+    depths = {}
+    by_id = {span['span_id']: span for span in spans}
+    for span in spans:
+        parent = by_id.get(span['parent_id'])
+        depths[span['span_id']] = depths.get(parent['span_id'], -1) + 1 if parent else 0
+    
+    waterfall = [{
+        'name': span['name'],
+        'span_id': span['span_id'],
+        'parent_id': span['parent_id'],
+        'depth': depths[span['span_id']],
+        'offset_ms': round((span['start'] - trace_start) * 1000, 2),
+        'duration_ms': span['duration_ms'],
+        'status': span['status'],
+        'error': span['error'],
+        'critical': span['span_id'] in critical_ids,
+        'attributes': span['attributes']
+    } for span in spans]
+    
+    return jsonify({
+        'project_id': project_id,
+        'total_ms': round((trace_end - trace_start) * 1000, 2),
+        'span_count': len(waterfall),
+        'critical_path': [by_id[span_id]['name'] for span_id in critical_path],
+        'critical_path_ms': round(sum(by_id[span_id]['duration_ms'] for span_id in critical_path
+                                      if by_id.get(by_id[span_id]['parent_id']) is None), 2),
+        'spans': waterfall
+    })
+
+@app.route('/api/check-existing-files')
+def check_existing_files():
+    """Check for existing files"""
+    return jsonify({'error': 'No existing files found'}), 404
+
+# Allowed file types per step
+STEP_EXTENSIONS = {
+    '1': {'.mp4', '.avi', '.mov', '.mp3', '.wav', '.m4a'},
+    '2': {'.mp3', '.wav', '.m4a'},
+    '3': {'.txt'},
+    '4': {'.mp3', '.wav', '.m4a', '.txt'},
+    '5': {'.mp4', '.avi', '.mov', '.mp3', '.wav', '.m4a'}
+}
+
+STEP_CONTENT_TYPES = {
+    '.mp4': 'video/mp4',
+    '.avi': 'video/avi', 
+    '.mov': 'video/quicktime',
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.m4a': 'audio/m4a',
+    '.txt': 'text/plain'
+}
+
+def process_step_upload(step, file_ext, public_url, language, result):
+    """Update workflow state (and result) for a file that is now in R2"""
+    if step == '1':
+        if file_ext in {'.mp4', '.avi', '.mov'}:
+            # Video file - store and extract audio
+            workflow_state['videoFile'] = public_url
+            result['videoFile'] = public_url
+            
+            print("Extracting audio from video...")
+            publish_event('upload', step=step, status='extracting', filename=result.get('filename'))
+            audio_url, duration = extract_audio_from_video(public_url)
+            
+            if audio_url:
+                workflow_state['audioFile'] = audio_url
+                workflow_state['videoDuration'] = duration
+                result['audioFile'] = audio_url
+                result['duration'] = duration
+                print(f"Audio extracted: {audio_url}")
+            else:
+                result['duration'] = '00:30'  # Default if extraction fails
+                
+        else:
+            # Audio file - store directly
+            workflow_state['audioFile'] = public_url
+            result['audioFile'] = public_url
+            
+    elif step == '2':
+        # Step 2: Audio file upload for transcription
+        workflow_state['audioFile'] = public_url
+        result['audioFile'] = public_url
+        print(f"Step 2 audio file stored: {public_url}")
+            
+    elif step == '4' or step == '5':
+        result['audioFile'] = public_url
+        result['language'] = language
+    return result
+
+# Resumable uploads (tus-style): create, PATCH chunks at an offset, HEAD for the offset.
+# Bytes are buffered in UPLOAD_SPOOL_DIR and flushed to R2 as multipart parts.
+RESUMABLE_PART_SIZE = max(int(os.environ.get('RESUMABLE_PART_SIZE', 8 * 1024 * 1024)), 5 * 1024 * 1024)  # R2 minimum is 5MB
+RESUMABLE_MAX_SIZE = int(os.environ.get('RESUMABLE_MAX_SIZE', 2 * 1024 * 1024 * 1024))  # 2GB
+RESUMABLE_UPLOAD_TTL = int(os.environ.get('RESUMABLE_UPLOAD_TTL', 24 * 3600))
+RESUMABLE_EXPIRY_INTERVAL = 60  # seconds between scans for expired uploads
+TUS_VERSION = '1.0.0'
+
+class ResumableUpload:
+    def __init__(self, length, metadata):
+        self.upload_id = uuid.uuid4().hex
+        self.length = length
+        self.step = metadata.get('step', '1')
+        self.language = metadata.get('language', 'hindi')
+        self.filename = secure_filename(metadata.get('filename', '')) or 'upload'
+        self.file_ext = Path(self.filename).suffix.lower()
+        self.content_type = STEP_CONTENT_TYPES.get(self.file_ext, 'application/octet-stream')
+        self.r2_filename = unique_r2_filename(self.filename)
+        self.multipart_id = None
+        self.parts = []
+        self.offset = 0   # Bytes received (R2 parts + local buffer)
+        self.flushed = 0  # Bytes already in R2 parts
+        self.buffer_path = os.path.join(UPLOAD_SPOOL_DIR, f'resumable-{self.upload_id}.part')
+        self.updated_at = time.time()
+        self.public_url = None  # Set once R2 has completed the multipart upload
+        self.result = None
+        self.lock = threading.Lock()
+
+    @property
+    def complete(self):
+        return self.result is not None
+
+    def append(self, stream):
+        """Write a request body to the local buffer; returns bytes received, or None if it overflowed
+
+        The offset advances with every chunk written, so a dropped
+        connection keeps whatever arrived before it. A body that runs past
+        Upload-Length is rolled back entirely.
+        """
+        start_offset = self.offset
+        received = 0
+        with open(self.buffer_path, 'ab') as buffer:
+            buffer_start = buffer.tell()
+            while self.offset < self.length:
+                chunk = stream.read(min(64 * 1024, self.length - self.offset))
+                if not chunk:
+                    break
+                buffer.write(chunk)
+                self.offset += len(chunk)
+                received += len(chunk)
+            if self.offset == self.length and stream.read(1):
+                buffer.truncate(buffer_start)
+                self.offset = start_offset
+                return None
+        self.updated_at = time.time()
+        return received
+
+    def flush_parts(self, final=False):
+        """Send full parts (and on final, the remainder) from the buffer to R2"""
+        buffered = self.offset - self.flushed
+        if buffered < RESUMABLE_PART_SIZE and not (final and buffered):
+            return
+        if not self.multipart_id:
+            self.multipart_id = create_multipart_upload_r2(self.r2_filename, self.content_type)
+        
+        with open(self.buffer_path, 'rb') as buffer:
+            try:
+                while buffered >= RESUMABLE_PART_SIZE or (final and buffered):
+                    data = buffer.read(RESUMABLE_PART_SIZE)
+                    self.parts.append(upload_part_r2(self.r2_filename, self.multipart_id, len(self.parts) + 1, data))
+                    self.flushed += len(data)
+                    buffered -= len(data)
+            finally:
+                # Keep only the bytes not yet in R2, even if a part upload failed
+                self._truncate_buffer(buffer, self.offset - self.flushed)
+
+    def _truncate_buffer(self, buffer, keep):
+        # The buffer always ends at self.offset, so the unflushed bytes are its tail
+        buffer.seek(-keep if keep else 0, os.SEEK_END)
+        remainder_path = self.buffer_path + '.tmp'
+        with open(remainder_path, 'wb') as remainder:
+            shutil.copyfileobj(buffer, remainder, 1024 * 1024)
+        os.replace(remainder_path, self.buffer_path)
+
+    def finish(self):
+        """Complete the R2 upload and run the normal step processing
+
+        R2 forgets the multipart ID once it is completed, so a retry after
+        a failed probe or step skips straight to those.
+        """
+        if not self.public_url:
+            self.flush_parts(final=True)
+            self.public_url = complete_multipart_upload_r2(self.r2_filename, self.multipart_id, self.parts)
+            self.discard_buffer()
+        public_url = self.public_url
+        
+        # The bytes only come together in R2, so the headers are probed there with ranged reads
+        media_info = None
+        if self.file_ext != '.txt':
+            media_info = probe_media(R2RangeReader(self.r2_filename, self.length), alias=self.r2_filename)
+        
+        result = {
+            'filename': self.filename,
+            'r2_filename': self.r2_filename,
+            'public_url': public_url,
+            'step': self.step,
+            'language': self.language,
+            'upload': {'bytes': self.length, 'parts': len(self.parts), 'resumable': True},
+            'media': media_info
+        }
+        self.result = process_step_upload(self.step, self.file_ext, public_url, self.language, result)
+        publish_event('upload', upload_id=self.upload_id, step=self.step, status='completed',
+                      filename=self.filename, result=self.result)
+        return self.result
+
+    def abort(self):
+        if self.multipart_id and not self.public_url:
+            abort_multipart_upload_r2(self.r2_filename, self.multipart_id)
+        self.discard_buffer()
+
+    def discard_buffer(self):
+        if os.path.exists(self.buffer_path):
+            os.unlink(self.buffer_path)
 
-# Helper functions
-def change_to_project_root():
-    """Mock function for deployment"""
-    return os.getcwd()
+    def to_dict(self):
+        return {
+            'upload_id': self.upload_id,
+            'filename': self.filename,
+            'step': self.step,
+            'length': self.length,
+            'offset': self.offset,
+            'parts_uploaded': len(self.parts),
+            'complete': self.complete,
+            'result': self.result
+        }
 
-def restore_directory(original_cwd):
-    """Mock function for deployment"""
-    pass
+resumable_uploads = {}
+resumable_uploads_lock = threading.Lock()
 
-@app.route('/')
-def index():
-    """Main webapp interface"""
-    return render_template('index.html')
+def parse_tus_metadata(header):
+    """Parse an Upload-Metadata header ("key base64value,key2 base64value2")"""
+    metadata = {}
+    for pair in (header or '').split(','):
+        parts = pair.strip().split(' ', 1)
+        if not parts[0]:
+            continue
+        try:
+            metadata[parts[0]] = base64.b64decode(parts[1]).decode('utf-8') if len(parts) > 1 else ''
+        except (ValueError, UnicodeDecodeError):
+            continue
+    return metadata
 
-@app.route('/api/workflow-status')
-def get_workflow_status():
-    """Get current workflow status"""
-    return jsonify(workflow_state)
+resumable_expiry_scanned_at = 0.0
 
-@app.route('/api/check-existing-files')
-def check_existing_files():
-    """Check for existing files"""
-    return jsonify({'error': 'No existing files found'}), 404
+def expire_resumable_uploads():
+    """Abort uploads idle past RESUMABLE_UPLOAD_TTL; scans at most every RESUMABLE_EXPIRY_INTERVAL"""
+    global resumable_expiry_scanned_at
+    now = time.time()
+    cutoff = now - RESUMABLE_UPLOAD_TTL
+    with resumable_uploads_lock:
+        if now - resumable_expiry_scanned_at < RESUMABLE_EXPIRY_INTERVAL:
+            return
+        resumable_expiry_scanned_at = now
+        # An upload with a chunk being written is in use, whatever its timestamp says
+        expired = [upload for upload in resumable_uploads.values()
+                   if upload.updated_at < cutoff and not upload.lock.locked()]
+        for upload in expired:
+            del resumable_uploads[upload.upload_id]
+    for upload in expired:
+        print(f"Expiring resumable upload {upload.upload_id} at offset {upload.offset}/{upload.length}")
+        upload.abort()
+
+def tus_response(body='', status=204, upload=None, **headers):
+    response = app.response_class(body, status=status)
+    response.headers['Tus-Resumable'] = TUS_VERSION
+    response.headers['Cache-Control'] = 'no-store'
+    if upload:
+        response.headers['Upload-Offset'] = str(upload.offset)
+        response.headers['Upload-Length'] = str(upload.length)
+    for name, value in headers.items():
+        response.headers[name.replace('_', '-')] = value
+    return response
 
 @app.route('/api/upload-step', methods=['POST'])
+@traced('stage.upload', new_project=lambda: request.form.get('step', '1') == '1')
 def upload_step_file():
     """Handle file upload for specific step using R2 storage"""
     try:
@@ -678,80 +4012,40 @@ def upload_step_file():
             return jsonify({'error': 'No file selected'}), 400
         
         # Validate file type based on step
-        step_extensions = {
-            '1': {'.mp4', '.avi', '.mov', '.mp3', '.wav', '.m4a'},
-            '2': {'.mp3', '.wav', '.m4a'},
-            '3': {'.txt'},
-            '4': {'.mp3', '.wav', '.m4a', '.txt'},
-            '5': {'.mp4', '.avi', '.mov', '.mp3', '.wav', '.m4a'}
-        }
-        
         file_ext = Path(file.filename).suffix.lower()
-        if file_ext not in step_extensions.get(step, set()):
+        if file_ext not in STEP_EXTENSIONS.get(step, set()):
             return jsonify({'error': f'File type {file_ext} not supported for step {step}'}), 400
         
         # Determine content type
-        content_type_map = {
-            '.mp4': 'video/mp4',
-            '.avi': 'video/avi', 
-            '.mov': 'video/quicktime',
-            '.mp3': 'audio/mpeg',
-            '.wav': 'audio/wav',
-            '.m4a': 'audio/m4a',
-            '.txt': 'text/plain'
-        }
-        content_type = content_type_map.get(file_ext, 'application/octet-stream')
+        content_type = STEP_CONTENT_TYPES.get(file_ext, 'application/octet-stream')
         
         # Upload to R2
         filename = secure_filename(file.filename)
         print(f"Uploading {filename} to R2...")
         
+        # Probe the spooled upload before it leaves the server; the R2 key becomes an alias
+        media_info = probe_media(file.stream) if file_ext != '.txt' else None
+        file.stream.seek(0)
+        
         public_url, r2_filename = upload_file_to_r2(file, filename, content_type)
         
         if not public_url:
             return jsonify({'error': 'Failed to upload file to storage'}), 500
+        if media_info:
+            get_media_probe_cache().remember(r2_filename, media_info['sample_hash'])
         
         result = {
             'filename': filename,
             'r2_filename': r2_filename,
             'public_url': public_url,
             'step': step, 
-            'language': language
+            'language': language,
+            'upload': describe_upload(file),
+            'media': media_info
         }
         
-        # Process based on step
-        if step == '1':
-            if file_ext in {'.mp4', '.avi', '.mov'}:
-                # Video file - store and extract audio
-                workflow_state['videoFile'] = public_url
-                result['videoFile'] = public_url
-                
-                print("Extracting audio from video...")
-                audio_url, duration = extract_audio_from_video(public_url)
-                
-                if audio_url:
-                    workflow_state['audioFile'] = audio_url
-                    workflow_state['videoDuration'] = duration
-                    result['audioFile'] = audio_url
-                    result['duration'] = duration
-                    print(f"Audio extracted: {audio_url}")
-                else:
-                    result['duration'] = '00:30'  # Default if extraction fails
-                    
-            else:
-                # Audio file - store directly
-                workflow_state['audioFile'] = public_url
-                result['audioFile'] = public_url
-                
-        elif step == '2':
-            # Step 2: Audio file upload for transcription
-            workflow_state['audioFile'] = public_url
-            result['audioFile'] = public_url
-            print(f"Step 2 audio file stored: {public_url}")
-                
-        elif step == '4' or step == '5':
-            result['audioFile'] = public_url
-            result['language'] = language
+        process_step_upload(step, file_ext, public_url, language, result)
+        publish_event('upload', step=step, status='completed', filename=filename, result=result)
         
         print(f"Upload successful: {result}")
         print(f"Workflow state updated: {workflow_state}")
@@ -762,6 +4056,7 @@ def upload_step_file():
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
 
 @app.route('/api/upload-external-voice', methods=['POST'])
+@traced('stage.upload_external_voice')
 def upload_external_voice():
     """Handle external voice file uploads for Telugu and Gujarati"""
     try:
@@ -822,6 +4117,7 @@ def upload_external_voice():
             'filename': filename,
             'r2_filename': r2_filename,
             'language': language,
+            'upload': describe_upload(file),
             'message': f'{language.title()} voice file uploaded successfully'
         }
         
@@ -832,7 +4128,115 @@ def upload_external_voice():
         print(f"External voice upload error: {str(e)}")
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
 
+@app.route('/api/uploads', methods=['OPTIONS'])
+def resumable_upload_options():
+    """Advertise the supported resumable upload protocol"""
+    return tus_response(Tus_Version=TUS_VERSION, Tus_Extension='creation,termination',
+                        Tus_Max_Size=str(RESUMABLE_MAX_SIZE))
+
+@app.route('/api/uploads', methods=['POST'])
+@traced('stage.upload_resumable_create', new_project=lambda: parse_tus_metadata(request.headers.get('Upload-Metadata')).get('step', '1') == '1')
+def create_resumable_upload():
+    """Create a resumable upload from Upload-Length and Upload-Metadata headers"""
+    expire_resumable_uploads()
+    
+    try:
+        length = int(request.headers.get('Upload-Length', ''))
+    except ValueError:
+        return jsonify({'error': 'Upload-Length header required'}), 400
+    if length <= 0:
+        return jsonify({'error': 'Upload-Length must be positive'}), 400
+    if length > RESUMABLE_MAX_SIZE:
+        return jsonify({'error': f'File exceeds maximum size of {RESUMABLE_MAX_SIZE} bytes'}), 413
+    
+    metadata = parse_tus_metadata(request.headers.get('Upload-Metadata'))
+    upload = ResumableUpload(length, metadata)
+    if upload.file_ext not in STEP_EXTENSIONS.get(upload.step, set()):
+        return jsonify({'error': f'File type {upload.file_ext} not supported for step {upload.step}'}), 400
+    
+    with resumable_uploads_lock:
+        resumable_uploads[upload.upload_id] = upload
+    
+    print(f"Resumable upload created: {upload.upload_id} ({upload.filename}, {length} bytes, step {upload.step})")
+    return tus_response(status=201, upload=upload, Location=f"/api/uploads/{upload.upload_id}")
+
+@app.route('/api/uploads/<upload_id>', methods=['HEAD', 'GET'])
+def get_resumable_upload(upload_id):
+    """Current offset (HEAD) or full status and step result (GET)"""
+    expire_resumable_uploads()
+    upload = resumable_uploads.get(upload_id)
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    response = tus_response(json.dumps(upload.to_dict()), status=200, upload=upload)
+    response.content_type = 'application/json'
+    return response
+
+@app.route('/api/uploads/<upload_id>', methods=['PATCH'])
+@traced('stage.upload_resumable_chunk')
+def patch_resumable_upload(upload_id):
+    """Append a chunk at Upload-Offset; the final chunk completes the R2 upload"""
+    expire_resumable_uploads()
+    upload = resumable_uploads.get(upload_id)
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    if request.content_type != 'application/offset+octet-stream':
+        return jsonify({'error': 'Content-Type must be application/offset+octet-stream'}), 415
+    if not upload.lock.acquire(blocking=False):
+        return jsonify({'error': 'Another chunk is being written to this upload'}), 409
+    
+    try:
+        if upload.complete:
+            return tus_response(upload=upload)
+        
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return jsonify({'error': 'Upload-Offset header required'}), 400
+        if offset != upload.offset:
+            return tus_response(json.dumps({'error': 'Offset mismatch', 'offset': upload.offset}),
+                                status=409, upload=upload)
+        overflow = tus_response(json.dumps({'error': 'Chunk runs past Upload-Length', 'offset': upload.offset}),
+                                status=413, upload=upload)
+        if request.content_length is not None and offset + request.content_length > upload.length:
+            return overflow
+        
+        try:
+            received = upload.append(request.stream)
+        except Exception as e:
+            # Connection dropped mid-chunk - keep what arrived, the client resumes from HEAD
+            print(f"Resumable upload {upload_id} interrupted at offset {upload.offset}: {e}")
+            return tus_response(status=400, upload=upload)
+        if received is None:
+            print(f"Resumable upload {upload_id}: chunk ran past Upload-Length, offset stays {upload.offset}")
+            return overflow
+        
+        upload.flush_parts()
+        print(f"Resumable upload {upload_id}: +{received} bytes, offset {upload.offset}/{upload.length}")
+        publish_event('upload', upload_id=upload_id, step=upload.step, status='uploading',
+                      offset=upload.offset, length=upload.length)
+        
+        if upload.offset == upload.length:
+            print(f"Resumable upload {upload_id} complete, finishing R2 multipart upload...")
+            upload.finish()
+        return tus_response(upload=upload)
+    except Exception as e:
+        print(f"Resumable upload error: {e}")
+        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+    finally:
+        upload.lock.release()
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def delete_resumable_upload(upload_id):
+    """Terminate an upload and abort its R2 multipart upload"""
+    with resumable_uploads_lock:
+        upload = resumable_uploads.pop(upload_id, None)
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    upload.abort()
+    return tus_response()
+
 @app.route('/api/transcribe', methods=['GET', 'POST'])
+@traced('stage.transcribe')
 def transcribe_audio():
     """Transcribe audio file using OpenAI Whisper"""
     try:
@@ -847,7 +4251,7 @@ def transcribe_audio():
             # If no audio file specified, try to find one in R2
             if not audio_file:
                 try:
-                    response = r2_client.list_objects_v2(Bucket=R2_BUCKET_NAME)
+                    response = get_r2_client().list_objects_v2(Bucket=R2_BUCKET_NAME)
                     if 'Contents' in response:
                         audio_files = [obj['Key'] for obj in response['Contents'] 
                                      if obj['Key'].endswith(('.mp3', '.wav', '.m4a'))]
@@ -867,18 +4271,12 @@ def transcribe_audio():
             }), 400
         
         print(f"Starting transcription for: {audio_file}")
-        transcript = transcript_extractor.transcribe_audio(audio_file)
+        if wants_background_job():
+            return start_pipeline_job('transcribe', audio_file=audio_file)
+        result = pipeline_engine.run(transcribe_stage(audio_file))
         
-        if transcript:
-            # Store transcript in workflow state
-            workflow_state['transcript'] = transcript
-            
-            return jsonify({
-                'transcript': transcript,
-                'length': len(transcript),
-                'words': len(transcript.split()),
-                'audio_file': audio_file
-            })
+        if result:
+            return jsonify(result)
         else:
             return jsonify({'error': 'Transcription failed', 'audio_file': audio_file}), 500
             
@@ -901,9 +4299,16 @@ def save_transcript():
     if not transcript:
         return jsonify({'error': 'No transcript provided'}), 400
     
-    return jsonify({'message': 'Transcript saved successfully'})
+    version = record_transcript(transcript)
+    return jsonify({
+        'message': 'Transcript saved successfully',
+        'version': version['version'],
+        'segments': len(version['segments']),
+        'changed': version['changed']
+    })
 
 @app.route('/api/translate', methods=['POST'])
+@traced('stage.translate')
 def translate_transcript():
     """Translate transcript using Claude"""
     data = request.get_json()
@@ -916,15 +4321,11 @@ def translate_transcript():
         duration = workflow_state.get('videoDuration', '00:30')
         print(f"Starting translation for transcript of {len(transcript)} characters")
         
-        translations = translator.translate_transcript(transcript, duration)
-        if translations:
-            # Store translations in workflow state
-            workflow_state['translations'] = translations
-            
-            return jsonify({
-                'translations': translations,
-                'files': list(translations.keys())
-            })
+        if wants_background_job():
+            return start_pipeline_job('translate', transcript=transcript, duration=duration)
+        result = pipeline_engine.run(translate_stage(transcript, duration))
+        if result:
+            return jsonify(result)
         else:
             return jsonify({'error': 'Translation failed'}), 500
     except Exception as e:
@@ -940,9 +4341,15 @@ def save_translations():
     if not translations:
         return jsonify({'error': 'No translations provided'}), 400
     
-    return jsonify({'message': 'Translations saved successfully', 'files': list(translations.keys())})
+    changes = record_translations(translations)
+    return jsonify({
+        'message': 'Translations saved successfully',
+        'files': list(translations.keys()),
+        'changes': changes
+    })
 
 @app.route('/api/voice-synthesis', methods=['POST'])
+@traced('stage.voice_synthesis')
 def voice_synthesis():
     """Generate voice audio using ElevenLabs and store in R2"""
     data = request.get_json()
@@ -952,42 +4359,17 @@ def voice_synthesis():
         return jsonify({'error': 'No translations available. Please complete Step 3 first.'}), 400
     
     try:
-        audio_files = {}
-        
         print(f"Starting voice synthesis for {len(translations)} languages")
         
-        # Get existing audio files (including external uploads)
-        existing_audio_files = workflow_state.get('audioFiles', {})
-        
-        # Process Hindi and Tamil with TTS (force TTS generation, ignore external files)
-        for lang in ['hindi', 'tamil']:
-            if lang in translations:
-                print(f"Generating {lang} audio with TTS...")
-                audio_url, r2_filename = tts.text_to_speech(translations[lang], lang)
-                if audio_url:
-                    audio_files[lang] = audio_url
-                    print(f"{lang} audio generated: {audio_url}")
-                else:
-                    print(f"Failed to generate {lang} audio")
-        
-        # Include external voice files for Telugu and Gujarati
-        for lang in ['telugu', 'gujarati']:
-            if lang in existing_audio_files:
-                audio_files[lang] = existing_audio_files[lang]
-                print(f"{lang} external voice file included: {existing_audio_files[lang]}")
-        
-        # Store all audio files in workflow state
-        workflow_state['audioFiles'].update(audio_files)
-        
-        return jsonify({
-            'audioFiles': audio_files,
-            'message': f'Audio files ready for {len(audio_files)} languages'
-        })
+        if wants_background_job():
+            return start_pipeline_job('voice_synthesis', translations=translations)
+        return jsonify(pipeline_engine.run(voice_synthesis_stage(translations)))
     except Exception as e:
         print(f"Voice synthesis error: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/lip-sync', methods=['POST'])
+@traced('stage.lip_sync')
 def lip_sync_videos():
     """Create lip-synced videos using Wav2Lip with R2 storage"""
     data = request.get_json()
@@ -1001,47 +4383,101 @@ def lip_sync_videos():
         return jsonify({'error': 'No audio files available. Please complete Step 4 first.'}), 400
     
     try:
-        results = {}
-        
         print(f"Starting lip sync for {len(audio_files)} languages")
         
-        # Process languages sequentially to avoid rate limiting
-        for lang, audio_url in audio_files.items():
-            print(f"Processing {lang} lip sync...")
-            
-            # Add significant delay between jobs for rate limiting
-            if len(results) > 0:  # Skip delay for first job
-                print(f"Waiting 60 seconds between jobs to prevent rate limiting...")
-                time.sleep(60)
-            
-            result = lip_sync.sync_video_with_audio(video_file, audio_url, lang)
-            results[lang] = result or {'status': 'failed'}
-            print(f"{lang} lip sync result: {result}")
-            
-            # If rate limit hit, add extra delay
-            if result and result.get('status') == 'failed' and '429' in str(result.get('error', '')):
-                print(f"Rate limit detected for {lang}, adding extra 120s delay...")
-                time.sleep(120)
-        
-        return jsonify({'results': results})
+        if wants_background_job():
+            return start_pipeline_job('lip_sync', video_file=video_file, audio_files=audio_files)
+        return jsonify(pipeline_engine.run(lip_sync_stage(video_file, audio_files)))
     except Exception as e:
         print(f"Lip sync error: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Downloads redirect to a presigned R2 URL; DOWNLOAD_MODE=stream (or a failed presign)
+# serves them through /api/stream instead, which honours Range requests for seeking
+DOWNLOAD_MODE = os.environ.get('DOWNLOAD_MODE', 'redirect')
+STREAM_CHUNK_SIZE = 256 * 1024
+
+@app.route('/api/dub', methods=['POST'])
+@traced('stage.dub')
+def dub_video():
+    """Dub-only output: the original video with every language as a separate audio track (no lip sync)"""
+    data = request.get_json() or {}
+    video_file = data.get('videoFile') or workflow_state.get('videoFile')
+    audio_files = data.get('audioFiles', {}) or workflow_state.get('audioFiles', {})
+    formats = data.get('formats') or ['mp4']
+    
+    if not video_file:
+        return jsonify({'error': 'No video file available. Please upload a video in Step 1.'}), 400
+    if not audio_files:
+        return jsonify({'error': 'No audio files available. Please complete Step 4 first.'}), 400
+    unknown = [fmt for fmt in formats if fmt not in DUB_FORMATS]
+    if unknown:
+        return jsonify({'error': f"Unknown formats {unknown}; choose from {list(DUB_FORMATS)}"}), 400
+    
+    try:
+        print(f"Building dub outputs ({', '.join(formats)}) for {len(audio_files)} languages")
+        if wants_background_job():
+            return start_pipeline_job('dub', video_file=video_file, audio_files=audio_files, formats=formats)
+        result = pipeline_engine.run(dub_stage(video_file, audio_files, formats))
+        if result:
+            return jsonify(result)
+        return jsonify({'error': 'Dub output failed'}), 500
+    except Exception as e:
+        print(f"Dub error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/download/<filename>')
 def download_file(filename):
     """Generate presigned download URL for R2 files"""
     try:
         safe_filename = secure_filename(filename)
-        presigned_url = get_presigned_url(safe_filename, expiration=3600)  # 1 hour
+        presigned_url = get_presigned_url(safe_filename, expiration=3600) if DOWNLOAD_MODE == 'redirect' else None  # 1 hour
         
         if presigned_url:
             return redirect(presigned_url)
-        else:
-            return jsonify({'error': 'File not found'}), 404
+        return stream_file(safe_filename)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/stream/<filename>')
+def stream_file(filename):
+    """Stream an R2 file through the app, answering Range requests with 206 so players can seek"""
+    safe_filename = secure_filename(filename)
+    head = head_object_r2(safe_filename)
+    if not head:
+        return jsonify({'error': 'File not found'}), 404
+    size = head['ContentLength']
+    etag = head.get('ETag', '').strip('"')
+    
+    start, end, status = 0, size, 200
+    byte_range = request.range
+    if byte_range and request.if_range.etag not in (None, etag):
+        byte_range = None  # If-Range names an older version: send the whole file
+    if byte_range and (byte_range.units != 'bytes' or len(byte_range.ranges) != 1):
+        byte_range = None  # multi-range isn't supported, and ignoring a Range is allowed; rejecting it isn't
+    if byte_range:
+        span = byte_range.range_for_length(size)
+        if span is None:
+            response = jsonify({'error': 'Requested range not satisfiable'})
+            response.status_code = 416
+            response.headers['Content-Range'] = f"bytes */{size}"
+            return response
+        (start, end), status = span, 206
+    
+    def body():
+        if end > start:
+            yield from get_object_range_r2(safe_filename, start, end).iter_chunks(STREAM_CHUNK_SIZE)
+    
+    response = app.response_class(body() if request.method != 'HEAD' else b'', status=status,
+                                  mimetype=head.get('ContentType') or 'application/octet-stream')
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Content-Length'] = str(end - start)
+    if etag:
+        response.set_etag(etag)
+    if status == 206:
+        response.headers['Content-Range'] = f"bytes {start}-{end - 1}/{size}"
+    return response
+
 @app.route('/api/download-audio')
 def download_audio():
     """Download the extracted audio file from workflow state"""
@@ -1052,12 +4488,11 @@ def download_audio():
             
         # Extract filename from URL for download
         filename = audio_file.split('/')[-1]
-        presigned_url = get_presigned_url(filename, expiration=3600)
+        presigned_url = get_presigned_url(filename, expiration=3600) if DOWNLOAD_MODE == 'redirect' else None
         
         if presigned_url:
             return redirect(presigned_url)
-        else:
-            return jsonify({'error': 'Audio file not found'}), 404
+        return stream_file(filename)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1067,6 +4502,7 @@ def test_translation():
     """Test translation functionality independently"""
     try:
         # Check if Claude client is configured
+        claude_client = get_claude_client()
         if not claude_client:
             return jsonify({
                 'success': False,
@@ -1147,7 +4583,7 @@ def test_workflow_status():
         # Also check R2 bucket contents
         r2_files = []
         try:
-            response = r2_client.list_objects_v2(Bucket=R2_BUCKET_NAME)
+            response = get_r2_client().list_objects_v2(Bucket=R2_BUCKET_NAME)
             if 'Contents' in response:
                 r2_files = [obj['Key'] for obj in response['Contents']]
         except Exception as r2_error:
@@ -1167,68 +4603,60 @@ def test_workflow_status():
 def test_transcription():
     """Test transcription with current audio file"""
     try:
-        audio_file = workflow_state.get('audioFile')
-        print(f"Testing transcription with audio file: {audio_file}")
-        
-        if not audio_file:
-            return jsonify({
-                'success': False,
-                'error': 'No audio file in workflow state',
-                'workflow_state': workflow_state
-            }), 400
-        
-        # Test R2 download first
-        filename = audio_file.split('/')[-1]
-        print(f"Attempting to download: {filename}")
-        
-        temp_path = download_file_from_r2(filename)
-        if not temp_path:
-            return jsonify({
-                'success': False,
-                'error': f'Failed to download {filename} from R2',
-                'audio_file': audio_file,
-                'filename': filename
-            }), 500
-        
-        # Check downloaded file
-        file_size = os.path.getsize(temp_path)
-        print(f"Downloaded file size: {file_size} bytes")
-        
-        if file_size == 0:
-            os.unlink(temp_path)
-            return jsonify({
-                'success': False,
-                'error': 'Downloaded audio file is empty',
-                'file_size': file_size
-            }), 500
-        
-        # Test OpenAI API
-        print("Testing OpenAI Whisper...")
-        try:
-            with open(temp_path, 'rb') as audio:
-                response = openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio,
-                    response_format="text"
-                )
+        with scratch_job():
+            audio_file = workflow_state.get('audioFile')
+            print(f"Testing transcription with audio file: {audio_file}")
             
-            os.unlink(temp_path)  # Clean up
+            if not audio_file:
+                return jsonify({
+                    'success': False,
+                    'error': 'No audio file in workflow state',
+                    'workflow_state': workflow_state
+                }), 400
             
-            return jsonify({
-                'success': True,
-                'transcript': response,
-                'file_size': file_size,
-                'message': 'Transcription test successful'
-            })
+            # Test R2 download first
+            filename = audio_file.split('/')[-1]
+            print(f"Attempting to download: {filename}")
+            
+            temp_path = download_file_from_r2(filename)
+            if not temp_path:
+                return jsonify({
+                    'success': False,
+                    'error': f'Failed to download {filename} from R2',
+                    'audio_file': audio_file,
+                    'filename': filename
+                }), 500
+            
+            # Check downloaded file
+            file_size = os.path.getsize(temp_path)
+            print(f"Downloaded file size: {file_size} bytes")
+            
+            if file_size == 0:
+                return jsonify({
+                    'success': False,
+                    'error': 'Downloaded audio file is empty',
+                    'file_size': file_size
+                }), 500
+            
+            # Test OpenAI API
+            print("Testing OpenAI Whisper...")
+            try:
+                response = transcript_extractor.whisper_request(get_openai_client(), temp_path).text
+                
+                return jsonify({
+                    'success': True,
+                    'transcript': response,
+                    'file_size': file_size,
+                    'message': 'Transcription test successful'
+                })
+                
+            except Exception as openai_error:
+                return jsonify({
+                    'success': False,
+                    'error': f'OpenAI API error: {str(openai_error)}',
+                    'file_size': file_size
+                }), 500
             
-        except Exception as openai_error:
-            os.unlink(temp_path)  # Clean up
-            return jsonify({
-                'success': False,
-                'error': f'OpenAI API error: {str(openai_error)}',
-                'file_size': file_size
-            }), 500
-        
     except Exception as e:
         print(f"Test transcription error: {e}")
         import traceback
@@ -1243,77 +4671,70 @@ def test_transcription():
 def test_transcribe_r2():
     """Test transcription with any audio file found in R2"""
     try:
-        # List R2 files and find an audio file
-        response = r2_client.list_objects_v2(Bucket=R2_BUCKET_NAME)
-        if 'Contents' not in response:
-            return jsonify({
-                'success': False,
-                'error': 'No files found in R2 bucket',
-                'bucket': R2_BUCKET_NAME
-            }), 404
-        
-        audio_files = []
-        for obj in response['Contents']:
-            filename = obj['Key']
-            if filename.endswith(('.mp3', '.wav', '.m4a')):
-                audio_files.append({
-                    'filename': filename,
-                    'size': obj['Size'],
-                    'last_modified': str(obj['LastModified'])
-                })
-        
-        if not audio_files:
-            return jsonify({
-                'success': False,
-                'error': 'No audio files found in R2 bucket',
-                'all_files': [obj['Key'] for obj in response['Contents']]
-            }), 404
-        
-        # Use the most recent audio file
-        latest_audio = sorted(audio_files, key=lambda x: x['last_modified'])[-1]
-        filename = latest_audio['filename']
-        
-        print(f"Testing transcription with R2 file: {filename}")
-        
-        # Download and transcribe
-        temp_path = download_file_from_r2(filename)
-        if not temp_path:
-            return jsonify({
-                'success': False,
-                'error': f'Failed to download {filename} from R2'
-            }), 500
-        
-        file_size = os.path.getsize(temp_path)
-        print(f"Downloaded file size: {file_size} bytes")
-        
-        # Test transcription
-        try:
-            with open(temp_path, 'rb') as audio:
-                response = openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio,
-                    response_format="text"
-                )
+        with scratch_job():
+            # List R2 files and find an audio file
+            response = get_r2_client().list_objects_v2(Bucket=R2_BUCKET_NAME)
+            if 'Contents' not in response:
+                return jsonify({
+                    'success': False,
+                    'error': 'No files found in R2 bucket',
+                    'bucket': R2_BUCKET_NAME
+                }), 404
             
-            os.unlink(temp_path)  # Clean up
+            audio_files = []
+            for obj in response['Contents']:
+                filename = obj['Key']
+                if filename.endswith(('.mp3', '.wav', '.m4a')):
+                    audio_files.append({
+                        'filename': filename,
+                        'size': obj['Size'],
+                        'last_modified': str(obj['LastModified'])
+                    })
             
-            return jsonify({
-                'success': True,
-                'filename': filename,
-                'file_size': file_size,
-                'transcript': response,
-                'message': 'R2 transcription test successful'
-            })
+            if not audio_files:
+                return jsonify({
+                    'success': False,
+                    'error': 'No audio files found in R2 bucket',
+                    'all_files': [obj['Key'] for obj in response['Contents']]
+                }), 404
+            
+            # Use the most recent audio file
+            latest_audio = sorted(audio_files, key=lambda x: x['last_modified'])[-1]
+            filename = latest_audio['filename']
+            
+            print(f"Testing transcription with R2 file: {filename}")
+            
+            # Download and transcribe
+            temp_path = download_file_from_r2(filename)
+            if not temp_path:
+                return jsonify({
+                    'success': False,
+                    'error': f'Failed to download {filename} from R2'
+                }), 500
+            
+            file_size = os.path.getsize(temp_path)
+            print(f"Downloaded file size: {file_size} bytes")
+            
+            # Test transcription
+            try:
+                response = transcript_extractor.whisper_request(get_openai_client(), temp_path).text
+                
+                return jsonify({
+                    'success': True,
+                    'filename': filename,
+                    'file_size': file_size,
+                    'transcript': response,
+                    'message': 'R2 transcription test successful'
+                })
+                
+            except Exception as openai_error:
+                return jsonify({
+                    'success': False,
+                    'error': f'OpenAI API error: {str(openai_error)}',
+                    'filename': filename,
+                    'file_size': file_size
+                }), 500
             
-        except Exception as openai_error:
-            os.unlink(temp_path)  # Clean up
-            return jsonify({
-                'success': False,
-                'error': f'OpenAI API error: {str(openai_error)}',
-                'filename': filename,
-                'file_size': file_size
-            }), 500
-        
     except Exception as e:
         return jsonify({
             'success': False,
@@ -1325,7 +4746,7 @@ def test_lip_sync():
     """Test lip sync functionality with existing files"""
     try:
         # Get existing video and audio files from R2
-        response = r2_client.list_objects_v2(Bucket=R2_BUCKET_NAME)
+        response = get_r2_client().list_objects_v2(Bucket=R2_BUCKET_NAME)
         if 'Contents' not in response:
             return jsonify({
                 'success': False,
@@ -1418,7 +4839,7 @@ def test_wav2lip_api():
             # Test GET
             try:
                 print(f"Testing GET {endpoint}")
-                response = requests.get(endpoint, headers=headers, timeout=10)
+                response = call_with_rate_control('syncso', lambda: requests.get(endpoint, headers=headers, timeout=call_timeout(10)), attempts=1)
                 results[endpoint]['GET'] = {
                     'status_code': response.status_code,
                     'response': response.text[:500] if response.text else 'No content'
@@ -1430,7 +4851,7 @@ def test_wav2lip_api():
             try:
                 print(f"Testing POST {endpoint}")
                 test_data = {'test': True}
-                response = requests.post(endpoint, headers=headers, json=test_data, timeout=10)
+                response = call_with_rate_control('syncso', lambda: requests.post(endpoint, headers=headers, json=test_data, timeout=call_timeout(10)), attempts=1)
                 results[endpoint]['POST'] = {
                     'status_code': response.status_code,
                     'response': response.text[:500] if response.text else 'No content'
@@ -1453,7 +4874,24 @@ def test_wav2lip_api():
             'traceback': traceback.format_exc()
         }), 500
 
+def serve_ingested_output(job_id, payload):
+    """Point a finished job's payload at our R2 copy, or hold it as ingesting until the copy lands"""
+    if not LIP_SYNC_INGEST:
+        return
+    row = get_job_ledger().find_provider_job('syncso', job_id)
+    outputs = (row and row['outputs']) or {}
+    result = payload.setdefault('result', {})
+    if outputs.get('r2_url'):
+        result['providerOutputUrl'] = result.get('outputUrl')
+        result['outputUrl'] = outputs['r2_url']
+    elif outputs.get('ingest_error'):
+        payload['ingest_error'] = outputs['ingest_error']  # serve the provider's URL rather than nothing
+    else:
+        payload['status'] = result['status'] = 'INGESTING'
+        payload['message'] = 'Job status: copying the video to storage'
+
 @app.route('/api/check-lip-sync-status/<job_id>')
+@traced('stage.lip_sync_status')
 def check_lip_sync_status(job_id):
     """Check the status of a lip sync job"""
     try:
@@ -1462,55 +4900,11 @@ def check_lip_sync_status(job_id):
                 'success': False,
                 'error': 'WAV2LIP_API_KEY not configured'
             }), 500
-            
-        headers = {
-            "x-api-key": WAV2LIP_API_KEY
-        }
-        
-        # Try different possible status endpoints
-        possible_urls = [
-            f"https://api.sync.so/v2/generate/{job_id}",
-            f"https://api.sync.so/v2/jobs/{job_id}",
-            f"https://api.sync.so/v2/status/{job_id}",
-            f"https://api.sync.so/generate/{job_id}"
-        ]
-        
-        for url in possible_urls:
-            try:
-                print(f"Checking job status at: {url}")
-                response = requests.get(url, headers=headers, timeout=30)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    status = result.get('status', 'unknown')
-                    
-                    return jsonify({
-                        'success': True,
-                        'job_id': job_id,
-                        'status': status,
-                        'result': result,
-                        'endpoint_used': url,
-                        'message': f'Job status: {status}'
-                    })
-                elif response.status_code == 404:
-                    continue  # Try next endpoint
-                else:
-                    return jsonify({
-                        'success': False,
-                        'job_id': job_id,
-                        'error': f'Status check failed: {response.status_code} - {response.text}',
-                        'endpoint_used': url
-                    })
-                    
-            except Exception as e:
-                continue  # Try next endpoint
         
-        return jsonify({
-            'success': False,
-            'job_id': job_id,
-            'error': 'Could not find working status endpoint',
-            'tried_endpoints': possible_urls
-        }), 404
+        payload, status_code = pipeline_engine.run(lip_sync.check_status_async(job_id))
+        if lip_sync.record_status(job_id, payload) == 'completed':
+            serve_ingested_output(job_id, payload)
+        return jsonify(payload), status_code
         
     except Exception as e:
         import traceback
@@ -1521,12 +4915,35 @@ def check_lip_sync_status(job_id):
             'traceback': traceback.format_exc()
         }), 500
 
+@app.route('/api/pipeline-jobs/<job_id>')
+def get_pipeline_job(job_id):
+    """Status and result of a background pipeline job"""
+    job = pipeline_engine.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found', 'job_id': job_id}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs')
+def list_jobs():
+    """Ledger jobs, newest first (filter with ?stage=, ?status= and ?project_id=)"""
+    statuses = [status for status in request.args.get('status', '').split(',') if status]
+    rows = get_job_ledger().list(project_id=request.args.get('project_id'), stage=request.args.get('stage'),
+                                 statuses=statuses, limit=min(request.args.get('limit', 100, type=int), 500))
+    return jsonify({'jobs': rows})
+
+@app.route('/api/artifacts')
+def list_artifacts():
+    """Files produced by jobs and stored in R2 (filter with ?job_id=, ?project_id= and ?kind=)"""
+    rows = get_job_ledger().artifacts(job_id=request.args.get('job_id'), project_id=request.args.get('project_id'),
+                                      kind=request.args.get('kind'), limit=min(request.args.get('limit', 100, type=int), 500))
+    return jsonify({'artifacts': rows})
+
 @app.route('/api/test-r2-access', methods=['GET', 'POST'])
 def test_r2_access():
     """Test R2 bucket access and public URL configuration"""
     try:
         # List files in R2
-        response = r2_client.list_objects_v2(Bucket=R2_BUCKET_NAME)
+        response = get_r2_client().list_objects_v2(Bucket=R2_BUCKET_NAME)
         if 'Contents' not in response:
             return jsonify({
                 'success': False,
@@ -1546,14 +4963,14 @@ def test_r2_access():
             presigned_status = 'unknown'
             
             try:
-                direct_test = requests.head(direct_url, timeout=10)
+                direct_test = requests.head(direct_url, timeout=call_timeout(10))
                 direct_status = direct_test.status_code
             except Exception as e:
                 direct_status = f"error: {str(e)}"
             
             try:
                 if presigned_url:
-                    presigned_test = requests.head(presigned_url, timeout=10)
+                    presigned_test = requests.head(presigned_url, timeout=call_timeout(10))
                     presigned_status = presigned_test.status_code
                 else:
                     presigned_status = "no_url_generated"
@@ -1575,7 +4992,7 @@ def test_r2_access():
         
         # Check bucket policy
         try:
-            bucket_policy = r2_client.get_bucket_policy(Bucket=R2_BUCKET_NAME)
+            bucket_policy = get_r2_client().get_bucket_policy(Bucket=R2_BUCKET_NAME)
             policy_info = "Policy exists"
         except Exception as e:
             policy_info = f"No policy or error: {str(e)}"
@@ -1621,7 +5038,7 @@ def check_all_jobs():
         for endpoint in list_endpoints:
             try:
                 print(f"Checking jobs at: {endpoint}")
-                response = requests.get(endpoint, headers=headers, timeout=30)
+                response = call_with_rate_control('syncso', lambda: requests.get(endpoint, headers=headers, timeout=call_timeout(30)), attempts=1)
                 
                 if response.status_code == 200:
                     result = response.json()
@@ -1670,7 +5087,7 @@ def list_elevenlabs_voices():
             "xi-api-key": ELEVENLABS_API_KEY
         }
         
-        response = requests.get(url, headers=headers, timeout=30)
+        response = call_with_rate_control('elevenlabs', lambda: requests.get(url, headers=headers, timeout=call_timeout(30)))
         
         if response.status_code == 200:
             result = response.json()
@@ -1744,7 +5161,7 @@ def debug_env():
         return jsonify({
             'success': True,
             'environment_variables': env_info,
-            'openai_client_status': 'CONFIGURED' if openai_client else 'NOT_CONFIGURED'
+            'openai_client_status': 'CONFIGURED' if get_openai_client() else 'NOT_CONFIGURED'
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -1761,5 +5178,6 @@ if __name__ == '__main__':
     print(f"📱 Access at: http://localhost:{port}")
     print("⚡ Full API integration enabled!")
     print(f"📁 Upload directory: {app.config['UPLOAD_FOLDER']}")
+    resume_ledger_jobs()
     
     app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
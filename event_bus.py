@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Event bus - in-process fan-out of progress events to Server-Sent Events
+streams. Events get increasing IDs and the most recent ones are kept, so a
+client that reconnects with Last-Event-ID gets what it missed (or is told to
+resync when it missed more than the history holds).
+"""
+
+import json
+import time
+import threading
+from collections import deque
+
+
+class EventStreamsFull(Exception):
+    pass
+
+
+class EventBus:
+    def __init__(self, history=500, max_streams=16):
+        self.max_streams = max_streams
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=history)
+        # IDs start from the clock so a client reconnecting after a restart is behind, not ahead
+        self.last_id = int(time.time() * 1000)
+        self.streams = 0
+        self.closed = False
+
+    def publish(self, event_type, data=None, project_id=None):
+        """Record an event and wake every stream; returns the event"""
+        with self.condition:
+            self.last_id += 1
+            event = {'id': self.last_id, 'type': event_type, 'project_id': project_id,
+                     'time': time.time(), 'data': data or {}}
+            self.events.append(event)
+            self.condition.notify_all()
+        return event
+
+    def since(self, last_id, timeout=None):
+        """Events after last_id, waiting up to timeout for one to arrive
+
+        When events after last_id have already dropped out of the history
+        (or were published before a restart), a 'resync' event comes first.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.last_id != last_id or self.closed, timeout)
+            oldest = self.events[0]['id'] if self.events else self.last_id + 1
+            events = [event for event in self.events if event['id'] > last_id]
+            if last_id > self.last_id:
+                resync_id = self.last_id
+            elif last_id + 1 < oldest:
+                resync_id = oldest - 1
+            else:
+                return events
+            return [{'id': resync_id, 'type': 'resync', 'project_id': None, 'time': time.time(), 'data': {}}] + events
+
+    def open_stream(self):
+        with self.condition:
+            if self.closed or self.streams >= self.max_streams:
+                raise EventStreamsFull(f"{self.streams} event streams already open")
+            self.streams += 1
+
+    def close_stream(self):
+        with self.condition:
+            self.streams -= 1
+
+    def close(self):
+        """Wake and end every stream (worker shutdown)"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    @staticmethod
+    def format(event):
+        """SSE wire format for one event"""
+        return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
@@ -0,0 +1,81 @@
+"""
+Gunicorn configuration for production serving
+Start with: gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+import time
+import signal
+
+# Workflow state is held in process memory, so the default is a single
+# pre-forked worker with a thread pool. Raise WEB_CONCURRENCY only once
+# state is shared between processes.
+bind = f"0.0.0.0:{os.environ.get('PORT', 3000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# Load app.py once in the master; workers fork from it
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Recycle workers after N requests (with jitter so they don't all restart together)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 500))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 50))
+
+# Long-running uploads and synchronous stages (100MB uploads, Whisper, lip sync submit)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 120))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+# When this worker was told to stop; the master's graceful_timeout runs from here
+shutdown_started = None
+
+
+def mark_shutdown():
+    global shutdown_started
+    if shutdown_started is None:
+        shutdown_started = time.monotonic()
+
+
+def post_worker_init(worker):
+    """Resume jobs a previous worker left in flight (see the job ledger in app.py)"""
+    from app import resume_ledger_jobs
+
+    # Note when SIGTERM arrives: finishing open requests uses up the grace period before worker_exit
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def on_sigterm(signum, frame):
+        mark_shutdown()
+        if callable(handle_exit):
+            handle_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+    resume_ledger_jobs()
+
+
+def worker_int(worker):
+    mark_shutdown()
+
+
+def worker_exit(server, worker):
+    """Flush spans, then drain in-flight pipeline jobs before a worker goes away
+
+    Runs on SIGTERM and on max_requests recycling (where no signal starts
+    the clock). The master kills the worker graceful_timeout after the
+    signal, so the drain gets what is left of that, less a few seconds.
+    """
+    from app import event_bus, pipeline_engine, trace_recorder
+
+    mark_shutdown()
+    ends = shutdown_started + graceful_timeout - 5
+    event_bus.close()  # end open /api/events streams; browsers reconnect to another worker
+    trace_recorder.flush(timeout=max(min(5, ends - time.monotonic()), 0))
+    still_running = pipeline_engine.drain(max(ends - time.monotonic() - 2, 0))
+    if still_running:
+        server.log.warning(f"Worker {worker.pid} exiting with {still_running} pipeline tasks unfinished")
+    trace_recorder.flush(timeout=max(ends - time.monotonic(), 0))  # spans of the drained jobs, if time is left
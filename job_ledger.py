@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Job ledger - durable record of pipeline stages and paid provider jobs
+SQLite in WAL mode, so request threads and the pipeline engine can write
+concurrently. Rows carry the stage inputs, outputs, provider job ID and an
+idempotency key. Each process holds a lease on the rows it owns and renews
+it with heartbeat(); in-flight rows whose lease has run out belong to a
+process that is gone (or a previous deploy) and can be claimed and resumed. Files a job produced in our bucket are registered
+as artifacts alongside it.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import hashlib
+import threading
+
+IN_FLIGHT_STATUSES = ('pending', 'running', 'submitted')
+TERMINAL_STATUSES = ('completed', 'failed', 'timed_out', 'cancelled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    idempotency_key TEXT UNIQUE,
+    project_id TEXT,
+    stage TEXT NOT NULL,
+    provider TEXT,
+    provider_job_id TEXT,
+    status TEXT NOT NULL,
+    inputs TEXT,
+    outputs TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_provider_job ON jobs (provider, provider_job_id);
+CREATE INDEX IF NOT EXISTS jobs_project ON jobs (project_id, created_at);
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    job_id TEXT,
+    project_id TEXT,
+    kind TEXT NOT NULL,
+    url TEXT NOT NULL,
+    source_url TEXT,
+    content_type TEXT,
+    size INTEGER,
+    metadata TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_job ON artifacts (job_id);
+CREATE INDEX IF NOT EXISTS artifacts_project ON artifacts (project_id, created_at);
+"""
+
+JSON_FIELDS = ('inputs', 'outputs', 'metadata')
+
+
+def idempotency_key(stage, inputs):
+    """Stable key for a stage run with these inputs"""
+    payload = json.dumps([stage, inputs], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+_owners = {}
+
+
+def process_owner():
+    """ID of this process for this boot; a restarted container reusing the PID gets a new one"""
+    pid = os.getpid()
+    if pid not in _owners:
+        _owners[pid] = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:12]}"
+    return _owners[pid]
+
+
+class JobLedger:
+    def __init__(self, path, lease_seconds=90):
+        """Rows are leased for lease_seconds; call heartbeat() well within that"""
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(jobs)')]
+            if 'lease_until' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN lease_until REAL')
+
+    def _connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            # Connections must not cross a fork, so each process/thread opens its own
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=10000')
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return _Transaction(conn)
+
+    @staticmethod
+    def _row(row):
+        if row is None:
+            return None
+        job = dict(row)
+        for field in JSON_FIELDS:
+            if job.get(field) is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+    def begin(self, stage, inputs, key=None, project_id=None, provider=None, status='running'):
+        """Create a job row, or return the existing row for the same idempotency key
+
+        Returns (job, created).
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            # The write lock is taken before the lookup, so concurrent begins with one key can't both insert
+            conn.execute('BEGIN IMMEDIATE')
+            if key:
+                existing = conn.execute('SELECT * FROM jobs WHERE idempotency_key = ?', (key,)).fetchone()
+                if existing:
+                    return self._row(existing), False
+            conn.execute(
+                'INSERT INTO jobs (job_id, idempotency_key, project_id, stage, provider, status, inputs,'
+                ' attempts, owner, lease_until, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?, ?)',
+                (job_id, key, project_id, stage, provider, status,
+                 json.dumps(inputs, default=str), process_owner(), now + self.lease_seconds, now, now)
+            )
+        return self.get(job_id), True
+
+    def update(self, job_id, **fields):
+        """Set columns on a job (inputs/outputs are stored as JSON)"""
+        if not fields:
+            return self.get(job_id)
+        for field in JSON_FIELDS:
+            if field in fields and fields[field] is not None:
+                fields[field] = json.dumps(fields[field], default=str)
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE job_id = ?', (*fields.values(), job_id))
+        return self.get(job_id)
+
+    def restart(self, job_id, status='running'):
+        """Take over a failed or abandoned job for another attempt"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = NULL, attempts = attempts + 1, owner = ?, lease_until = ?,'
+                ' updated_at = ? WHERE job_id = ?', (status, process_owner(), now + self.lease_seconds, now, job_id)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            return self._row(conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone())
+
+    def find_provider_job(self, provider, provider_job_id):
+        with self._connect() as conn:
+            return self._row(conn.execute(
+                'SELECT * FROM jobs WHERE provider = ? AND provider_job_id = ? ORDER BY created_at DESC LIMIT 1',
+                (provider, provider_job_id)
+            ).fetchone())
+
+    def list(self, project_id=None, stage=None, statuses=None, limit=100):
+        clauses, params = [], []
+        if project_id:
+            clauses.append('project_id = ?')
+            params.append(project_id)
+        if stage:
+            clauses.append('stage = ?')
+            params.append(stage)
+        if statuses:
+            clauses.append(f"status IN ({', '.join('?' for _ in statuses)})")
+            params.extend(statuses)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._connect() as conn:
+            rows = conn.execute(f'SELECT * FROM jobs {where} ORDER BY created_at DESC LIMIT ?', (*params, limit)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def heartbeat(self):
+        """Renew the lease on this process's in-flight jobs; returns how many"""
+        now = time.time()
+        with self._connect() as conn:
+            return conn.execute(
+                f"UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN ({', '.join('?' for _ in IN_FLIGHT_STATUSES)})",
+                (now + self.lease_seconds, process_owner(), *IN_FLIGHT_STATUSES)
+            ).rowcount
+
+    def claim_abandoned(self):
+        """Claim in-flight jobs of other owners whose lease has run out; returns the claimed rows
+
+        Rows from before leases were recorded fall back to updated_at.
+        """
+        owner = process_owner()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            claimed = [row['job_id'] for row in conn.execute(
+                f"SELECT job_id FROM jobs WHERE status IN ({', '.join('?' for _ in IN_FLIGHT_STATUSES)})"
+                ' AND (owner IS NULL OR owner != ?) AND COALESCE(lease_until, updated_at + ?) < ? ORDER BY created_at',
+                (*IN_FLIGHT_STATUSES, owner, self.lease_seconds, now)
+            ).fetchall()]
+            for job_id in claimed:
+                conn.execute('UPDATE jobs SET owner = ?, lease_until = ?, updated_at = ? WHERE job_id = ?',
+                             (owner, now + self.lease_seconds, now, job_id))
+        return [self.get(job_id) for job_id in claimed]
+
+    def add_artifact(self, key, kind, url, job_id=None, project_id=None, source_url=None,
+                     content_type=None, size=None, metadata=None):
+        """Register (or replace) a stored file produced by a job"""
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO artifacts (key, job_id, project_id, kind, url, source_url, content_type,'
+                ' size, metadata, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, job_id, project_id, kind, url, source_url, content_type, size,
+                 json.dumps(metadata, default=str) if metadata is not None else None, time.time())
+            )
+        return self.artifact(key)
+
+    def artifact(self, key):
+        with self._connect() as conn:
+            return self._row(conn.execute('SELECT * FROM artifacts WHERE key = ?', (key,)).fetchone())
+
+    def artifacts(self, job_id=None, project_id=None, kind=None, limit=100):
+        clauses, params = [], []
+        for column, value in (('job_id', job_id), ('project_id', project_id), ('kind', kind)):
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._connect() as conn:
+            rows = conn.execute(f'SELECT * FROM artifacts {where} ORDER BY created_at DESC LIMIT ?', (*params, limit)).fetchall()
+        return [self._row(row) for row in rows]
+
+
+class _Transaction:
+    """Context manager committing (or rolling back) an explicit transaction on a cached connection"""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.conn.in_transaction:
+            self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
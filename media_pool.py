@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Media worker pool - CPU-heavy media work (ffmpeg encodes, decodes, remuxes) runs
+as child processes, at most max_workers at a time and in priority order, so it
+can't starve the threads serving requests. Waiting callers form a bounded
+queue; each task gets a wall-clock timeout, a CPU-seconds limit and a lower
+scheduling priority (nice).
+"""
+
+import os
+import time
+import heapq
+import itertools
+import threading
+import subprocess
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0  # a request is waiting on the result
+PRIORITY_NORMAL = 10
+PRIORITY_BATCH = 20       # background post-processing
+
+
+class MediaQueueFull(Exception):
+    pass
+
+
+class MediaWorkerPool:
+    def __init__(self, max_workers=2, max_queue=32, cpu_seconds=None, nice=10):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.cpu_seconds = cpu_seconds
+        self.nice = nice
+        self.condition = threading.Condition()
+        self.waiting = []  # heap of (priority, sequence)
+        self.sequence = itertools.count()
+        self.active = 0
+        self.stats = {'completed': 0, 'failed': 0, 'timed_out': 0, 'rejected': 0}
+
+    def _acquire(self, priority, timeout):
+        """Wait for a worker slot in priority order (FIFO within a priority)"""
+        with self.condition:
+            if len(self.waiting) >= self.max_queue:
+                self.stats['rejected'] += 1
+                raise MediaQueueFull(f"Media queue is full ({self.max_queue} tasks waiting)")
+            entry = (priority, next(self.sequence))
+            heapq.heappush(self.waiting, entry)
+            try:
+                acquired = self.condition.wait_for(
+                    lambda: self.active < self.max_workers and self.waiting[0] == entry, timeout)
+            finally:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                self.condition.notify_all()
+            if acquired:
+                self.active += 1
+            return acquired
+
+    def _release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def _limit(self, pid, cpu_seconds):
+        """Apply nice and RLIMIT_CPU to a started child (Linux only for the CPU limit)"""
+        try:
+            if self.nice:
+                os.setpriority(os.PRIO_PROCESS, pid, self.nice)
+            if cpu_seconds and resource is not None and hasattr(resource, 'prlimit'):
+                resource.prlimit(pid, resource.RLIMIT_CPU, (int(cpu_seconds), int(cpu_seconds) + 5))
+        except (OSError, AttributeError):
+            pass  # the child may already have exited
+
+    def run(self, command, priority=PRIORITY_NORMAL, timeout=None, cpu_seconds=None, input=None):
+        """Run a command in a worker slot; same contract as subprocess.run(check=True, capture_output=True)
+
+        timeout covers both the wait for a slot and the run. Raises
+        MediaQueueFull when too many tasks are waiting, and
+        subprocess.TimeoutExpired when the timeout passes (a running
+        command is killed).
+        """
+        started = time.monotonic()
+        if not self._acquire(priority, timeout):
+            with self.condition:
+                self.stats['timed_out'] += 1
+            raise subprocess.TimeoutExpired(command, timeout)
+        if timeout is not None:
+            timeout = max(timeout - (time.monotonic() - started), 0.001)
+        outcome = 'failed'
+        try:
+            with subprocess.Popen(command, stdin=subprocess.PIPE if input is not None else None,
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+                self._limit(process.pid, cpu_seconds or self.cpu_seconds)
+                try:
+                    stdout, stderr = process.communicate(input, timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.communicate()
+                    outcome = 'timed_out'
+                    raise
+            if process.returncode:
+                raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+            outcome = 'completed'
+            return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+        finally:
+            self._release()
+            with self.condition:
+                self.stats[outcome] += 1
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'active': self.active,
+                'queued': len(self.waiting),
+                **self.stats
+            }
@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+"""
+Media probe - container header parsing for MP4/MOV/M4A, MP3, WAV, OGG and FLAC
+Returns duration, streams, codecs and sample rates without decoding, with
+results cached by a sampled content hash. Other containers fall back to ffmpeg.
+MP4s whose moov trails the media data can be laid out for fast start by
+moving the moov box forward and shifting its chunk offsets.
+"""
+
+import os
+import re
+import struct
+import hashlib
+import subprocess
+import threading
+from collections import OrderedDict
+
+HASH_SAMPLE_SIZE = 1024 * 1024  # bytes hashed from each end of the file
+
+
+def _is_path(source):
+    return isinstance(source, (str, bytes, os.PathLike))
+
+
+def _stream_size(f):
+    position = f.tell()
+    size = f.seek(0, os.SEEK_END)
+    f.seek(position)
+    return size
+
+
+def sample_hash(source):
+    """Hash of the file size plus its first and last HASH_SAMPLE_SIZE bytes
+
+    Not a hash of the whole file: files of equal size that differ only in
+    the middle collide. The probe cache accepts that because every format
+    parsed here keeps what it reads in the first or last bytes (moov, Xing,
+    fmt, STREAMINFO, the last Ogg page), so colliding files probe alike.
+    Don't use it to deduplicate or verify file contents.
+    source is a path or a seekable binary file object (its position is kept).
+    """
+    if _is_path(source):
+        with open(source, 'rb') as f:
+            return sample_hash(f)
+    position = source.tell()
+    size = _stream_size(source)
+    digest = hashlib.sha256(str(size).encode())
+    source.seek(0)
+    digest.update(source.read(HASH_SAMPLE_SIZE))
+    if size > HASH_SAMPLE_SIZE:
+        source.seek(max(HASH_SAMPLE_SIZE, size - HASH_SAMPLE_SIZE))
+        digest.update(source.read(HASH_SAMPLE_SIZE))
+    source.seek(position)
+    return digest.hexdigest()
+
+
+def _result(fmt, duration=None, streams=None, **extra):
+    result = {
+        'format': fmt,
+        'duration': round(duration, 3) if duration is not None else None,
+        'streams': streams or []
+    }
+    result.update(extra)
+    return result
+
+
+# MP4 / MOV / M4A (ISO base media)
+def _iter_boxes(data, start=0, end=None):
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack('>I4s', data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            break
+        yield box_type.decode('latin-1'), pos + header, min(pos + size, end)
+        pos += size
+
+
+def _find_box(data, path, start=0, end=None):
+    for box_type, body_start, body_end in _iter_boxes(data, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return body_start, body_end
+            return _find_box(data, path[1:], body_start, body_end)
+    return None
+
+
+def _read_moov(f, file_size):
+    """Read the moov box wherever it sits in the file (fast-start or not)"""
+    pos = 0
+    brand = None
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        if len(header) < 8:
+            break
+        size, box_type = struct.unpack('>I4s', header[:8])
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_size:
+            break
+        if box_type == b'ftyp':
+            brand = header[header_size:header_size + 4].decode('latin-1').strip()
+        elif box_type == b'moov':
+            f.seek(pos + header_size)
+            return brand, f.read(size - header_size), pos
+        pos += size
+    return brand, None, None
+
+
+def _full_box_times(data, start):
+    """(timescale, duration) from an mvhd/mdhd full box body"""
+    version = data[start]
+    if version == 1:
+        timescale, duration = struct.unpack('>IQ', data[start + 20:start + 32])
+    else:
+        timescale, duration = struct.unpack('>II', data[start + 12:start + 20])
+    return timescale, duration
+
+
+def _probe_mp4(f, file_size):
+    brand, moov, moov_offset = _read_moov(f, file_size)
+    if moov is None:
+        return _result('mp4', brand=brand, fast_start=None)
+
+    duration = None
+    mvhd = _find_box(moov, ['mvhd'])
+    if mvhd:
+        timescale, units = _full_box_times(moov, mvhd[0])
+        if timescale:
+            duration = units / timescale
+
+    streams = []
+    for box_type, trak_start, trak_end in _iter_boxes(moov):
+        if box_type != 'trak':
+            continue
+        stream = {}
+        hdlr = _find_box(moov, ['mdia', 'hdlr'], trak_start, trak_end)
+        if hdlr:
+            handler = moov[hdlr[0] + 8:hdlr[0] + 12]
+            stream['type'] = {b'soun': 'audio', b'vide': 'video'}.get(handler, handler.decode('latin-1'))
+        mdhd = _find_box(moov, ['mdia', 'mdhd'], trak_start, trak_end)
+        if mdhd:
+            timescale, units = _full_box_times(moov, mdhd[0])
+            if timescale:
+                stream['duration'] = round(units / timescale, 3)
+        stsd = _find_box(moov, ['mdia', 'minf', 'stbl', 'stsd'], trak_start, trak_end)
+        if stsd and stsd[1] - stsd[0] >= 16:
+            entry = stsd[0] + 8  # version/flags + entry_count
+            stream['codec'] = moov[entry + 4:entry + 8].decode('latin-1')
+            if stream.get('type') == 'audio' and stsd[1] - entry >= 36:
+                stream['channels'] = struct.unpack('>H', moov[entry + 24:entry + 26])[0]
+                stream['sample_rate'] = struct.unpack('>I', moov[entry + 32:entry + 36])[0] >> 16
+            elif stream.get('type') == 'video' and stsd[1] - entry >= 36:
+                stream['width'], stream['height'] = struct.unpack('>HH', moov[entry + 32:entry + 36])
+        stts = _find_box(moov, ['mdia', 'minf', 'stbl', 'stts'], trak_start, trak_end)
+        if stream.get('type') == 'video' and stts and stream.get('duration'):
+            count = struct.unpack('>I', moov[stts[0] + 4:stts[0] + 8])[0]
+            samples = sum(struct.unpack_from('>I', moov, stts[0] + 8 + i * 8)[0] for i in range(count))
+            stream['frame_rate'] = round(samples / stream['duration'], 3)
+        streams.append(stream)
+
+    # moov before the first mdat means playback can start before the whole file arrives
+    f.seek(0)
+    mdat_offset = None
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        size, box_type = struct.unpack('>I4s', header[:8])
+        if size == 1:
+            size = struct.unpack('>Q', header[8:16])[0]
+        elif size == 0:
+            size = file_size - pos
+        if box_type == b'mdat':
+            mdat_offset = pos
+            break
+        if size < 8:
+            break
+        pos += size
+
+    fmt = 'mov' if brand == 'qt' else ('m4a' if brand in ('M4A', 'M4B') else 'mp4')
+    return _result(fmt, duration, streams, brand=brand,
+                   fast_start=mdat_offset is None or moov_offset < mdat_offset)
+
+
+# MP3
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+
+
+def _parse_mp3_header(header):
+    b1, b2, b3 = header[1], header[2], header[3]
+    version = {0b11: 1, 0b10: 2, 0b00: 2.5}.get((b1 >> 3) & 0b11)
+    layer = {0b11: 1, 0b10: 2, 0b01: 3}.get((b1 >> 1) & 0b11)
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0b11
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    table_version = 1 if version == 1 else 2
+    return {
+        'version': version,
+        'layer': layer,
+        'bitrate': _MP3_BITRATES[(table_version, layer)][bitrate_index] * 1000,
+        'sample_rate': _MP3_SAMPLE_RATES[version][rate_index],
+        'channels': 1 if (b3 >> 6) == 0b11 else 2,
+        'samples_per_frame': 384 if layer == 1 else (1152 if layer == 2 or version == 1 else 576),
+    }
+
+
+def _probe_mp3(f, file_size):
+    head = f.read(10)
+    audio_start = 0
+    if head[:3] == b'ID3':
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        audio_start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+    f.seek(audio_start)
+    data = f.read(64 * 1024)
+
+    pos = data.find(b'\xff')
+    frame = None
+    while pos != -1 and pos + 4 <= len(data):
+        if data[pos + 1] & 0xE0 == 0xE0:
+            frame = _parse_mp3_header(data[pos:pos + 4])
+            if frame:
+                break
+        pos = data.find(b'\xff', pos + 1)
+    if not frame:
+        return None
+
+    # Xing/Info (VBR or LAME CBR) and VBRI headers carry the frame count
+    frames = None
+    side_info = (32 if frame['channels'] == 2 else 17) if frame['version'] == 1 else (17 if frame['channels'] == 2 else 9)
+    xing = pos + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', data[xing + 4:xing + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack('>I', data[xing + 8:xing + 12])[0]
+    elif data[pos + 36:pos + 40] == b'VBRI':
+        frames = struct.unpack('>I', data[pos + 50:pos + 54])[0]
+
+    if frames:
+        duration = frames * frame['samples_per_frame'] / frame['sample_rate']
+    else:
+        duration = (file_size - audio_start - pos) * 8 / frame['bitrate']
+
+    stream = {
+        'type': 'audio',
+        'codec': 'mp3',
+        'sample_rate': frame['sample_rate'],
+        'channels': frame['channels'],
+        'bitrate': frame['bitrate'],
+        'vbr': frames is not None and data[xing:xing + 4] != b'Info'
+    }
+    return _result('mp3', duration, [stream], frame_sync_offset=audio_start + pos)
+
+
+# WAV
+def _probe_wav(f, file_size):
+    f.seek(12)
+    stream = {'type': 'audio', 'codec': 'pcm'}
+    byte_rate = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id, chunk_size = struct.unpack('<4sI', chunk)
+        if chunk_id == b'fmt ':
+            fmt = f.read(chunk_size)
+            audio_format, channels, sample_rate, byte_rate, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+            stream.update({
+                'codec': 'pcm' if audio_format in (1, 0xFFFE) else ('float' if audio_format == 3 else f'wav_{audio_format}'),
+                'channels': channels,
+                'sample_rate': sample_rate,
+                'bits_per_sample': bits
+            })
+            if chunk_size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            duration = chunk_size / byte_rate if byte_rate else None
+            return _result('wav', duration, [stream])
+        else:
+            f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+    return _result('wav', None, [stream])
+
+
+# OGG (Opus, Vorbis, FLAC)
+def _probe_ogg(f, file_size):
+    header = f.read(27)
+    segment_count = header[26]
+    f.read(segment_count)
+    packet = f.read(64)
+
+    if packet.startswith(b'OpusHead'):
+        channels = packet[9]
+        pre_skip = struct.unpack('<H', packet[10:12])[0]
+        stream = {'type': 'audio', 'codec': 'opus', 'channels': channels,
+                  'sample_rate': struct.unpack('<I', packet[12:16])[0] or 48000}
+        granule_rate = 48000  # Opus granule positions always count 48 kHz samples
+    elif packet.startswith(b'\x01vorbis'):
+        pre_skip = 0
+        stream = {'type': 'audio', 'codec': 'vorbis', 'channels': packet[11],
+                  'sample_rate': struct.unpack('<I', packet[12:16])[0]}
+        granule_rate = stream['sample_rate']
+    elif packet.startswith(b'\x7fFLAC'):
+        pre_skip = 0
+        info = _parse_flac_streaminfo(packet[13 + 4:13 + 4 + 34])
+        stream = dict(info, type='audio', codec='flac')
+        stream.pop('total_samples', None)
+        granule_rate = stream['sample_rate']
+    else:
+        return _result('ogg')
+
+    # Duration comes from the granule position of the last page
+    f.seek(max(0, file_size - 64 * 1024))
+    tail = f.read()
+    last_page = tail.rfind(b'OggS')
+    duration = None
+    if last_page != -1 and last_page + 14 <= len(tail) and granule_rate:
+        granule = struct.unpack('<q', tail[last_page + 6:last_page + 14])[0]
+        if granule > 0:
+            duration = max(granule - pre_skip, 0) / granule_rate
+    return _result('ogg', duration, [stream])
+
+
+# FLAC
+def _parse_flac_streaminfo(block):
+    sample_rate = (block[10] << 12) | (block[11] << 4) | (block[12] >> 4)
+    channels = ((block[12] >> 1) & 0b111) + 1
+    bits = (((block[12] & 0b1) << 4) | (block[13] >> 4)) + 1
+    total_samples = ((block[13] & 0x0F) << 32) | struct.unpack('>I', block[14:18])[0]
+    return {'sample_rate': sample_rate, 'channels': channels, 'bits_per_sample': bits,
+            'total_samples': total_samples}
+
+
+def _probe_flac(f, file_size):
+    f.seek(4)
+    header = f.read(4)
+    if header[0] & 0x7F != 0:  # STREAMINFO must come first
+        return _result('flac')
+    info = _parse_flac_streaminfo(f.read(34))
+    duration = info['total_samples'] / info['sample_rate'] if info['sample_rate'] and info['total_samples'] else None
+    stream = {'type': 'audio', 'codec': 'flac', 'sample_rate': info['sample_rate'],
+              'channels': info['channels'], 'bits_per_sample': info['bits_per_sample']}
+    return _result('flac', duration, [stream])
+
+
+def probe_with_ffmpeg(path, ffmpeg_binary='ffmpeg'):
+    """Fallback for other containers: parse the stream summary ffmpeg prints"""
+    try:
+        output = subprocess.run([ffmpeg_binary, '-hide_banner', '-nostdin', '-i', path],
+                                capture_output=True, text=True, timeout=30).stderr
+    except Exception:
+        return _result(None)
+
+    duration = None
+    match = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', output)
+    if match:
+        duration = int(match.group(1)) * 3600 + int(match.group(2)) * 60 + float(match.group(3))
+
+    streams = []
+    for kind, details in re.findall(r'Stream #\d+:\d+.*?: (Audio|Video): (.*)', output):
+        stream = {'type': kind.lower(), 'codec': details.split(',')[0].split(' ')[0]}
+        rate = re.search(r'(\d+) Hz', details)
+        if rate:
+            stream['sample_rate'] = int(rate.group(1))
+        size = re.search(r', (\d{2,5})x(\d{2,5})', details)
+        if size:
+            stream['width'], stream['height'] = int(size.group(1)), int(size.group(2))
+        fps = re.search(r'([\d.]+) fps', details)
+        if fps:
+            stream['frame_rate'] = float(fps.group(1))
+        streams.append(stream)
+
+    container = re.search(r'Input #0, ([\w,]+), from', output)
+    return _result(container.group(1).split(',')[0] if container else None, duration, streams)
+
+
+def _probe_headers(f, file_size):
+    f.seek(0)
+    head = f.read(12)
+    f.seek(0)
+    try:
+        if head[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+            return _probe_mp4(f, file_size)
+        if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+            return _probe_wav(f, file_size)
+        if head[:4] == b'OggS':
+            return _probe_ogg(f, file_size)
+        if head[:4] == b'fLaC':
+            return _probe_flac(f, file_size)
+        if head[:3] == b'ID3' or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+            return _probe_mp3(f, file_size)
+    except (struct.error, IndexError, ValueError, ZeroDivisionError):
+        pass
+    return None
+
+
+def probe_file(source, ffmpeg_binary=None):
+    """Probe a media file (path or seekable binary file object) from its container headers
+
+    ffmpeg is only used as a fallback for paths whose container isn't parsed here.
+    """
+    if _is_path(source):
+        with open(source, 'rb') as f:
+            file_size = _stream_size(f)
+            result = _probe_headers(f, file_size)
+        if (result is None or result['duration'] is None) and ffmpeg_binary:
+            result = probe_with_ffmpeg(source, ffmpeg_binary)
+    else:
+        position = source.tell()
+        file_size = _stream_size(source)
+        result = _probe_headers(source, file_size)
+        source.seek(position)
+
+    result = result or _result(None)
+    result['size'] = file_size
+    return result
+
+
+# Fast start - moov moved ahead of mdat so playback can begin before the download ends
+CHUNK_OFFSET_PARENTS = ('trak', 'mdia', 'minf', 'stbl')
+
+
+def _top_level_boxes(f, file_size):
+    """[(type, offset, size)] of the top-level boxes"""
+    boxes = []
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        if len(header) < 8:
+            break
+        size, box_type = struct.unpack('>I4s', header[:8])
+        if size == 1:
+            size = struct.unpack('>Q', header[8:16])[0]
+        elif size == 0:
+            size = file_size - pos
+        if size < 8:
+            raise ValueError(f'Invalid {box_type!r} box at {pos}')
+        boxes.append((box_type.decode('latin-1'), pos, size))
+        pos += size
+    return boxes
+
+
+def _shift_chunk_offsets(moov, shift, below):
+    """Copy of a moov body with stco/co64 entries under `below` moved by `shift`"""
+    data = bytearray(moov)
+
+    def walk(start, end, depth):
+        for box_type, body_start, body_end in _iter_boxes(data, start, end):
+            if depth < len(CHUNK_OFFSET_PARENTS) and box_type == CHUNK_OFFSET_PARENTS[depth]:
+                walk(body_start, body_end, depth + 1)
+            elif depth == len(CHUNK_OFFSET_PARENTS) and box_type in ('stco', 'co64'):
+                fmt, width = ('>I', 4) if box_type == 'stco' else ('>Q', 8)
+                count = struct.unpack_from('>I', data, body_start + 4)[0]
+                for pos in range(body_start + 8, body_start + 8 + count * width, width):
+                    offset = struct.unpack_from(fmt, data, pos)[0]
+                    if offset < below:
+                        if box_type == 'stco' and offset + shift > 0xFFFFFFFF:
+                            raise ValueError('Shifted chunk offset does not fit in stco')
+                        struct.pack_into(fmt, data, pos, offset + shift)
+
+    walk(0, len(data), 0)
+    return bytes(data)
+
+
+def faststart_plan(f, file_size=None):
+    """How to lay out a seekable MP4 for fast start, or None if it already is (or isn't an MP4)
+
+    Returns a list of pieces to write in order: bytes (the rewritten moov box)
+    or (start, end) byte ranges copied unchanged from the source. Raises
+    ValueError for layouts this can't rewrite (compressed moov, 32-bit offset
+    overflow); remux those with ffmpeg instead.
+    """
+    file_size = _stream_size(f) if file_size is None else file_size
+    boxes = _top_level_boxes(f, file_size)
+    types = [box_type for box_type, _, _ in boxes]
+    if 'moov' not in types or 'mdat' not in types:
+        return None
+    moov_index, first_mdat = types.index('moov'), types.index('mdat')
+    if moov_index < first_mdat:
+        return None
+
+    _, moov_pos, moov_size = boxes[moov_index]
+    f.seek(moov_pos)
+    moov = f.read(moov_size)
+    declared_size = struct.unpack('>I', moov[:4])[0]
+    if declared_size == 0:
+        moov = struct.pack('>I', moov_size) + moov[4:]  # "to end of file" no longer holds once moved
+    header_size = 16 if declared_size == 1 else 8
+    if _find_box(moov, ['cmov'], header_size):
+        raise ValueError('Compressed moov boxes are not supported')
+    # Media before the old moov position moves down by the moov size; media after it stays put
+    moov = moov[:header_size] + _shift_chunk_offsets(moov[header_size:], moov_size, below=moov_pos)
+
+    pieces = []
+    for index, (_, pos, size) in enumerate(boxes):
+        if index == first_mdat:
+            pieces.append(moov)
+        if index == moov_index:
+            continue
+        if pieces and isinstance(pieces[-1], tuple) and pieces[-1][1] == pos:
+            pieces[-1] = (pieces[-1][0], pos + size)
+        else:
+            pieces.append((pos, pos + size))
+    return pieces
+
+
+class MediaProbeCache:
+    """Probe results cached by sample_hash, with aliases (e.g. R2 keys) pointing at hashes"""
+    def __init__(self, max_entries=512, ffmpeg_binary=None):
+        self.max_entries = max_entries
+        self.ffmpeg_binary = ffmpeg_binary
+        self.entries = OrderedDict()
+        self.aliases = OrderedDict()
+        self.lock = threading.Lock()
+
+    def probe(self, source, alias=None):
+        """Probe a path or file object (or return the cached result for identical content)"""
+        digest = sample_hash(source)
+        with self.lock:
+            info = self.entries.get(digest)
+            if info:
+                self.entries.move_to_end(digest)
+        if info is None:
+            info = dict(probe_file(source, self.ffmpeg_binary), sample_hash=digest)
+            with self.lock:
+                self.entries[digest] = info
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        if alias:
+            self.remember(alias, digest)
+        return info
+
+    def remember(self, alias, digest):
+        with self.lock:
+            self.aliases[alias] = digest
+            while len(self.aliases) > self.max_entries * 4:
+                self.aliases.popitem(last=False)
+
+    def lookup(self, alias):
+        """Cached probe result for an alias, or None"""
+        with self.lock:
+            digest = self.aliases.get(alias)
+            return self.entries.get(digest) if digest else None
+
+    def forget(self, alias):
+        """Drop an alias whose object was rewritten"""
+        with self.lock:
+            self.aliases.pop(alias, None)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Scratch space - temp media files live in per-job directories that are
+removed when the last user of the job lets go, so an exception can't leak
+them. Small files go to a RAM-backed directory (/dev/shm) when there is
+room, larger ones to disk. Disk reservations are held against a global
+byte quota; callers wait (up to a timeout) for space instead of filling
+the disk.
+"""
+
+import os
+import uuid
+import shutil
+import threading
+
+TIER_MEMORY = 'memory'
+TIER_DISK = 'disk'
+
+
+class ScratchQuotaExceeded(Exception):
+    pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _tree_size(path):
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total
+
+
+class ScratchJob:
+    """One job's scratch directories; use as a context manager to hold a reference"""
+    def __init__(self, space, job_id):
+        self.space = space
+        self.job_id = job_id
+        self.name = f"{os.getpid()}-{job_id}"
+        self.refs = 0
+        self.reservations = {}  # path -> (tier, bytes)
+        self.closed = False
+
+    def _directory(self, tier):
+        root = self.space.memory_root if tier == TIER_MEMORY else self.space.root
+        directory = os.path.join(root, self.name)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def path(self, suffix='', size=0, timeout=None):
+        """Reserve size bytes and return a fresh file path (the file is not created)
+
+        Files up to the memory threshold go to RAM while the memory budget
+        allows; everything else waits for room under the disk quota.
+        """
+        tier = self.space.reserve(size, timeout)
+        path = os.path.join(self._directory(tier), f"{uuid.uuid4().hex[:12]}{suffix}")
+        with self.space.condition:
+            self.reservations[path] = (tier, size)
+        return path
+
+    def directory(self, size=0, timeout=None):
+        """Reserve size bytes on disk for a directory of outputs (e.g. HLS segments)"""
+        self.space.reserve(size, timeout, tier=TIER_DISK)
+        path = os.path.join(self._directory(TIER_DISK), uuid.uuid4().hex[:12])
+        os.makedirs(path)
+        with self.space.condition:
+            self.reservations[path] = (TIER_DISK, size)
+        return path
+
+    def discard(self, path):
+        """Remove a file or directory early and return its reservation"""
+        with self.space.condition:
+            tier, size = self.reservations.pop(path, (None, 0))
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+        if tier:
+            self.space.unreserve(tier, size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.space.release(self)
+        return False
+
+
+class ScratchSpace:
+    """Both roots must be directories this class owns: sweep() deletes stale entries in them"""
+    def __init__(self, root, max_bytes, memory_root=None, memory_threshold=8 * 1024 * 1024,
+                 memory_max_bytes=64 * 1024 * 1024, wait_timeout=60):
+        """wait_timeout is seconds, or a callable returning them (e.g. to honour a request deadline)"""
+        self.root = root
+        self.max_bytes = max_bytes
+        self.memory_root = memory_root
+        self.memory_threshold = memory_threshold
+        self.memory_max_bytes = memory_max_bytes
+        self.wait_timeout = wait_timeout
+        os.makedirs(root, exist_ok=True)
+        if memory_root:
+            try:
+                os.makedirs(memory_root, exist_ok=True)
+            except OSError:
+                self.memory_root = None
+        self.condition = threading.Condition()
+        self.jobs = {}
+        self.reserved = {TIER_MEMORY: 0, TIER_DISK: 0}
+        self.stats = {'jobs_cleaned': 0, 'waits': 0, 'rejected': 0, 'swept': 0}
+
+    def job(self, job_id=None):
+        """Take a reference on a job's scratch (created on first use)"""
+        job_id = job_id or uuid.uuid4().hex
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None or job.closed:
+                job = self.jobs[job_id] = ScratchJob(self, job_id)
+            job.refs += 1
+            return job
+
+    def release(self, job):
+        """Drop a reference; the last one removes the job's files and frees its reservations"""
+        with self.condition:
+            job.refs -= 1
+            if job.refs > 0:
+                return
+            job.closed = True
+            if self.jobs.get(job.job_id) is job:
+                del self.jobs[job.job_id]
+            reservations, job.reservations = job.reservations, {}
+        for root in (self.root, self.memory_root):
+            if root:
+                shutil.rmtree(os.path.join(root, job.name), ignore_errors=True)
+        with self.condition:
+            for tier, size in reservations.values():
+                self.reserved[tier] -= size
+            self.stats['jobs_cleaned'] += 1
+            self.condition.notify_all()
+
+    def reserve(self, size, timeout=None, tier=None):
+        """Reserve size bytes; returns the tier. Raises ScratchQuotaExceeded if disk space doesn't free up in time"""
+        size = max(int(size or 0), 0)
+        with self.condition:
+            if tier != TIER_DISK and self._fits_in_memory(size):
+                self.reserved[TIER_MEMORY] += size
+                return TIER_MEMORY
+            if size > self.max_bytes:
+                self.stats['rejected'] += 1
+                raise ScratchQuotaExceeded(f"{size} bytes exceeds the {self.max_bytes} byte scratch quota")
+            if self.reserved[TIER_DISK] + size > self.max_bytes:
+                self.stats['waits'] += 1
+                if timeout is None:
+                    timeout = self.wait_timeout() if callable(self.wait_timeout) else self.wait_timeout
+                if not self.condition.wait_for(lambda: self.reserved[TIER_DISK] + size <= self.max_bytes, timeout):
+                    self.stats['rejected'] += 1
+                    raise ScratchQuotaExceeded(
+                        f"Scratch quota full ({self.reserved[TIER_DISK]} of {self.max_bytes} bytes reserved)")
+            self.reserved[TIER_DISK] += size
+            return TIER_DISK
+
+    def unreserve(self, tier, size):
+        with self.condition:
+            self.reserved[tier] -= size
+            self.condition.notify_all()
+
+    def _fits_in_memory(self, size):
+        if not self.memory_root or size > self.memory_threshold:
+            return False
+        if self.reserved[TIER_MEMORY] + size > self.memory_max_bytes:
+            return False
+        try:
+            return shutil.disk_usage(self.memory_root).free > size
+        except OSError:
+            return False
+
+    def sweep(self):
+        """Remove job directories left behind by processes that are gone; returns how many"""
+        removed = 0
+        for root in (self.root, self.memory_root):
+            if not root or not os.path.isdir(root):
+                continue
+            for entry in os.scandir(root):
+                pid, _, _ = entry.name.partition('-')
+                if not entry.is_dir() or not pid.isdigit() or _pid_alive(int(pid)):
+                    continue
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        with self.condition:
+            self.stats['swept'] += removed
+        return removed
+
+    def snapshot(self):
+        with self.condition:
+            jobs = {job.job_id: job.refs for job in self.jobs.values()}
+            reserved = dict(self.reserved)
+            stats = dict(self.stats)
+        return {
+            'jobs': jobs,
+            'disk_quota_bytes': self.max_bytes,
+            'disk_reserved_bytes': reserved[TIER_DISK],
+            'disk_used_bytes': _tree_size(self.root),
+            'memory_root': self.memory_root,
+            'memory_threshold_bytes': self.memory_threshold,
+            'memory_max_bytes': self.memory_max_bytes,
+            'memory_reserved_bytes': reserved[TIER_MEMORY],
+            'memory_used_bytes': _tree_size(self.memory_root) if self.memory_root else 0,
+            **stats
+        }
@@ -12,6 +12,11 @@ class ModularWorkflowApp {
         };
         this.activeLanguage = 'hindi';
         this.jobStatus = {};
+        this.jobWaiters = {};
+        this.finishedJobs = {};
+        this.resumableThreshold = 8 * 1024 * 1024;
+        this.resumableChunkSize = 8 * 1024 * 1024;
+        this.resumableMaxRetries = 5;
         
         this.init();
     }
@@ -23,6 +28,7 @@ class ModularWorkflowApp {
         this.setupFileHandlers();
         this.setupLanguageTabs();
         this.setupActionButtons();
+        this.connectEvents();
         this.loadExistingFiles();
         this.setupSidebar();
         this.setupGlobalLoader();
@@ -148,6 +154,10 @@ class ModularWorkflowApp {
             hide: () => {
                 if (!this.loader.el) return;
                 this.loader.el.hidden = true;
+            },
+            update: (message, subtext) => {
+                // Progress events only change the text of a loader that is already showing
+                if (this.loader.el && !this.loader.el.hidden) this.loader.show(message, subtext);
             }
         };
     }
@@ -401,6 +411,10 @@ class ModularWorkflowApp {
             this.startLipSync();
         });
         
+        document.getElementById('start-dub-only')?.addEventListener('click', () => {
+            this.startDubOnly();
+        });
+        
         document.getElementById('download-all-videos')?.addEventListener('click', () => {
             this.downloadAllVideos();
         });
@@ -433,6 +447,132 @@ class ModularWorkflowApp {
         }
     }
     
+    connectEvents() {
+        // Progress is pushed over Server-Sent Events; EventSource reconnects by itself and the
+        // server replays what was missed from Last-Event-ID
+        if (!window.EventSource) return;
+        const events = new EventSource('/api/events');
+        this.events = events;
+        const on = (type, handler) => events.addEventListener(type, (e) => handler(JSON.parse(e.data).data));
+        events.onerror = () => {
+            // A non-200 answer (e.g. 503 when every stream slot is taken) is fatal to EventSource:
+            // poll for waiting jobs instead and try the stream again later
+            if (events.readyState !== EventSource.CLOSED || this.events !== events) return;
+            this.events = null;
+            setTimeout(() => this.connectEvents(), 30000);
+        };
+        on('job', (job) => this.handleJobEvent(job));
+        on('language', (progress) => this.handleLanguageEvent(progress));
+        on('upload', (upload) => this.handleUploadEvent(upload));
+        on('lip_sync', (job) => this.handleLipSyncEvent(job));
+        on('resync', () => this.resyncState());
+    }
+
+    async runStageJob(path, body) {
+        // Long stages run as background jobs and their result arrives as a 'job' event,
+        // so no request is held open while Whisper, Claude or ElevenLabs work
+        const response = await fetch(path, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ...body, async: Boolean(this.events) })
+        });
+        const accepted = await response.json();
+        if (response.status !== 202) {
+            return { ok: response.ok, result: accepted };
+        }
+        const job = accepted.status === 'running' ? await this.waitForJob(accepted.job_id) : await this.fetchJob(accepted.job_id);
+        if (job.status === 'completed') {
+            return { ok: true, result: job.result };
+        }
+        return { ok: false, result: { error: job.error || `${accepted.stage} ${job.status}` } };
+    }
+
+    waitForJob(jobId) {
+        if (this.finishedJobs[jobId]) {
+            return Promise.resolve(this.finishedJobs[jobId]);
+        }
+        return new Promise((resolve) => {
+            this.jobWaiters[jobId] = resolve;
+            // Polling is the backstop for a missed event, and the only source without a stream
+            const poll = async () => {
+                if (this.jobWaiters[jobId] !== resolve) return;
+                try {
+                    const job = await this.fetchJob(jobId);
+                    if (job.status && job.status !== 'running') {
+                        this.handleJobEvent(job);
+                        return;
+                    }
+                    if (!job.status) {
+                        this.handleJobEvent({ job_id: jobId, status: 'failed', error: job.error || 'Job not found' });
+                        return;
+                    }
+                } catch (error) {
+                    console.log(`Could not check job ${jobId}:`, error);
+                }
+                setTimeout(poll, this.events ? 15000 : 2000);
+            };
+            setTimeout(poll, this.events ? 15000 : 2000);
+        });
+    }
+
+    async fetchJob(jobId) {
+        const response = await fetch(`/api/pipeline-jobs/${jobId}`);
+        return response.json();
+    }
+
+    handleJobEvent(job) {
+        if (job.status === 'running') return;
+        this.finishedJobs[job.job_id] = job;
+        const resolve = this.jobWaiters[job.job_id];
+        if (resolve) {
+            delete this.jobWaiters[job.job_id];
+            resolve(job);
+        }
+    }
+
+    handleLanguageEvent(progress) {
+        const labels = {
+            synthesizing: 'Generating voice',
+            synthesized: 'Voice ready',
+            submitting: 'Submitting lip sync',
+            failed: 'Failed'
+        };
+        this.loader?.update(null, `${progress.language.toUpperCase()}: ${labels[progress.status] || progress.status}`);
+    }
+
+    handleUploadEvent(upload) {
+        if (upload.status === 'uploading' && upload.length) {
+            this.loader?.update(null, `${Math.round((upload.offset / upload.length) * 100)}% received by the server`);
+        } else if (upload.status === 'extracting') {
+            this.loader?.update('Extracting audio…', 'Pulling the soundtrack out of your video.');
+        }
+    }
+
+    handleLipSyncEvent(job) {
+        if (!job.language) return;
+        this.jobStatus[job.language] = {
+            ...this.jobStatus[job.language],
+            ...job,
+            output_url: job.output_url || this.jobStatus[job.language]?.output_url
+        };
+        this.showLipSyncStatus();
+    }
+
+    async resyncState() {
+        // Too many events were missed while disconnected - reload state and check on waiting jobs
+        await this.loadExistingFiles();
+        for (const jobId of Object.keys(this.jobWaiters)) {
+            try {
+                const job = await this.fetchJob(jobId);
+                if (job.status && job.status !== 'running') {
+                    this.handleJobEvent(job);
+                }
+            } catch (error) {
+                console.log(`Could not refresh job ${jobId}:`, error);
+            }
+        }
+    }
+
     async handleFileSelect(event) {
         const file = event.target.files[0];
         if (file) {
@@ -441,6 +581,70 @@ class ModularWorkflowApp {
         }
     }
     
+    encodeUploadMetadata(metadata) {
+        return Object.entries(metadata)
+            .map(([key, value]) => `${key} ${btoa(unescape(encodeURIComponent(String(value))))}`)
+            .join(',');
+    }
+
+    async uploadResumable(file, step) {
+        const createResponse = await fetch('/api/uploads', {
+            method: 'POST',
+            headers: {
+                'Tus-Resumable': '1.0.0',
+                'Upload-Length': String(file.size),
+                'Upload-Metadata': this.encodeUploadMetadata({
+                    filename: file.name,
+                    step: step,
+                    language: this.activeLanguage
+                })
+            }
+        });
+        if (createResponse.status !== 201) {
+            return createResponse;
+        }
+        const location = createResponse.headers.get('Location');
+        
+        let offset = 0;
+        let failures = 0;
+        while (offset < file.size) {
+            try {
+                const response = await fetch(location, {
+                    method: 'PATCH',
+                    headers: {
+                        'Tus-Resumable': '1.0.0',
+                        'Upload-Offset': String(offset),
+                        'Content-Type': 'application/offset+octet-stream'
+                    },
+                    body: file.slice(offset, offset + this.resumableChunkSize)
+                });
+                if (response.status >= 500) {
+                    return response;
+                }
+                offset = parseInt(response.headers.get('Upload-Offset'), 10);
+                failures = 0;
+            } catch (error) {
+                // Network drop - ask the server how far it got and resume from there
+                if (++failures > this.resumableMaxRetries) throw error;
+                await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** failures));
+                try {
+                    const head = await fetch(location, { method: 'HEAD', headers: { 'Tus-Resumable': '1.0.0' } });
+                    offset = parseInt(head.headers.get('Upload-Offset'), 10);
+                } catch (headError) {
+                    // Still offline - retry the same offset
+                }
+            }
+            this.loader?.show('Uploading file…', `${Math.round((offset / file.size) * 100)}% uploaded`);
+        }
+        
+        const statusResponse = await fetch(location);
+        const status = await statusResponse.json();
+        return new Response(JSON.stringify(status.result || { error: 'Upload did not complete' }), {
+            status: status.result ? 200 : 500,
+            headers: { 'Content-Type': 'application/json' }
+        });
+    }
+
     async handleFileUpload(file, zone) {
         const stepId = zone.closest('.step-content')?.id;
         const step = stepId ? parseInt(stepId.split('-')[1]) : this.currentStep;
@@ -449,15 +653,21 @@ class ModularWorkflowApp {
         this.loader?.show('Uploading file…', 'We are processing your media.');
         
         try {
-            const formData = new FormData();
-            formData.append('file', file);
-            formData.append('step', step);
-            formData.append('language', this.activeLanguage);
-            
-            const response = await fetch('/api/upload-step', {
-                method: 'POST',
-                body: formData
-            });
+            let response;
+            if (file.size > this.resumableThreshold) {
+                // Large files go through the resumable protocol so a dropped connection only resends missing chunks
+                response = await this.uploadResumable(file, step);
+            } else {
+                const formData = new FormData();
+                formData.append('file', file);
+                formData.append('step', step);
+                formData.append('language', this.activeLanguage);
+                
+                response = await fetch('/api/upload-step', {
+                    method: 'POST',
+                    body: formData
+                });
+            }
             
             const result = await response.json();
             
@@ -581,15 +791,9 @@ class ModularWorkflowApp {
         this.loader?.show('Transcribing audio…', 'Using OpenAI Whisper for accurate speech-to-text.');
         
         try {
-            const response = await fetch('/api/transcribe', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ audioFile: this.workflowData.audioFile })
-            });
-            
-            const result = await response.json();
+            const { ok, result } = await this.runStageJob('/api/transcribe', { audioFile: this.workflowData.audioFile });
             
-            if (response.ok) {
+            if (ok) {
                 this.workflowData.transcript = result.transcript;
                 document.getElementById('transcript-editor').value = result.transcript;
                 this.showStepOutput(2, result);
@@ -637,15 +841,9 @@ class ModularWorkflowApp {
         this.loader?.show('Translating culturally…', 'Adapting for Hindi, Tamil, Telugu, Gujarati with Claude.');
         
         try {
-            const response = await fetch('/api/translate', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ transcript: this.workflowData.transcript })
-            });
+            const { ok, result } = await this.runStageJob('/api/translate', { transcript: this.workflowData.transcript });
             
-            const result = await response.json();
-            
-            if (response.ok) {
+            if (ok) {
                 this.workflowData.translations = result.translations;
                 this.updateLanguageContent(this.activeLanguage);
                 this.showStepOutput(3, result);
@@ -693,18 +891,12 @@ class ModularWorkflowApp {
         this.loader?.show('Generating AI voices…', 'Creating natural voices via ElevenLabs (Hindi & Tamil).');
         
         try {
-            const response = await fetch('/api/voice-synthesis', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ 
-                    translations: this.workflowData.translations,
-                    externalAudio: this.workflowData.audioFiles 
-                })
+            const { ok, result } = await this.runStageJob('/api/voice-synthesis', {
+                translations: this.workflowData.translations,
+                externalAudio: this.workflowData.audioFiles
             });
             
-            const result = await response.json();
-            
-            if (response.ok) {
+            if (ok) {
                 this.workflowData.audioFiles = { ...this.workflowData.audioFiles, ...result.audioFiles };
                 this.showStepOutput(4, result);
                 this.markStepCompleted(4);
@@ -730,22 +922,16 @@ class ModularWorkflowApp {
         this.loader?.show('Creating lip-synced videos…', 'This takes ~3–5 minutes per language.');
         
         try {
-            const response = await fetch('/api/lip-sync', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    videoFile: this.workflowData.videoFile,
-                    audioFiles: this.workflowData.audioFiles
-                })
+            this.jobStatus = {};
+            const { ok, result } = await this.runStageJob('/api/lip-sync', {
+                videoFile: this.workflowData.videoFile,
+                audioFiles: this.workflowData.audioFiles
             });
             
-            const result = await response.json();
-            
-            if (response.ok) {
-                // Store job IDs and start polling
-                this.jobStatus = result.results || {};
-                this.showLipSyncProgress('Jobs submitted successfully! Processing videos (3-5 minutes)...');
-                this.startJobPolling();
+            if (ok) {
+                // Status changes from here on arrive as 'lip_sync' events
+                this.jobStatus = { ...result.results, ...this.jobStatus };
+                this.showLipSyncStatus();
             } else {
                 this.showError(result.error);
                 this.updateProgress(5, 'failed');
@@ -758,6 +944,62 @@ class ModularWorkflowApp {
         }
     }
 
+    async startDubOnly() {
+        // One remux with every language as an audio track - seconds, no Sync.so renders
+        if (!this.workflowData.videoFile || !this.workflowData.audioFiles || Object.keys(this.workflowData.audioFiles).length === 0) {
+            this.showError('Please upload a video and complete voice synthesis first');
+            return;
+        }
+        
+        this.updateProgress(5, 'processing');
+        this.loader?.show('Building dubbed video…', 'Adding each language as an audio track.');
+        
+        try {
+            const { ok, result } = await this.runStageJob('/api/dub', {
+                videoFile: this.workflowData.videoFile,
+                audioFiles: this.workflowData.audioFiles,
+                formats: ['mp4', 'hls', 'dash']
+            });
+            
+            if (ok) {
+                this.showDubResults(result);
+                this.updateProgress(5, 'completed');
+                this.markStepCompleted(5);
+            } else {
+                this.showError(result.error);
+                this.updateProgress(5, 'failed');
+            }
+        } catch (error) {
+            this.showError('Dub failed: ' + error.message);
+            this.updateProgress(5, 'failed');
+        } finally {
+            this.loader?.hide();
+        }
+    }
+
+    showDubResults(result) {
+        const videoResults = document.getElementById('video-results');
+        if (videoResults) {
+            const languages = result.tracks.map(track => track.language.toUpperCase()).join(', ');
+            videoResults.innerHTML = `
+                <div class="result-card">
+                    <h3><i class="ti ti-language"></i> DUBBED VIDEO</h3>
+                    <p><i class="ti ti-check"></i> Audio tracks: ${languages}</p>
+                    <a href="${result.dubFile}" target="_blank" class="btn-accent">
+                        <i class="ti ti-download"></i> Download MP4
+                    </a>
+                    ${result.hls ? `<p><small>HLS: <a href="${result.hls}" target="_blank">master.m3u8</a></small></p>` : ''}
+                    ${result.dash ? `<p><small>DASH: <a href="${result.dash}" target="_blank">manifest.mpd</a></small></p>` : ''}
+                </div>
+            `;
+        }
+        
+        const outputArea = document.getElementById('output-area-5');
+        if (outputArea) {
+            outputArea.style.display = 'block';
+        }
+    }
+
     showLipSyncProgress(message) {
         const videoResults = document.getElementById('video-results');
         if (videoResults) {
@@ -766,7 +1008,7 @@ class ModularWorkflowApp {
                     <div class="spinner ti ti-loader-2 ti-spin" aria-hidden="true"></div>
                     <h3>${message}</h3>
                     <p>Please be patient, this process takes 3-5 minutes per language.</p>
-                    <p>Status updates every 30 seconds...</p>
+                    <p>Status updates appear here as they happen.</p>
                 </div>
             `;
         }
@@ -778,88 +1020,17 @@ class ModularWorkflowApp {
         }
     }
 
-    startJobPolling() {
-        // Clear any existing polling
-        this.stopJobPolling();
-        
-        // Start polling every 30 seconds
-        this.pollingInterval = setInterval(() => {
-            this.checkJobStatus();
-        }, 30000);
-        
-        // Check immediately
-        this.checkJobStatus();
-    }
-
-    async checkJobStatus() {
-        let allCompleted = true;
-        let anyProcessing = false;
-        const updatedResults = {};
-
-        for (const [language, jobInfo] of Object.entries(this.jobStatus)) {
-            if (jobInfo.job_id && (jobInfo.status === 'submitted' || jobInfo.status === 'processing')) {
-                try {
-                    const response = await fetch(`/api/check-lip-sync-status/${jobInfo.job_id}`);
-                    const result = await response.json();
-                    
-                    if (response.ok && result.success) {
-                        const status = result.result?.status || result.status || 'processing';
-                        const outputUrl = result.result?.outputUrl || result.result?.output_url || result.result?.download_url;
-                        updatedResults[language] = {
-                            ...jobInfo,
-                            status: status.toLowerCase(), // Convert COMPLETED to completed
-                            output_url: outputUrl,
-                            progress: result.result?.progress || 'processing'
-                        };
-                        
-                        if (status.toLowerCase() !== 'completed') {
-                            allCompleted = false;
-                            if (status.toLowerCase() === 'processing') {
-                                anyProcessing = true;
-                            }
-                        }
-                    } else {
-                        // Keep current status if API call fails
-                        updatedResults[language] = jobInfo;
-                        allCompleted = false;
-                        anyProcessing = true;
-                    }
-                } catch (error) {
-                    console.log(`Error checking ${language} job:`, error);
-                    updatedResults[language] = jobInfo;
-                    allCompleted = false;
-                    anyProcessing = true;
-                }
-            } else {
-                updatedResults[language] = jobInfo;
-                if (jobInfo.status !== 'completed') {
-                    allCompleted = false;
-                }
-            }
-        }
-
-        // Update job status
-        this.jobStatus = updatedResults;
-        
-        // Update UI with live status
-        this.updateVideoResultsWithPolling(updatedResults);
+    showLipSyncStatus() {
+        this.updateVideoResults(this.jobStatus);
         
-        // Stop polling if all jobs are complete
-        if (allCompleted) {
-            this.stopJobPolling();
+        const statuses = Object.values(this.jobStatus).map(job => job.status);
+        if (statuses.length > 0 && statuses.every(status => status === 'completed')) {
             this.updateProgress(5, 'completed');
             this.markStepCompleted(5);
-        } else if (anyProcessing) {
+        } else if (statuses.some(status => ['submitted', 'processing', 'pending', 'ingesting'].includes(status))) {
             this.updateProgress(5, 'processing');
         }
     }
-
-    stopJobPolling() {
-        if (this.pollingInterval) {
-            clearInterval(this.pollingInterval);
-            this.pollingInterval = null;
-        }
-    }
     
     showStepOutput(step, data) {
         const outputArea = document.getElementById(`output-area-${step}`);
@@ -1064,7 +1235,7 @@ class ModularWorkflowApp {
         }
     }
 
-    updateVideoResultsWithPolling(results) {
+    updateVideoResults(results) {
         const videoResults = document.getElementById('video-results');
         if (videoResults) {
             videoResults.innerHTML = '';
@@ -1118,14 +1289,14 @@ class ModularWorkflowApp {
             
             // Add overall status message
             const processingCount = Object.values(results).filter(r => 
-                r.status === 'processing' || r.status === 'submitted'
+                ['processing', 'submitted', 'pending', 'ingesting'].includes(r.status)
             ).length;
             
             if (processingCount > 0) {
                 const statusDiv = document.createElement('div');
                 statusDiv.className = 'overall-status';
                 statusDiv.innerHTML = `
-                    <p><i class="ti ti-clock" aria-hidden="true"></i> ${processingCount} job(s) still processing. Next update in 30 seconds...</p>
+                    <p><i class="ti ti-clock" aria-hidden="true"></i> ${processingCount} job(s) still processing. This page updates when they finish.</p>
                 `;
                 videoResults.appendChild(statusDiv);
             }
@@ -1204,6 +1375,33 @@ class ModularWorkflowApp {
         } catch (error) {
             console.log('No existing workflow data found');
         }
+        await this.restoreLipSyncJobs();
+    }
+    
+    async restoreLipSyncJobs() {
+        // Lip sync jobs are kept in the server's job ledger, so their status survives a reload or restart
+        try {
+            const response = await fetch('/api/jobs?stage=lip_sync.submit&status=submitted,completed');
+            if (!response.ok) return;
+            const { jobs } = await response.json();
+            // Only resume a batch that is still running, along with its finished languages
+            const running = jobs.find(job => job.status === 'submitted');
+            if (!running) return;
+            const restored = {};
+            for (const job of jobs.filter(job => job.project_id === running.project_id)) {
+                const language = job.inputs?.language;
+                if (language && !restored[language]) {
+                    restored[language] = { ...job.outputs, status: job.status, job_id: job.provider_job_id };
+                }
+            }
+            if (Object.keys(restored).length > 0) {
+                this.jobStatus = restored;
+                this.showLipSyncProgress('Resuming lip sync jobs...');
+                this.showLipSyncStatus();
+            }
+        } catch (error) {
+            console.log('No lip sync jobs to restore');
+        }
     }
     
     displayExistingData(data) {
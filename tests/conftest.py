@@ -0,0 +1,18 @@
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep app imports from writing traces or state into the working tree
+_state_dir = tempfile.mkdtemp(prefix='multilingual-tests-')
+atexit.register(shutil.rmtree, _state_dir, ignore_errors=True)
+os.environ.setdefault('TRACE_EXPORTER', 'none')
+os.environ.setdefault('JOB_LEDGER_PATH', os.path.join(_state_dir, 'jobs.db'))
+os.environ.setdefault('SCRATCH_DIR', os.path.join(_state_dir, 'scratch'))
+os.environ.setdefault('SCRATCH_MEMORY_DIR', '')
+os.environ.setdefault('UPLOAD_SPOOL_DIR', os.path.join(_state_dir, 'spool'))
+os.environ.setdefault('TTS_CACHE_DIR', os.path.join(_state_dir, 'tts-segments'))
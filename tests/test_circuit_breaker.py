@@ -0,0 +1,125 @@
+import pytest
+
+import app
+
+
+@pytest.fixture
+def breaker():
+    breaker = app.CircuitBreaker('test')
+    breaker.failure_threshold = 3
+    breaker.reset_timeout = 30
+    breaker.half_open_calls = 1
+    return breaker
+
+
+def _trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow() is False
+        breaker.record(True)
+
+
+def _expire(breaker):
+    breaker.opened_at -= breaker.reset_timeout + 1
+
+
+def test_opens_after_consecutive_failures_only(breaker):
+    breaker.record(True)
+    breaker.record(True)
+    breaker.record(False)
+    breaker.record(True)
+    assert breaker.state == 'closed' and breaker.failures == 1
+    breaker.record(False)
+    _trip(breaker)
+    assert breaker.state == 'open'
+    with pytest.raises(app.CircuitOpenError) as error:
+        breaker.allow()
+    assert error.value.retry_in > 0
+    assert breaker.counts['rejected'] == 1
+
+
+def test_unknown_outcomes_do_not_count(breaker):
+    for _ in range(10):
+        breaker.record(None)
+    assert breaker.state == 'closed' and breaker.failures == 0
+
+
+def test_half_open_admits_limited_probes_and_closes_on_success(breaker):
+    _trip(breaker)
+    _expire(breaker)
+    assert breaker.allow() is True
+    assert breaker.state == 'half_open'
+    with pytest.raises(app.CircuitOpenError):
+        breaker.allow()
+    breaker.record(False, probe=True)
+    assert breaker.state == 'closed'
+    assert breaker.allow() is False
+
+
+def test_failed_probe_reopens(breaker):
+    _trip(breaker)
+    _expire(breaker)
+    assert breaker.allow() is True
+    breaker.record(True, probe=True)
+    assert breaker.state == 'open'
+    assert breaker.counts['opened'] == 2
+
+
+def test_unused_probe_is_given_back(breaker):
+    _trip(breaker)
+    _expire(breaker)
+    assert breaker.allow() is True
+    breaker.record(None, probe=True)
+    assert breaker.state == 'half_open'
+    assert breaker.allow() is True
+
+
+def test_open_circuit_refuses_limiter_slots():
+    limiter = app.AIMDLimiter('test', max_concurrency=4, max_rate=10)
+    limiter.breaker.failure_threshold = 1
+    limiter.breaker.record(True)
+    with pytest.raises(app.CircuitOpenError):
+        with limiter.slot():
+            pass
+    assert limiter.in_flight == 0
+
+
+def test_deadline_while_waiting_releases_the_half_open_probe():
+    limiter = app.AIMDLimiter('test', max_concurrency=4, max_rate=10)
+    limiter.breaker.failure_threshold = 1
+    limiter.breaker.record(True)
+    _expire(limiter.breaker)
+    limiter.paused_until = app.time.monotonic() + 60  # the slot wait outlasts the deadline
+    with app.deadline_scope(0.2, 'test'):
+        with pytest.raises(app.DeadlineExceeded):
+            with limiter.slot():
+                pass
+    assert limiter.breaker.state == 'half_open' and limiter.breaker.probes == 0
+    limiter.paused_until = 0
+    with limiter.slot() as call:
+        assert call.probe
+        call.record(200)
+    assert limiter.breaker.state == 'closed'
+
+
+def test_cancelled_async_wait_releases_the_half_open_probe():
+    import asyncio
+
+    limiter = app.AIMDLimiter('test', max_concurrency=4, max_rate=10)
+    limiter.breaker.failure_threshold = 1
+    limiter.breaker.record(True)
+    _expire(limiter.breaker)
+    limiter.paused_until = app.time.monotonic() + 60
+
+    async def wait_for_slot():
+        async with limiter.slot_async():
+            pass
+
+    async def main():
+        task = asyncio.ensure_future(wait_for_slot())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert limiter.breaker.probes == 0
@@ -0,0 +1,19 @@
+import app
+
+MASTER = """#EXTM3U
+#EXT-X-VERSION:7
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="group_audio",NAME="audio_0",DEFAULT=NO,LANGUAGE="und",URI="original/index.m3u8"
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="group_audio",NAME="audio_1",DEFAULT=YES,LANGUAGE="hin",URI="hindi/index.m3u8"
+#EXT-X-STREAM-INF:BANDWIDTH=1400000,CODECS="avc1.64001f,mp4a.40.2",AUDIO="group_audio"
+video/index.m3u8
+"""
+
+
+def test_hls_audio_renditions_get_track_titles(tmp_path):
+    master = tmp_path / 'master.m3u8'
+    master.write_text(MASTER)
+    app.name_hls_renditions(str(master), {'original': 'Original', 'hindi': 'Hindi', 'video': 'Video'})
+    lines = master.read_text().splitlines()
+    assert 'NAME="Original"' in lines[2] and 'LANGUAGE="und"' in lines[2]
+    assert 'NAME="Hindi"' in lines[3] and 'DEFAULT=YES' in lines[3]
+    assert lines[4:] == MASTER.splitlines()[4:]
@@ -0,0 +1,14 @@
+import app
+
+
+def test_unread_streams_free_their_slot_when_closed():
+    client = app.app.test_client()
+    responses = [client.get('/api/events') for _ in range(app.EVENTS_MAX_STREAMS)]
+    assert all(response.status_code == 200 for response in responses)
+    assert client.get('/api/events').status_code == 503
+    for response in responses:
+        response.close()
+    assert app.event_bus.streams == 0
+    response = client.get('/api/events')
+    assert response.status_code == 200
+    response.close()
@@ -0,0 +1,71 @@
+import io
+import struct
+
+import pytest
+
+from media_probe import _shift_chunk_offsets, faststart_plan
+
+
+def box(box_type, body=b''):
+    return struct.pack('>I4s', 8 + len(body), box_type.encode()) + body
+
+
+def chunk_offsets(box_type, offsets):
+    fmt = '>I' if box_type == 'stco' else '>Q'
+    return box(box_type, struct.pack('>II', 0, len(offsets)) + b''.join(struct.pack(fmt, o) for o in offsets))
+
+
+def moov(offsets, box_type='stco'):
+    return box('moov', box('mvhd', bytes(100)) + box('trak', box('mdia', box('minf', box('stbl', chunk_offsets(box_type, offsets))))))
+
+
+def read_offsets(data):
+    """Chunk offsets from the first stco/co64 found in a file"""
+    for box_type, fmt, width in (('stco', '>I', 4), ('co64', '>Q', 8)):
+        pos = data.find(box_type.encode())
+        if pos >= 0:
+            count = struct.unpack_from('>I', data, pos + 8)[0]
+            return [struct.unpack_from(fmt, data, pos + 12 + i * width)[0] for i in range(count)]
+
+
+def apply(plan, source):
+    return b''.join(piece if isinstance(piece, bytes) else source[piece[0]:piece[1]] for piece in plan)
+
+
+@pytest.mark.parametrize('box_type', ['stco', 'co64'])
+def test_moves_moov_before_mdat_and_fixes_chunk_offsets(box_type):
+    ftyp = box('ftyp', b'isom' + bytes(4))
+    first = box('mdat', b'AAAA')
+    second = box('mdat', b'BBBB')
+    offsets = [len(ftyp) + 8]
+    size = len(moov(offsets + [0], box_type))
+    offsets.append(len(ftyp) + len(first) + size + 8)
+    source = ftyp + first + moov(offsets, box_type) + second
+
+    plan = faststart_plan(io.BytesIO(source))
+    output = apply(plan, source)
+    assert len(output) == len(source)
+    assert output.index(b'moov') < output.index(b'mdat')
+    new_offsets = read_offsets(output)
+    assert new_offsets == [offsets[0] + size, offsets[1]]
+    assert [output[o:o + 4] for o in new_offsets] == [b'AAAA', b'BBBB']
+    assert faststart_plan(io.BytesIO(output)) is None
+
+
+def test_leaves_already_fast_and_non_mp4_files_alone():
+    ftyp = box('ftyp', b'isom' + bytes(4))
+    assert faststart_plan(io.BytesIO(ftyp + moov([0]) + box('mdat', b'x'))) is None
+    assert faststart_plan(io.BytesIO(b'RIFF' + bytes(40))) is None
+
+
+def test_refuses_compressed_moov():
+    source = box('ftyp', bytes(8)) + box('mdat', b'x') + box('moov', box('cmov', bytes(8)))
+    with pytest.raises(ValueError):
+        faststart_plan(io.BytesIO(source))
+
+
+def test_shift_chunk_offsets_only_moves_offsets_below_the_threshold():
+    body = moov([100, 5000])[8:]
+    assert read_offsets(_shift_chunk_offsets(body, 50, below=1000)) == [150, 5000]
+    with pytest.raises(ValueError):
+        _shift_chunk_offsets(moov([0xFFFFFFF0])[8:], 0x100, below=0xFFFFFFFF)
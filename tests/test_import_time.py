@@ -0,0 +1,38 @@
+import os
+import sys
+import json
+import subprocess
+
+from conftest import ROOT
+
+IMPORT_BUDGET = float(os.environ.get('IMPORT_TIME_BUDGET', 0.30))  # seconds
+HEAVY_MODULES = ('openai', 'anthropic', 'boto3', 'httpx', 'moviepy', 'numpy')
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({'elapsed': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def _import_app(tmp_path):
+    env = dict(os.environ, PYTHONPATH=ROOT, TRACE_EXPORTER='none')
+    # Measure the import, not compiling app.py: let the first run cache its bytecode
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_app_loads_no_heavy_modules(tmp_path):
+    assert _import_app(tmp_path)['loaded'] == []
+
+
+def test_import_app_within_budget(tmp_path):
+    _import_app(tmp_path)  # warm-up: writes the bytecode cache
+    # Best of three, so one slow run on a busy machine doesn't fail the build
+    elapsed = min(_import_app(tmp_path)['elapsed'] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET, f"import app took {elapsed:.3f}s (budget {IMPORT_BUDGET}s)"
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+import app
+import job_ledger
+from job_ledger import JobLedger, idempotency_key
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return JobLedger(str(tmp_path / 'jobs.db'))
+
+
+def orphan(ledger, stage='translate', inputs=None, owner='previous-deploy:7:0123456789ab', **fields):
+    """An in-flight row owned by another instance whose lease ran out"""
+    row, _ = ledger.begin(stage, inputs or {})
+    return ledger.update(row['job_id'], owner=owner, lease_until=time.time() - 1, **fields)
+
+
+def test_begin_is_idempotent_per_key(ledger):
+    key = idempotency_key('translate', {'text': 'hi'})
+    assert key == idempotency_key('translate', {'text': 'hi'})
+    first, created = ledger.begin('translate', {'text': 'hi'}, key=key)
+    again, created_again = ledger.begin('translate', {'text': 'hi'}, key=key)
+    assert created and not created_again
+    assert again['job_id'] == first['job_id']
+    assert again['inputs'] == {'text': 'hi'}
+
+
+def test_concurrent_begins_create_one_job(ledger):
+    results = []
+
+    def begin():
+        results.append(ledger.begin('translate', {}, key='same')[1])
+
+    threads = [threading.Thread(target=begin) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [False] * 9 + [True]
+
+
+def test_claim_abandoned_takes_only_in_flight_jobs_with_expired_leases(ledger):
+    abandoned = orphan(ledger)
+    orphan(ledger, status='completed')
+    ours, _ = ledger.begin('translate', {})
+    live, _ = ledger.begin('translate', {})
+    ledger.update(live['job_id'], owner='other-host:7:abcdef', lease_until=time.time() + 60)
+
+    claimed = ledger.claim_abandoned()
+    assert [row['job_id'] for row in claimed] == [abandoned['job_id']]
+    assert claimed[0]['owner'] == ours['owner']
+    assert claimed[0]['lease_until'] > time.time()
+    assert ledger.claim_abandoned() == []
+
+
+def test_a_restart_that_reuses_host_and_pid_is_a_new_owner(ledger, monkeypatch):
+    row, _ = ledger.begin('translate', {})
+    monkeypatch.setattr(job_ledger, '_owners', {})  # as after a container restart
+    assert job_ledger.process_owner() != row['owner']
+    ledger.update(row['job_id'], lease_until=time.time() - 1)
+    assert [claimed['job_id'] for claimed in ledger.claim_abandoned()] == [row['job_id']]
+
+
+def test_heartbeat_keeps_our_leases_alive(ledger):
+    row, _ = ledger.begin('translate', {})
+    ledger.update(row['job_id'], lease_until=time.time() - 1)
+    assert ledger.heartbeat() == 1
+    assert ledger.get(row['job_id'])['lease_until'] > time.time()
+
+
+def test_rows_without_a_lease_fall_back_to_updated_at(ledger):
+    row, _ = ledger.begin('translate', {})
+    with ledger._connect() as conn:
+        conn.execute("UPDATE jobs SET owner = 'old:1', lease_until = NULL, updated_at = ? WHERE job_id = ?",
+                     (time.time() - ledger.lease_seconds - 1, row['job_id']))
+    assert [claimed['job_id'] for claimed in ledger.claim_abandoned()] == [row['job_id']]
+
+
+def test_restart_counts_attempts_and_clears_the_error(ledger):
+    row, _ = ledger.begin('translate', {})
+    ledger.update(row['job_id'], status='failed', error='boom')
+    row = ledger.restart(row['job_id'], status='pending')
+    assert (row['status'], row['error'], row['attempts']) == ('pending', None, 2)
+
+
+def test_resume_abandoned_jobs(ledger, monkeypatch):
+    started, watched = [], []
+    monkeypatch.setattr(app, 'get_job_ledger', lambda: ledger)
+    monkeypatch.setattr(app, 'watch_lip_sync_job', watched.append)
+    monkeypatch.setitem(app.PIPELINE_STAGES, 'test_stage', lambda **inputs: inputs)
+    monkeypatch.setattr(app.pipeline_engine, 'start_job',
+                        lambda stage, coro, job_id: started.append((stage, coro, job_id)))
+
+    stage = orphan(ledger, 'test_stage', {'language': 'hindi'})
+    worn_out = orphan(ledger, 'test_stage', attempts=app.JOB_RESUME_MAX_ATTEMPTS)
+    submitted = orphan(ledger, 'lip_sync.submit', status='submitted', provider_job_id='sync-1')
+    unsent = orphan(ledger, 'lip_sync.submit', status='pending')
+
+    assert app.resume_abandoned_jobs() == 2
+    assert started == [('test_stage', {'language': 'hindi'}, stage['job_id'])]
+    assert ledger.get(stage['job_id'])['attempts'] == 2
+    assert watched == ['sync-1']
+    assert ledger.get(submitted['job_id'])['status'] == 'submitted'
+    assert ledger.get(worn_out['job_id'])['status'] == 'failed'
+    assert ledger.get(unsent['job_id'])['status'] == 'failed'
@@ -0,0 +1,78 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = app.AIMDLimiter('test', max_concurrency=8, max_rate=10)
+    monkeypatch.setitem(app.rate_limiters, 'test', limiter)
+    monkeypatch.setattr(app, 'backoff_delay', lambda attempt: 0)
+    return limiter
+
+
+def test_starts_at_half_the_limits(limiter):
+    assert (limiter.concurrency, limiter.rate) == (4, 5)
+
+
+def test_success_grows_additively_up_to_the_limits(limiter):
+    limiter.record(200)
+    assert limiter.concurrency == pytest.approx(4.25)
+    assert limiter.rate == pytest.approx(5.5)
+    for _ in range(500):
+        limiter.record(200)
+    assert (limiter.concurrency, limiter.rate) == (8, 10)
+
+
+def test_throttling_halves_down_to_the_floors(limiter):
+    limiter.record(429)
+    assert (limiter.concurrency, limiter.rate) == (2, 2.5)
+    for _ in range(20):
+        limiter.record(503)
+    assert limiter.concurrency == 1
+    assert limiter.rate == pytest.approx(10 / 64)
+    assert limiter.counts['throttled'] == 21
+
+
+def test_other_errors_leave_the_limits_alone(limiter):
+    limiter.record(400)
+    limiter.record(None)
+    assert (limiter.concurrency, limiter.rate, limiter.counts['failed']) == (4, 5, 2)
+
+
+def test_retry_after_pauses_new_slots(limiter):
+    limiter.record(429, retry_after=30)
+    assert limiter.paused_until >= time.monotonic() + 30
+    assert limiter._try_acquire() >= 30
+
+
+def test_slots_are_bounded_by_concurrency(limiter):
+    limiter.tokens = 100
+    for _ in range(4):
+        assert limiter._try_acquire() == 0
+    assert limiter._try_acquire() > 0
+    limiter._release()
+    assert limiter._try_acquire() == 0
+
+
+def test_call_with_rate_control_retries_throttled_responses(limiter):
+    responses = iter([SimpleNamespace(status_code=429, headers={}), SimpleNamespace(status_code=200, headers={})])
+    response = app.call_with_rate_control('test', lambda: next(responses))
+    assert response.status_code == 200
+    assert limiter.counts['throttled'] == 1 and limiter.counts['succeeded'] == 1
+    assert limiter.in_flight == 0
+
+
+def test_call_with_rate_control_does_not_retry_client_errors(limiter):
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise ValueError('bad request')
+
+    with pytest.raises(ValueError):
+        app.call_with_rate_control('test', call)
+    assert len(calls) == 1 and limiter.in_flight == 0
@@ -0,0 +1,50 @@
+import base64
+
+import app
+
+DATA = b'0123456789'
+
+
+def metadata(**fields):
+    return ','.join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in fields.items())
+
+
+def test_retried_finish_does_not_complete_r2_twice(monkeypatch):
+    completed = []
+    step_calls = []
+
+    def complete(key, upload_id, parts):
+        if completed:
+            raise RuntimeError('NoSuchUpload')
+        completed.append(upload_id)
+        return f'https://r2.example/{key}'
+
+    def process_step(step, file_ext, public_url, language, result):
+        step_calls.append(public_url)
+        if len(step_calls) == 1:
+            raise RuntimeError('step failed')
+        return result
+
+    monkeypatch.setattr(app, 'create_multipart_upload_r2', lambda key, content_type=None: 'mp-1')
+    monkeypatch.setattr(app, 'upload_part_r2', lambda key, upload_id, number, data: {'PartNumber': number, 'ETag': 'e'})
+    monkeypatch.setattr(app, 'complete_multipart_upload_r2', complete)
+    monkeypatch.setattr(app, 'abort_multipart_upload_r2', lambda key, upload_id: completed.clear())
+    monkeypatch.setattr(app, 'process_step_upload', process_step)
+    client = app.app.test_client()
+
+    created = client.post('/api/uploads', headers={'Upload-Length': str(len(DATA)),
+                                                   'Upload-Metadata': metadata(filename='script.txt', step='3')})
+    location = created.headers['Location']
+    chunk = {'Content-Type': 'application/offset+octet-stream'}
+
+    first = client.patch(location, data=DATA, headers={**chunk, 'Upload-Offset': '0'})
+    assert first.status_code == 500
+
+    retry = client.patch(location, data=b'', headers={**chunk, 'Upload-Offset': str(len(DATA))})
+    assert retry.status_code == 204
+    assert completed == ['mp-1']
+    assert len(step_calls) == 2 and step_calls[0] == step_calls[1]
+    assert client.get(location).get_json()['complete']
+
+    client.delete(location)
+    assert completed == ['mp-1']  # a completed object is not aborted
@@ -0,0 +1,27 @@
+import pytest
+
+import app
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setitem(app.workflow_state, 'translations', {})
+    monkeypatch.setitem(app.workflow_state, 'translationSegments', {})
+
+
+def test_diff_segments_reports_new_indexes_that_changed():
+    old = ['a', 'b', 'c', 'd']
+    assert app.diff_segments(old, old) == []
+    assert app.diff_segments(old, ['a', 'B', 'c', 'd']) == [1]
+    assert app.diff_segments(old, ['a', 'b', 'x', 'c', 'd']) == [2]
+    assert app.diff_segments(old, ['a', 'c', 'd']) == []
+    assert app.diff_segments([], ['a', 'b']) == [0, 1]
+
+
+def test_record_translations_diffs_against_the_previous_version():
+    first = app.record_translations({'hindi': 'One. Two.\n\nThree.'})
+    assert first == {'hindi': {'segments': 2, 'changed': [0, 1]}}
+    second = app.record_translations({'hindi': 'One. Two.\n\nThree, edited.'})
+    assert second == {'hindi': {'segments': 2, 'changed': [1]}}
+    assert app.workflow_state['translations']['hindi'] == 'One. Two.\n\nThree, edited.'
+    assert app.workflow_state['translationSegments']['hindi'] == ['One. Two.', 'Three, edited.']
@@ -0,0 +1,47 @@
+import pytest
+
+import app
+
+DATA = bytes(range(100))
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self, size):
+        yield self.data
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'head_object_r2', lambda key: {'ContentLength': len(DATA), 'ETag': '"v1"', 'ContentType': 'video/mp4'})
+    monkeypatch.setattr(app, 'get_object_range_r2', lambda key, start, end: FakeBody(DATA[start:end]))
+    return app.app.test_client()
+
+
+def test_single_range_is_partial(client):
+    response = client.get('/api/stream/clip.mp4', headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == DATA[10:20]
+    assert response.headers['Content-Range'] == 'bytes 10-19/100'
+
+
+@pytest.mark.parametrize('header', ['bytes=0-1,5-9', 'bytes=oops', 'items=0-5'])
+def test_unsupported_ranges_get_the_whole_file(client, header):
+    response = client.get('/api/stream/clip.mp4', headers={'Range': header})
+    assert response.status_code == 200
+    assert response.data == DATA
+    assert 'Content-Range' not in response.headers
+
+
+def test_unsatisfiable_single_range_is_416(client):
+    response = client.get('/api/stream/clip.mp4', headers={'Range': 'bytes=500-600'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == 'bytes */100'
+
+
+def test_stale_if_range_gets_the_whole_file(client):
+    response = client.get('/api/stream/clip.mp4', headers={'Range': 'bytes=10-19', 'If-Range': '"v0"'})
+    assert response.status_code == 200
+    assert response.data == DATA
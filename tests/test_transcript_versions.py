@@ -0,0 +1,41 @@
+import pytest
+
+import app
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setitem(app.workflow_state, 'transcript', '')
+    monkeypatch.setitem(app.workflow_state, 'transcriptVersions', [])
+
+
+def test_split_transcript_segments_keeps_paragraph_breaks():
+    segments = app.split_transcript_segments('Hello there. How are you?\n\nFine!')
+    assert segments == [
+        {'text': 'Hello there.', 'sep': ' '},
+        {'text': 'How are you?', 'sep': '\n\n'},
+        {'text': 'Fine!', 'sep': '\n\n'},
+    ]
+    assert app.split_transcript_segments(' \n\n ') == []
+
+
+def test_record_transcript_versions_only_changed_segments():
+    first = app.record_transcript('One. Two. Three.')
+    assert (first['version'], first['changed']) == (1, [0, 1, 2])
+    second = app.record_transcript('One. Two, edited. Three.')
+    assert (second['version'], second['changed']) == (2, [1])
+    assert app.workflow_state['transcript'] == 'One. Two, edited. Three.'
+
+
+def test_record_transcript_ignores_whitespace_only_edits():
+    first = app.record_transcript('One. Two.')
+    assert app.record_transcript('One.   Two.') is first
+    assert len(app.workflow_state['transcriptVersions']) == 1
+    assert app.workflow_state['transcript'] == 'One.   Two.'
+
+
+def test_record_transcript_keeps_a_bounded_history(monkeypatch):
+    monkeypatch.setattr(app, 'TRANSCRIPT_MAX_VERSIONS', 3)
+    for i in range(5):
+        app.record_transcript(f'Version {i}.')
+    assert [v['version'] for v in app.workflow_state['transcriptVersions']] == [3, 4, 5]
@@ -0,0 +1,38 @@
+import app
+
+
+def test_short_script_is_one_segment_with_no_trailing_gap():
+    assert app.split_tts_segments('Hello there. How are you?') == [
+        {'text': 'Hello there. How are you?', 'gap_after': 0}
+    ]
+
+
+def test_sentences_merge_up_to_max_chars():
+    text = 'One two three. Four five six. Seven eight nine.'
+    segments = app.split_tts_segments(text, max_chars=30)
+    assert [s['text'] for s in segments] == ['One two three. Four five six.', 'Seven eight nine.']
+    assert segments[0]['gap_after'] == app.TTS_SENTENCE_GAP_MS / 1000
+    assert segments[-1]['gap_after'] == 0
+
+
+def test_paragraphs_never_merge_and_get_the_longer_gap():
+    segments = app.split_tts_segments('First line.\n\nSecond line.\nThird line.')
+    assert [s['text'] for s in segments] == ['First line.', 'Second line.', 'Third line.']
+    assert [s['gap_after'] for s in segments] == [app.TTS_PARAGRAPH_GAP_MS / 1000] * 2 + [0]
+
+
+def test_long_sentences_split_at_clauses_then_spaces():
+    clauses = app.split_tts_segments('alpha beta gamma, delta epsilon zeta, eta theta', max_chars=20)
+    assert [s['text'] for s in clauses] == ['alpha beta gamma,', 'delta epsilon zeta,', 'eta theta']
+    words = app.split_tts_segments('aaaa bbbb cccc dddd eeee', max_chars=10)
+    assert [s['text'] for s in words] == ['aaaa bbbb', 'cccc dddd', 'eeee']
+    assert all(len(s['text']) <= 10 for s in app.split_tts_segments('x' * 25, max_chars=10))
+
+
+def test_devanagari_danda_ends_a_sentence():
+    segments = app.split_tts_segments('नमस्ते। आप कैसे हैं?', max_chars=14)
+    assert [s['text'] for s in segments] == ['नमस्ते।', 'आप कैसे हैं?']
+
+
+def test_blank_script():
+    assert app.split_tts_segments('  \n\n ') == []
@@ -0,0 +1,60 @@
+import pytest
+
+import app
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+        self.text = 'error'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size):
+        yield b'mp3'
+
+
+class FakeWriter:
+    def __init__(self, key, content_type=None):
+        self.key = key
+        self.bytes_written = 0
+
+    def write(self, chunk):
+        self.bytes_written += len(chunk)
+        return False
+
+    def close(self):
+        return f'https://r2/{self.key}'
+
+    def abort(self):
+        pass
+
+
+@pytest.fixture
+def tts(monkeypatch):
+    monkeypatch.setitem(app.rate_limiters, 'elevenlabs', app.AIMDLimiter('elevenlabs', 4, 100))
+    monkeypatch.setattr(app, 'backoff_delay', lambda attempt: 0)
+    monkeypatch.setattr(app, 'R2StreamWriter', FakeWriter)
+    monkeypatch.setattr(app, 'TTS_PREVIEW', False)
+    return app.ElevenLabsTTS()
+
+
+def test_streaming_retries_throttling_before_the_first_byte(tts, monkeypatch):
+    statuses = iter([429, 503, 200])
+    monkeypatch.setattr(app.requests, 'post', lambda *args, **kwargs: FakeResponse(next(statuses)))
+    audio_url, key = tts.text_to_speech_streaming('Hello.', 'hindi')
+    assert audio_url and key
+    counts = app.rate_limiters['elevenlabs'].counts
+    assert (counts['throttled'], counts['succeeded']) == (2, 1)
+
+
+def test_streaming_gives_up_on_client_errors(tts, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app.requests, 'post', lambda *args, **kwargs: calls.append(1) or FakeResponse(401))
+    assert tts.text_to_speech_streaming('Hello.', 'hindi') == (None, None)
+    assert len(calls) == 1
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import app
+
+RATE = app.WHISPER_SAMPLE_RATE
+
+
+def _signal(*parts):
+    """Concatenate (seconds, amplitude) parts: a 220 Hz tone, or near-silence when amplitude is 0"""
+    rng = np.random.default_rng(0)
+    pieces = []
+    for seconds, amplitude in parts:
+        n = int(seconds * RATE)
+        if amplitude:
+            pieces.append(amplitude * np.sin(2 * np.pi * 220 * np.arange(n) / RATE))
+        else:
+            pieces.append(rng.normal(0, 1e-4, n))
+    return np.concatenate(pieces).astype(np.float32)
+
+
+def test_speech_between_silences_is_kept_with_padding():
+    regions = app.detect_speech_regions(_signal((3, 0), (2, 0.5), (3, 0)), RATE)
+    assert len(regions) == 1
+    start, end = regions[0]
+    assert start == pytest.approx(3 - app.VAD_PADDING, abs=0.05)
+    assert end == pytest.approx(5 + app.VAD_PADDING, abs=0.05)
+
+
+def test_short_gaps_are_bridged_and_long_gaps_cut():
+    short_gap = app.detect_speech_regions(_signal((1, 0), (1, 0.5), (0.6, 0), (1, 0.5), (1, 0)), RATE)
+    assert len(short_gap) == 1
+    long_gap = app.detect_speech_regions(_signal((1, 0), (1, 0.5), (3, 0), (1, 0.5), (1, 0)), RATE)
+    assert len(long_gap) == 2
+
+
+def test_silence_and_empty_input():
+    assert app.detect_speech_regions(_signal((2, 0)), RATE) == []
+    assert app.detect_speech_regions(np.zeros(10, dtype=np.float32), RATE) == []
+
+
+def test_speech_to_the_end_keeps_the_tail():
+    samples = _signal((2, 0), (1.01, 0.5))
+    regions = app.detect_speech_regions(samples, RATE)
+    assert regions[-1][1] == len(samples) / RATE
+
+
+def test_trim_and_restore_timestamps():
+    samples = _signal((1, 0), (1, 0.5), (3, 0), (1, 0.5), (1, 0))
+    regions = [(1.0, 2.0), (5.0, 6.0)]
+    trimmed, offset_map = app.trim_to_regions(samples, regions, RATE)
+    assert len(trimmed) == 2 * RATE
+    assert offset_map == [
+        {'trimmed_start': 0.0, 'original_start': 1.0, 'duration': 1.0},
+        {'trimmed_start': 1.0, 'original_start': 5.0, 'duration': 1.0},
+    ]
+    assert app.restore_timestamp(offset_map, 0.5) == 1.5
+    assert app.restore_timestamp(offset_map, 1.25) == 5.25
+    assert app.restore_timestamp(None, 3.0) == 3.0
+
+
+def test_whisper_segments_are_mapped_to_original_time():
+    offset_map = [
+        {'trimmed_start': 0.0, 'original_start': 1.0, 'duration': 1.0},
+        {'trimmed_start': 1.0, 'original_start': 5.0, 'duration': 1.0},
+    ]
+    response = SimpleNamespace(text='Hi there. Bye.', segments=[
+        SimpleNamespace(start=0.2, end=1.0, text=' Hi there.'),
+        SimpleNamespace(start=1.0, end=1.8, text=' Bye.'),
+    ])
+    text, segments = app.whisper_transcript(response, offset_map)
+    assert text == 'Hi there. Bye.'
+    assert segments == [
+        {'start': 1.2, 'end': 2.0, 'text': 'Hi there.'},
+        {'start': 5.0, 'end': 5.8, 'text': 'Bye.'},
+    ]
+    assert app.whisper_transcript(response)[1][1] == {'start': 1.0, 'end': 1.8, 'text': 'Bye.'}